@@ -0,0 +1,5 @@
+"""Shared helpers for the analysis and plotting scripts of all project parts.
+
+The scripts in the part folders add the repository root to ``sys.path`` and
+import from here, so the parsers only exist once.
+"""
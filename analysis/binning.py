@@ -0,0 +1,74 @@
+"""Binning and aggregation of measurements along one axis (usually QPS).
+
+Three ways to form bins are supported:
+
+- ``adaptive``: sorted values stay in one bin as long as consecutive values
+  are at most ``width`` apart, so the bins follow the clusters of the data
+  (the QPS targets of an mcperf sweep),
+- ``fixed``: bins of ``width`` starting at a multiple of ``width``,
+- ``quantile``: ``n_bins`` bins with (roughly) the same number of samples.
+
+The bin of every sample is computed with array operations and the statistics
+of all bins with one grouped aggregation, so millions of samples are fine.
+"""
+
+import numpy as np
+import pandas as pd
+
+BIN_METHODS = ["adaptive", "fixed", "quantile"]
+
+
+def assign_bins(x, method="adaptive", width=None, n_bins=None):
+    """Bin id of every value of ``x``, bin ids increase with the values."""
+    x = np.asarray(x, dtype=np.float64)
+    if len(x) == 0:
+        return np.zeros(0, dtype=np.int64)
+
+    if method == "adaptive":
+        order = np.argsort(x, kind="stable")
+        # a new bin starts wherever the gap to the previous value is too big
+        gaps = np.diff(x[order]) > width
+        bins = np.empty(len(x), dtype=np.int64)
+        bins[order] = np.concatenate([[0], np.cumsum(gaps)])
+        return bins
+    if method == "fixed":
+        return np.floor(x / width).astype(np.int64)
+    if method == "quantile":
+        edges = np.unique(np.quantile(x, np.linspace(0, 1, n_bins + 1)))
+        return np.clip(np.searchsorted(edges, x, side="right") - 1, 0, len(edges) - 2)
+    raise ValueError(f"Unknown bin method {method}, use one of {BIN_METHODS}")
+
+
+def _quantile(stat):
+    """Quantile of a percentile name like p5, p95 or p999, None for other stats."""
+    digits = stat[1:]
+    if not stat.startswith("p") or not digits.isdigit():
+        return None
+    return int(digits) / 10 ** max(len(digits), 2)
+
+
+def aggregate_bins(
+    x, values, method="adaptive", width=None, n_bins=None, stats=("mean",)
+):
+    """Aggregate ``values`` (dict of name -> array) over the bins of ``x``.
+
+    Returns a DataFrame with one row per non-empty bin, ordered by ``x``, with
+    the columns ``x_mean``, ``count`` and ``<name>_<stat>`` for every value and
+    statistic (``mean``, ``std``, ``min``, ``max``, ``median`` or percentiles
+    like ``p95`` and ``p999``).
+    """
+    df = pd.DataFrame({"x": np.asarray(x, dtype=np.float64)})
+    for name, column in values.items():
+        df[name] = np.asarray(column, dtype=np.float64)
+    df["bin"] = assign_bins(df["x"], method, width, n_bins)
+
+    grouped = df.groupby("bin", sort=True)
+    result = pd.DataFrame({"x_mean": grouped["x"].mean(), "count": grouped.size()})
+    for name in values:
+        for stat in stats:
+            q = _quantile(stat)
+            if q is None:
+                result[f"{name}_{stat}"] = grouped[name].agg(stat)
+            else:
+                result[f"{name}_{stat}"] = grouped[name].quantile(q)
+    return result.reset_index(drop=True)
@@ -0,0 +1,387 @@
+#!/usr/bin/env python3
+"""Rebuild the derived artifacts (converted logs, CSVs, figures) that are stale.
+
+Every analysis script is declared as a rule with its command, the files it
+reads and the files it writes. A rule runs when one of its outputs is
+missing, or when the content of an input, of its script or of the analysis
+package changed since its last successful run, or when an output was changed
+by hand. A rule that reads the output of another rule runs after it;
+independent rules run in parallel.
+
+Hashes are kept in ``.analysis_cache/build.json``; files whose size and mtime
+did not change are not hashed again.
+
+Usage:
+    python -m analysis.build                 # everything that is stale
+    python -m analysis.build part4-figures   # one rule and what it needs
+    python -m analysis.build --list | --dry-run | --force | --jobs 4
+"""
+
+import argparse
+import glob
+import json
+import os
+import subprocess
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from analysis import cache
+from analysis.plot_runner import discover_part3, discover_part4
+
+STATE_PATH = os.path.join(cache.CACHE_DIR, "build.json")
+
+
+def _paths(*patterns):
+    """Files matching glob patterns relative to the repository root, sorted."""
+    paths = set()
+    for pattern in patterns:
+        paths.update(glob.glob(os.path.join(cache.REPO_ROOT, pattern)))
+    return sorted(paths)
+
+
+def _relative(paths):
+    return [os.path.relpath(path, cache.REPO_ROOT) for path in paths]
+
+
+class Rule:
+    def __init__(self, name, command, cwd, script, inputs, outputs, manual=False):
+        self.name = name
+        self.command = command
+        # relative to the repository root
+        self.cwd = cwd
+        self.script = script
+        self.inputs = inputs
+        self.outputs = outputs
+        # manual rules (experiments on the cluster) only run when named
+        self.manual = manual
+
+    def code(self):
+        return [self.script] + _relative(_paths("analysis/*.py"))
+
+
+def _convert_rule():
+    logs = _relative(_paths("part4/part4_2_logs_run2/scheduler_*.log"))
+    return Rule(
+        "part4-convert-logs",
+        [sys.executable, "convert_log_format.py"],
+        "part4/scheduler",
+        "part4/scheduler/convert_log_format.py",
+        logs,
+        [log.replace(".log", "_converted.txt") for log in logs],
+    )
+
+
+def _job_data_rule():
+    directory = "part4/part4_4_logs/7s_interval"
+    runs = [1, 2, 3]
+    outputs = []
+    for run in runs:
+        outputs += [
+            f"{directory}/job_times/job_start_end_times/job_times_policy1_run{run}.csv",
+            f"{directory}/job_times/memcached_cpu_usage/memcached_cpu_usage_policy1_run{run}.csv",
+            f"{directory}/job_times/job_exec_times/job_tot_exec_times_policy1_run{run}.csv",
+        ]
+    outputs.append(f"{directory}/job_times/job_stat_exec_times/job_stat_exec_times_policy1.csv")
+    return Rule(
+        "part4-job-data",
+        [sys.executable, "part4/extract_job_data.py"],
+        ".",
+        "part4/extract_job_data.py",
+        [f"{directory}/scheduler_policy1_run{run}.log" for run in runs],
+        outputs,
+    )
+
+
+def _figures_rule(part, tasks, script):
+    inputs = sorted({path for task in tasks for path in task.inputs})
+    outputs = sorted({path for task in tasks for path in task.outputs})
+    return Rule(
+        f"{part}-figures",
+        [sys.executable, "-m", "analysis.plot_runner", "--only", part],
+        ".",
+        script,
+        _relative(inputs),
+        _relative(outputs),
+    )
+
+
+def _part1_rules():
+    logs = _relative(_paths("part1/logs/benchmark_results_*.txt"))
+    scripts = {
+        "vis_part_1.py": ["memcached_benchmark_results.png"],
+        "vis_part_all.py": [
+            "combined_p95_qps.png",
+            "memcached_benchmark_combined.png",
+            "memcached_benchmark_combined_log.png",
+        ],
+        "vis_qps_latency.py": ["memcached_p95_qps_plot.png"],
+    }
+    return [
+        Rule(
+            f"part1-{script[:-3].replace('_', '-')}",
+            [sys.executable, script],
+            "part1",
+            f"part1/{script}",
+            logs,
+            [f"part1/{output}" for output in outputs],
+        )
+        for script, outputs in scripts.items()
+    ]
+
+
+def _part2_rules():
+    results = "part2/task1/parsec_results/all_results.csv"
+    return [
+        Rule(
+            "part2-gen-logs",
+            [sys.executable, "gen_logs_interference.py"],
+            "part2/task1",
+            "part2/task1/gen_logs_interference.py",
+            [],
+            [results],
+            manual=True,
+        ),
+        Rule(
+            "part2-vis-logs",
+            [
+                sys.executable,
+                "vis_logs_interference.py",
+                "parsec_results/all_results.csv",
+                "--output-dir",
+                "visualizations",
+            ],
+            "part2/task1",
+            "part2/task1/vis_logs_interference.py",
+            [results],
+            [
+                "part2/task1/visualizations/normalized_times.csv",
+                "part2/task1/visualizations/normalized_times_ci.csv",
+                "part2/task1/visualizations/interference_heatmap.png",
+                "part2/task1/visualizations/interference_bars.png",
+            ],
+        ),
+    ]
+
+
+def _capacity_rule():
+    return Rule(
+        "capacity",
+        [sys.executable, "-m", "analysis.capacity"],
+        ".",
+        "analysis/capacity.py",
+        _relative(
+            _paths(
+                "part1/logs/benchmark_results_*.txt",
+                "part4/4_1_a_c_logs_run*/experiment*.txt",
+                "part4/4_1_d_logs/*",
+            )
+        ),
+        ["part4/plots/capacity/max_qps.csv", "part4/scheduler/thresholds.json"],
+    )
+
+
+def declare_rules():
+    return (
+        _part1_rules()
+        + _part2_rules()
+        + [
+            _capacity_rule(),
+            _figures_rule("part3", discover_part3(), "part3/vis_plots.py"),
+            _convert_rule(),
+            _job_data_rule(),
+            _figures_rule("part4", discover_part4(), "part4/analyze_job_times.py"),
+        ]
+    )
+
+
+def dependencies(rules):
+    """Rule name -> names of the rules producing one of its inputs."""
+    producers = {output: rule.name for rule in rules for output in rule.outputs}
+    return {
+        rule.name: sorted(
+            {producers[path] for path in rule.inputs if path in producers} - {rule.name}
+        )
+        for rule in rules
+    }
+
+
+class HashState:
+    """Content hashes of files, reusing the last hash while size and mtime match."""
+
+    def __init__(self, files):
+        self.files = files
+
+    def hash(self, path):
+        full_path = os.path.join(cache.REPO_ROOT, path)
+        if not os.path.exists(full_path):
+            return None
+        stat = os.stat(full_path)
+        known = self.files.get(path)
+        if known and known["size"] == stat.st_size and known["mtime_ns"] == stat.st_mtime_ns:
+            return known["sha1"]
+        digest = cache.file_hash(full_path)
+        self.files[path] = {"size": stat.st_size, "mtime_ns": stat.st_mtime_ns, "sha1": digest}
+        return digest
+
+    def fingerprint(self, paths):
+        return {path: self.hash(path) for path in paths}
+
+
+def _read_state():
+    try:
+        with open(STATE_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"files": {}, "rules": {}}
+
+
+def _write_state(state):
+    os.makedirs(os.path.dirname(STATE_PATH), exist_ok=True)
+    tmp_path = f"{STATE_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, STATE_PATH)
+
+
+def stale_reason(rule, record, hashes):
+    """Why the rule has to run, None if it is up to date."""
+    missing = [path for path in rule.outputs if hashes.hash(path) is None]
+    if missing:
+        return f"missing {missing[0]}" + (f" (+{len(missing) - 1})" if len(missing) > 1 else "")
+    if record is None:
+        return "never built"
+    for key, paths in [("inputs", rule.inputs), ("code", rule.code()), ("outputs", rule.outputs)]:
+        current = hashes.fingerprint(paths)
+        recorded = record.get(key, {})
+        changed = sorted(
+            path for path in set(current) | set(recorded) if current.get(path) != recorded.get(path)
+        )
+        if changed:
+            return f"{key} changed: {changed[0]}" + (f" (+{len(changed) - 1})" if len(changed) > 1 else "")
+    return None
+
+
+def select(rules, targets):
+    """The named rules and all rules they depend on, or all automatic rules."""
+    by_name = {rule.name: rule for rule in rules}
+    if not targets:
+        return [rule for rule in rules if not rule.manual]
+    deps = dependencies(rules)
+    selected = set()
+    pending = list(targets)
+    while pending:
+        name = pending.pop()
+        if name not in by_name:
+            raise SystemExit(f"unknown rule {name}, see --list")
+        if name not in selected:
+            selected.add(name)
+            # manual producers are only run when they are named themselves
+            pending += [dep for dep in deps[name] if not by_name[dep].manual or dep in targets]
+    return [rule for rule in rules if rule.name in selected]
+
+
+def _run_rule(rule):
+    start = time.time()
+    result = subprocess.run(
+        rule.command,
+        cwd=os.path.join(cache.REPO_ROOT, rule.cwd),
+        env={**os.environ, "MPLBACKEND": "Agg"},
+        capture_output=True,
+        text=True,
+    )
+    return result, time.time() - start
+
+
+def build(rules, jobs=None, force=False, dry_run=False):
+    """Run the stale rules in dependency order, returns the number of failures."""
+    state = _read_state()
+    hashes = HashState(state["files"])
+    deps = dependencies(rules)
+    names = {rule.name for rule in rules}
+    by_name = {rule.name: rule for rule in rules}
+
+    done = set()
+    failed = set()
+    running = {}
+    waiting = [rule.name for rule in rules]
+
+    def ready(name):
+        return all(dep in done or dep not in names for dep in deps[name])
+
+    with ThreadPoolExecutor(max_workers=jobs or os.cpu_count()) as pool:
+        while waiting or running:
+            for name in list(waiting):
+                if any(dep in failed for dep in deps[name]):
+                    waiting.remove(name)
+                    failed.add(name)
+                    print(f"skip   {name}: a dependency failed")
+                elif ready(name):
+                    waiting.remove(name)
+                    rule = by_name[name]
+                    missing_inputs = [path for path in rule.inputs if hashes.hash(path) is None]
+                    reason = "forced" if force else stale_reason(rule, state["rules"].get(name), hashes)
+                    if missing_inputs:
+                        failed.add(name)
+                        print(f"fail   {name}: missing input {missing_inputs[0]}")
+                    elif reason is None:
+                        done.add(name)
+                        print(f"ok     {name}")
+                    elif dry_run:
+                        done.add(name)
+                        print(f"stale  {name}: {reason}")
+                    else:
+                        print(f"build  {name}: {reason}")
+                        running[pool.submit(_run_rule, rule)] = name
+
+            if not running:
+                continue
+            finished, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in finished:
+                name = running.pop(future)
+                rule = by_name[name]
+                result, seconds = future.result()
+                if result.returncode != 0:
+                    failed.add(name)
+                    output = (result.stdout + result.stderr).strip().splitlines()
+                    print(f"FAILED {name} ({seconds:.1f}s): " + (output[-1] if output else ""))
+                    continue
+                done.add(name)
+                state["rules"][name] = {
+                    "inputs": hashes.fingerprint(rule.inputs),
+                    "code": hashes.fingerprint(rule.code()),
+                    "outputs": hashes.fingerprint(rule.outputs),
+                }
+                print(f"built  {name} ({seconds:.1f}s)")
+
+    if not dry_run:
+        _write_state(state)
+    return len(failed)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Rebuild stale analysis artifacts")
+    parser.add_argument("targets", nargs="*", help="rules to build (default: all automatic rules)")
+    parser.add_argument("--jobs", type=int, default=None, help="rules run in parallel")
+    parser.add_argument("--force", action="store_true", help="run the selected rules even if up to date")
+    parser.add_argument("--dry-run", action="store_true", help="only report what is stale")
+    parser.add_argument("--list", action="store_true", help="list the rules and their dependencies")
+    args = parser.parse_args()
+
+    rules = declare_rules()
+    if args.list:
+        deps = dependencies(rules)
+        for rule in rules:
+            manual = " (manual)" if rule.manual else ""
+            after = f" after {', '.join(deps[rule.name])}" if deps[rule.name] else ""
+            print(f"{rule.name}{manual}: {len(rule.inputs)} inputs, {len(rule.outputs)} outputs{after}")
+        return
+
+    start = time.time()
+    failed = build(select(rules, args.targets), args.jobs, args.force, args.dry_run)
+    print(f"done in {time.time() - start:.1f}s" + (f", {failed} failed" if failed else ""))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""On-disk cache for parsed experiment logs.
+
+Parsed logs are stored column by column in an ``.npz`` file below
+``.analysis_cache/<kind>/`` in the repository root (or ``$ANALYSIS_CACHE_DIR``).
+An entry is valid as long as the source file has the same size and mtime. If
+only the mtime changed (e.g. after a fresh checkout or copy) the content hash
+decides, so unchanged logs are never parsed twice.
+
+Set ``ANALYSIS_CACHE=0`` to bypass the cache.
+"""
+
+import hashlib
+import json
+import os
+import numpy as np
+import pandas as pd
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+CACHE_DIR = os.environ.get(
+    "ANALYSIS_CACHE_DIR", os.path.join(REPO_ROOT, ".analysis_cache")
+)
+
+META_KEY = "__meta__"
+
+
+def cache_enabled():
+    return os.environ.get("ANALYSIS_CACHE", "1") != "0"
+
+
+def file_hash(file_path):
+    sha = hashlib.sha1()
+    with open(file_path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            sha.update(chunk)
+    return sha.hexdigest()
+
+
+def _entry_path(file_path, kind):
+    key = hashlib.sha1(os.path.abspath(file_path).encode("utf-8")).hexdigest()
+    return os.path.join(CACHE_DIR, kind, f"{key}.npz")
+
+
+def _to_columns(value):
+    """Split a parsed result into named arrays that np.savez can store."""
+    if isinstance(value, pd.DataFrame):
+        columns = {}
+        for name in value.columns:
+            column = value[name].to_numpy()
+            if column.dtype == object:
+                column = column.astype(str)
+            columns[str(name)] = column
+        return "dataframe", columns
+    if isinstance(value, np.ndarray) and value.dtype.names:
+        return "records", {name: value[name] for name in value.dtype.names}
+    return "arrays", {name: np.asarray(array) for name, array in value.items()}
+
+
+def _from_columns(value_type, columns):
+    if value_type == "dataframe":
+        return pd.DataFrame(columns)
+    if value_type == "records":
+        dtype = [(name, array.dtype) for name, array in columns.items()]
+        length = len(next(iter(columns.values()), []))
+        data = np.empty(length, dtype=dtype)
+        for name, array in columns.items():
+            data[name] = array
+        return data
+    return columns
+
+
+def _write(entry_path, columns, meta):
+    os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+    # write next to the entry and rename so readers never see half a file
+    tmp_path = f"{entry_path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, **columns, **{META_KEY: np.array(json.dumps(meta))})
+    os.replace(tmp_path, entry_path)
+
+
+def load(file_path, kind, parse, version):
+    """Return ``parse(file_path)``, reusing the cached result if the file is unchanged.
+
+    ``parse`` must return a DataFrame, a structured array or a dict of arrays;
+    the cached value is returned as the same type. ``version`` is the
+    ``CACHE_VERSION`` of the parser's module, it is bumped whenever the parser
+    output changes so old entries are parsed again.
+    """
+    if not cache_enabled():
+        return parse(file_path)
+
+    stat = os.stat(file_path)
+    entry_path = _entry_path(file_path, kind)
+    meta = None
+    columns = None
+
+    if os.path.exists(entry_path):
+        try:
+            with np.load(entry_path, allow_pickle=False) as entry:
+                meta = json.loads(str(entry[META_KEY]))
+                if (
+                    meta.get("version") == version
+                    and meta.get("size") == stat.st_size
+                ):
+                    columns = {
+                        name: entry[name] for name in entry.files if name != META_KEY
+                    }
+        except (OSError, ValueError, KeyError):
+            columns = None
+
+    if columns is not None:
+        if meta["mtime_ns"] == stat.st_mtime_ns:
+            return _from_columns(meta["type"], columns)
+        digest = file_hash(file_path)
+        if meta["sha1"] == digest:
+            # same content, only touched: remember the new mtime
+            meta["mtime_ns"] = stat.st_mtime_ns
+            _write(entry_path, columns, meta)
+            return _from_columns(meta["type"], columns)
+
+    value = parse(file_path)
+    value_type, columns = _to_columns(value)
+    meta = {
+        "type": value_type,
+        "path": os.path.abspath(file_path),
+        "size": stat.st_size,
+        "mtime_ns": stat.st_mtime_ns,
+        "sha1": file_hash(file_path),
+        "version": version,
+    }
+    _write(entry_path, columns, meta)
+    return value
@@ -0,0 +1,284 @@
+#!/usr/bin/env python3
+"""Maximum QPS under the SLO for every measured memcached configuration.
+
+The QPS sweeps of part 1 (one configuration per interference type) and of
+part 4.1 (threads x cores, 4.1 d also with the CPU usage of memcached's cores)
+are fitted with a monotone curve: the p95 latency is fitted as a
+non-decreasing function of the measured QPS (pool adjacent violators) and
+interpolated linearly between the fitted blocks. The capacity is the QPS
+where this curve crosses the SLO. Its confidence interval comes from
+refitting the curve on bootstrap resamples of the measured points.
+
+The 4.1 d sweeps also give the CPU thresholds of the part 4 scheduler:
+
+- CPU_LOW: usage of the single memcached core at the (lower bound of the)
+  1-core capacity, above it memcached gets a second core,
+- CPU_HIGH: summed usage of both cores at ``SCALE_DOWN_MARGIN`` less QPS,
+  below it the load fits on one core again. Scaling down at a lower load than
+  scaling up keeps the scheduler from flipping between 1 and 2 cores around
+  the SLO knee; thresholds closer than ``MIN_CPU_GAP`` are rejected.
+
+The thresholds are a proposal: they are written next to main.py but not
+tracked, check them on a run before using them with ``-t``.
+
+Usage:
+    python -m analysis.capacity [--resamples 1000] [--csv ...] [--thresholds ...]
+"""
+
+import argparse
+import glob
+import json
+import os
+import re
+import numpy as np
+import pandas as pd
+
+from analysis import cache
+from analysis.cpu_samples import read_cpu_usage
+from analysis.mcperf import read_mcperf_log
+from analysis.stats import CONFIDENCE
+
+SLO_MS = {"part1": 1.0, "part4_1": 0.8, "part4_1_d": 0.8}
+N_RESAMPLES = 1000
+
+PART4_1_CONFIGS = {
+    "1": "1 thread, 1 core",
+    "2": "1 thread, 2 cores",
+    "3": "2 threads, 1 core",
+    "4": "2 threads, 2 cores",
+}
+PART4_1_D_CONFIGS = {"1Core2Threads": [0], "2Cores2Threads": [0, 1]}
+# configurations of 4.1 d the scheduler switches between
+SCHEDULER_CONFIGS = ("2 threads, 1 core", "2 threads, 2 cores")
+# scale down at this fraction less QPS than scale up ...
+SCALE_DOWN_MARGIN = 0.2
+# ... and at least this many CPU percent below the 2-core usage at scale up
+MIN_CPU_GAP = 10
+
+CSV_PATH = os.path.join(cache.REPO_ROOT, "part4", "plots", "capacity", "max_qps.csv")
+THRESHOLDS_PATH = os.path.join(cache.REPO_ROOT, "part4", "scheduler", "thresholds.json")
+
+PART1_RE = re.compile(r"benchmark_results_(\w+)_(\d+)\.txt$")
+PART4_1_RE = re.compile(r"experiment(\d)_run(\d+)(?:_new)?\.txt$")
+PART4_1_D_RE = re.compile(r"experiment(\w+)_run(\d+)\.txt$")
+
+
+def _sweep(source, config, file_path, cpu=None):
+    data = read_mcperf_log(file_path).data
+    return pd.DataFrame(
+        {
+            "source": source,
+            "config": config,
+            "run": os.path.relpath(file_path, cache.REPO_ROOT),
+            "qps": data["qps"],
+            "p95_ms": data["p95"] / 1000,
+            "cpu": np.nan if cpu is None else cpu,
+        }
+    )
+
+
+def load_sweeps(root=cache.REPO_ROOT):
+    """All QPS sweeps as one DataFrame (source, config, run, qps, p95_ms, cpu)."""
+    sweeps = []
+    for path in sorted(glob.glob(os.path.join(root, "part1", "logs", "benchmark_results_*.txt"))):
+        match = PART1_RE.search(path)
+        sweeps.append(_sweep("part1", match.group(1), path))
+
+    for path in sorted(glob.glob(os.path.join(root, "part4", "4_1_a_c_logs_run*", "experiment*.txt"))):
+        match = PART4_1_RE.search(path)
+        if match and match.group(1) in PART4_1_CONFIGS:
+            sweeps.append(_sweep("part4_1", PART4_1_CONFIGS[match.group(1)], path))
+
+    for path in sorted(glob.glob(os.path.join(root, "part4", "4_1_d_logs", "experiment*.txt"))):
+        match = PART4_1_D_RE.search(path)
+        if not match or match.group(1) not in PART4_1_D_CONFIGS:
+            continue
+        cores = PART4_1_D_CONFIGS[match.group(1)]
+        cpu_file = os.path.join(os.path.dirname(path), f"cpuUsage{match.group(1)}_run{match.group(2)}.bin")
+        if not os.path.exists(cpu_file):
+            # runs recorded before the binary sampler
+            cpu_file = cpu_file[: -len(".bin")] + ".csv"
+        signal = read_cpu_usage(cpu_file, cores) if os.path.exists(cpu_file) else None
+        data = read_mcperf_log(path).data
+        cpu = None
+        if signal is not None and "ts_start" in data.dtype.names:
+            cpu = signal.interval_means(data["ts_start"], data["ts_end"], empty=np.nan)
+        config = f"2 threads, {len(cores)} core" + ("s" if len(cores) > 1 else "")
+        sweeps.append(_sweep("part4_1_d", config, path, cpu))
+
+    return pd.concat(sweeps, ignore_index=True)
+
+
+def monotone_fit(x, y):
+    """Non-decreasing least squares fit of y over x (pool adjacent violators).
+
+    Returns the mean x and the fitted y of every block, both increasing, as
+    the knots of a piecewise linear curve.
+    """
+    order = np.argsort(x, kind="stable")
+    x = np.asarray(x, dtype=np.float64)[order]
+    y = np.asarray(y, dtype=np.float64)[order]
+    # blocks as (sum of x, sum of y, count)
+    sum_x, sum_y, count = [], [], []
+    for xi, yi in zip(x, y):
+        sum_x.append(xi)
+        sum_y.append(yi)
+        count.append(1)
+        # merge while the last block has a lower mean than the one before
+        while len(count) > 1 and sum_y[-1] * count[-2] < sum_y[-2] * count[-1]:
+            last_x, last_y, last_count = sum_x.pop(), sum_y.pop(), count.pop()
+            sum_x[-1] += last_x
+            sum_y[-1] += last_y
+            count[-1] += last_count
+    count = np.array(count, dtype=np.float64)
+    return np.array(sum_x) / count, np.array(sum_y) / count
+
+
+def crossing(knots_x, knots_y, level):
+    """Smallest x where the curve through the knots reaches level.
+
+    Returns (x, saturated). If the curve stays below the level the largest
+    measured x is returned with saturated True, the real capacity is higher.
+    If it starts above the level the capacity is 0.
+    """
+    above = np.flatnonzero(knots_y >= level)
+    if len(above) == 0:
+        return knots_x[-1], True
+    i = above[0]
+    if i == 0:
+        return 0.0, False
+    x0, x1 = knots_x[i - 1], knots_x[i]
+    y0, y1 = knots_y[i - 1], knots_y[i]
+    return x0 + (level - y0) * (x1 - x0) / (y1 - y0), False
+
+
+def run_capacity(file_path, slo_ms):
+    """Capacity of a single sweep (mcperf output file), None without rows."""
+    if not os.path.exists(file_path):
+        return None
+    data = read_mcperf_log(file_path).data
+    if len(data) == 0:
+        return None
+    return float(crossing(*monotone_fit(data["qps"], data["p95"] / 1000), slo_ms)[0])
+
+
+def max_qps(qps, p95_ms, slo_ms, n_resamples=N_RESAMPLES, confidence=CONFIDENCE, seed=0):
+    """Capacity at the SLO with a percentile bootstrap interval.
+
+    Returns (max_qps, ci_low, ci_high, saturated).
+    """
+    qps = np.asarray(qps, dtype=np.float64)
+    p95_ms = np.asarray(p95_ms, dtype=np.float64)
+    estimate, saturated = crossing(*monotone_fit(qps, p95_ms), slo_ms)
+
+    rng = np.random.default_rng(seed)
+    # all resamples are drawn at once, only the fits run per resample
+    indices = rng.integers(0, len(qps), size=(n_resamples, len(qps)))
+    resampled = np.array(
+        [crossing(*monotone_fit(qps[rows], p95_ms[rows]), slo_ms)[0] for rows in indices]
+    )
+    alpha = (1 - confidence) / 2
+    low, high = np.quantile(resampled, [alpha, 1 - alpha])
+    return estimate, float(low), float(high), saturated
+
+
+def capacity_table(sweeps, slo_ms=SLO_MS, n_resamples=N_RESAMPLES, confidence=CONFIDENCE):
+    rows = []
+    for (source, config), sweep in sweeps.groupby(["source", "config"], sort=False):
+        estimate, low, high, saturated = max_qps(
+            sweep["qps"], sweep["p95_ms"], slo_ms[source], n_resamples, confidence
+        )
+        rows.append(
+            {
+                "source": source,
+                "config": config,
+                "slo_ms": slo_ms[source],
+                "runs": sweep["run"].nunique(),
+                "points": len(sweep),
+                "max_qps": round(estimate),
+                "ci_low": round(low),
+                "ci_high": round(high),
+                "saturated": saturated,
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def cpu_at(sweep, qps):
+    """CPU usage of a configuration at a QPS from its monotone CPU curve."""
+    sweep = sweep.dropna(subset=["cpu"])
+    if sweep.empty:
+        return None
+    knots_x, knots_y = monotone_fit(sweep["qps"], sweep["cpu"])
+    return float(np.interp(qps, knots_x, knots_y))
+
+
+def scheduler_thresholds(sweeps, table, margin=SCALE_DOWN_MARGIN, min_gap=MIN_CPU_GAP):
+    """CPU_LOW/CPU_HIGH of part4/scheduler/main.py from the 4.1 d capacity.
+
+    Raises ValueError if the scale-down threshold is not at least ``min_gap``
+    below the 2-core usage at the scale-up point.
+    """
+    one_core, two_cores = SCHEDULER_CONFIGS
+    d_sweeps = sweeps[sweeps["source"] == "part4_1_d"]
+    capacity = table[(table["source"] == "part4_1_d") & (table["config"] == one_core)]
+    if capacity.empty:
+        return None
+    # conservative: switch at the lower confidence bound of the capacity
+    qps_up = float(capacity["ci_low"].iloc[0])
+    qps_down = qps_up * (1 - margin)
+    two_core_sweep = d_sweeps[d_sweeps["config"] == two_cores]
+    cpu_low = cpu_at(d_sweeps[d_sweeps["config"] == one_core], qps_up)
+    cpu_high = cpu_at(two_core_sweep, qps_down)
+    cpu_two_cores_up = cpu_at(two_core_sweep, qps_up)
+    if cpu_low is None or cpu_high is None:
+        return None
+    if cpu_two_cores_up - cpu_high < min_gap:
+        raise ValueError(
+            f"CPU_HIGH {cpu_high:.0f} at {qps_down:.0f} QPS is less than {min_gap} below the "
+            f"2-core usage {cpu_two_cores_up:.0f} at {qps_up:.0f} QPS, increase the margin"
+        )
+    # main.py logs them as integers
+    return {
+        "cpu_low": int(cpu_low),
+        "cpu_high": int(cpu_high),
+        "qps": int(qps_up),
+        "qps_down": int(qps_down),
+        "slo_ms": float(capacity["slo_ms"].iloc[0]),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maximum SLO-compliant QPS per memcached configuration")
+    parser.add_argument("--resamples", type=int, default=N_RESAMPLES, help="bootstrap resamples per configuration")
+    parser.add_argument("--csv", default=CSV_PATH, help="where to write the capacity table")
+    parser.add_argument("--thresholds", default=THRESHOLDS_PATH, help="where to write the scheduler thresholds")
+    args = parser.parse_args()
+
+    sweeps = load_sweeps()
+    table = capacity_table(sweeps, n_resamples=args.resamples)
+
+    os.makedirs(os.path.dirname(args.csv), exist_ok=True)
+    table.to_csv(args.csv, index=False)
+    with pd.option_context("display.width", 200):
+        print(table.to_string(index=False))
+
+    try:
+        thresholds = scheduler_thresholds(sweeps, table)
+    except ValueError as e:
+        print(f"Scheduler thresholds not written: {e}")
+        return
+    if thresholds is None:
+        print("No 4.1 d sweeps with CPU usage, scheduler thresholds not written")
+        return
+    with open(args.thresholds, "w") as f:
+        json.dump(thresholds, f, indent=2)
+        f.write("\n")
+    print(
+        f"Scheduler thresholds: CPU_LOW {thresholds['cpu_low']} at {thresholds['qps']} QPS, "
+        f"CPU_HIGH {thresholds['cpu_high']} at {thresholds['qps_down']} QPS -> {args.thresholds}"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Align the mcperf client clock to the clock of the memcached VM.
+
+mcperf runs on the client-measure VM, the scheduler and its CPU samples on
+the memcached VM, and the two clocks are never reconciled. The load mcperf
+generates is visible on the server as CPU usage of memcached's core 0 (it
+never runs batch jobs), so the offset is the lag that maximizes the
+correlation between the measured QPS of every interval and the mean CPU
+usage of core 0 in the same interval shifted by the lag. The correlation is
+evaluated for all lags at once with the prefix sums of ``SampledSignal`` and
+the peak is refined between grid points with a parabola.
+
+Drift is estimated from the offsets of a few consecutive segments of the run
+(anchors), fitted with least squares. For part 4 mcperf logs without
+per-interval timestamps it also absorbs the error of spreading the intervals
+evenly between ``Timestamp start`` and ``Timestamp end``. The anchors are only
+good to a few tens of ms, over a 15 minute run that is hundreds of ppm of
+apparent drift, far more than the clocks of NTP synced VMs drift. A fitted
+drift above ``MAX_DRIFT_PPM`` is therefore taken as anchor noise and only the
+offset of the whole run is used. Runs where the QPS and the CPU usage do not
+correlate keep the identity mapping.
+"""
+
+import numpy as np
+
+from analysis.cpu_samples import SCHEDULER_SAMPLE_OFFSET_MS
+from analysis.timealign import SampledSignal
+
+MAX_LAG_MS = 10000
+STEP_MS = 50
+SEGMENTS = 4
+# below this correlation the estimate is not trusted
+MIN_CORRELATION = 0.5
+# larger fitted drifts are anchor noise, not clock drift
+MAX_DRIFT_PPM = 50
+
+
+class ClockModel:
+    """server_ms = client_ms + offset_ms + drift * (client_ms - reference_ms)"""
+
+    def __init__(self, offset_ms=0.0, drift=0.0, reference_ms=0.0, correlation=np.nan):
+        self.offset_ms = offset_ms
+        self.drift = drift
+        self.reference_ms = reference_ms
+        self.correlation = correlation
+
+    def apply(self, timestamps_ms):
+        timestamps_ms = np.asarray(timestamps_ms, dtype=np.float64)
+        return timestamps_ms + self.offset_ms + self.drift * (timestamps_ms - self.reference_ms)
+
+    @classmethod
+    def from_anchors(cls, client_ms, server_ms, correlation=np.nan):
+        """Least squares offset and drift from pairs of corresponding times."""
+        client_ms = np.asarray(client_ms, dtype=np.float64)
+        offsets = np.asarray(server_ms, dtype=np.float64) - client_ms
+        reference_ms = client_ms.mean()
+        if len(client_ms) < 2:
+            return cls(float(offsets.mean()), 0.0, reference_ms, correlation)
+        drift, offset_ms = np.polyfit(client_ms - reference_ms, offsets, 1)
+        return cls(float(offset_ms), float(drift), reference_ms, correlation)
+
+    def __repr__(self):
+        return (
+            f"offset {self.offset_ms:+.0f} ms, drift {self.drift * 1e6:+.1f} ppm, "
+            f"correlation {self.correlation:.2f}"
+        )
+
+
+def lag_correlation(starts_ms, ends_ms, values, signal, lags_ms):
+    """Pearson correlation of values with the signal means over the shifted intervals, per lag."""
+    starts = starts_ms[None, :] + lags_ms[:, None]
+    ends = ends_ms[None, :] + lags_ms[:, None]
+    means = signal.interval_means(starts.ravel(), ends.ravel(), empty=np.nan).reshape(starts.shape)
+    # only intervals covered by the signal at every lag
+    covered = ~np.isnan(means).any(axis=0)
+    if covered.sum() < 3:
+        return np.full(len(lags_ms), np.nan)
+    means = means[:, covered] - means[:, covered].mean(axis=1, keepdims=True)
+    values = values[covered] - values[covered].mean()
+    with np.errstate(divide="ignore", invalid="ignore"):
+        return (means @ values) / np.sqrt((means**2).sum(axis=1) * (values**2).sum())
+
+
+def estimate_offset(starts_ms, ends_ms, values, signal, center_ms=0.0, max_lag_ms=MAX_LAG_MS, step_ms=STEP_MS):
+    """Lag (ms) with the highest correlation and that correlation."""
+    lags = center_ms + np.arange(-max_lag_ms, max_lag_ms + step_ms, step_ms, dtype=np.float64)
+    correlation = lag_correlation(starts_ms, ends_ms, values, signal, lags)
+    if np.isnan(correlation).all():
+        return np.nan, np.nan
+    best = int(np.nanargmax(correlation))
+    lag = lags[best]
+    if 0 < best < len(lags) - 1 and not np.isnan(correlation[best - 1 : best + 2]).any():
+        # vertex of the parabola through the peak and its neighbours
+        left, peak, right = correlation[best - 1 : best + 2]
+        curvature = left - 2 * peak + right
+        if curvature < 0:
+            lag += step_ms * 0.5 * (left - right) / curvature
+    return lag, correlation[best]
+
+
+def estimate_clock(
+    starts_ms,
+    ends_ms,
+    values,
+    signal,
+    segments=SEGMENTS,
+    max_lag_ms=MAX_LAG_MS,
+    step_ms=STEP_MS,
+    min_correlation=MIN_CORRELATION,
+    max_drift_ppm=MAX_DRIFT_PPM,
+):
+    """ClockModel mapping the interval times onto the time axis of the signal."""
+    starts_ms = np.asarray(starts_ms, dtype=np.float64)
+    ends_ms = np.asarray(ends_ms, dtype=np.float64)
+    values = np.asarray(values, dtype=np.float64)
+
+    offset, correlation = estimate_offset(starts_ms, ends_ms, values, signal, 0.0, max_lag_ms, step_ms)
+    if np.isnan(offset) or correlation < min_correlation:
+        return ClockModel(correlation=correlation)
+
+    # one anchor per segment, searched close to the global offset
+    anchors_client, anchors_server = [], []
+    for part in np.array_split(np.arange(len(starts_ms)), segments):
+        if len(part) < 10:
+            continue
+        lag, r = estimate_offset(
+            starts_ms[part], ends_ms[part], values[part], signal, offset, 10 * step_ms, step_ms / 5
+        )
+        if not np.isnan(lag) and r >= min_correlation:
+            middle = (starts_ms[part[0]] + ends_ms[part[-1]]) / 2
+            anchors_client.append(middle)
+            anchors_server.append(middle + lag)
+
+    if len(anchors_client) < 2:
+        return ClockModel(offset, correlation=correlation)
+    clock = ClockModel.from_anchors(anchors_client, anchors_server, correlation)
+    if abs(clock.drift) * 1e6 > max_drift_ppm:
+        return ClockModel(offset, correlation=correlation)
+    return clock
+
+
+def align_to_scheduler(starts_ms, ends_ms, qps, scheduler_events, core=0, **kwargs):
+    """ClockModel from mcperf intervals to the scheduler clock, via the CPU usage of a core."""
+    usage = scheduler_events.cpu_usage()
+    if usage.empty or f"core{core}" not in usage:
+        return ClockModel()
+    signal = SampledSignal(
+        usage["timestamp"].to_numpy(np.float64) * 1000 + SCHEDULER_SAMPLE_OFFSET_MS,
+        usage[f"core{core}"].to_numpy(np.float64),
+    )
+    return estimate_clock(starts_ms, ends_ms, qps, signal, **kwargs)
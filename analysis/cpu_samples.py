@@ -0,0 +1,160 @@
+"""Reader for the binary ring files of part4/ansible/cpuUsageMeasurer.py.
+
+The sampler stores raw cumulative counters; utilization is computed here from
+the differences of consecutive records. /proc/stat counts in ticks of
+``user_hz`` (usually 100 per second), so at high sampling rates the per-core
+values are coarse and ``smooth`` can average them over a few samples. The
+cgroup counters are in microseconds and stay exact at any rate.
+
+``read_cpu_usage`` also reads the CSV files of the earlier once-per-second
+sampler and returns either as a SampledSignal of the summed usage of some
+cores.
+"""
+
+import csv
+import json
+import struct
+import numpy as np
+
+from analysis import cache
+from analysis.timealign import SampledSignal, to_epoch_ms
+
+MAGIC = b"CPUSAMP1"
+# bump when the parsed output changes, cached logs are parsed again
+CACHE_VERSION = 2
+
+# Both CPU traces average psutil.cpu_percent over a one second window and are
+# stamped with a truncated second, but at different ends of the window:
+# - the CSV of cpuUsageMeasurer evaluates int(time.time()) before
+#   cpu_percent(interval=1) blocks, so it stamps floor(start) and the middle
+#   of the window lies on average one second after the timestamp,
+# - the scheduler's log record is created after cpu_percent returns, so it
+#   stamps floor(end) and the middle lies on average at the timestamp.
+CPU_SAMPLE_OFFSET_MS = 1000
+SCHEDULER_SAMPLE_OFFSET_MS = 0
+
+
+def read_header(file_path):
+    with open(file_path, "rb") as f:
+        head = f.read(20)
+        if head[:8] != MAGIC:
+            raise ValueError(f"{file_path} is not a CPU sample file")
+        count, meta_len = struct.unpack("<QI", head[8:20])
+        meta = json.loads(f.read(meta_len))
+    meta["count"] = count
+    meta["data_offset"] = (20 + meta_len + 63) // 64 * 64
+    return meta
+
+
+def record_dtype(meta):
+    return np.dtype(
+        [
+            ("timestamp_ns", "<u8"),
+            ("busy", "<u8", (meta["cpus"],)),
+            ("total", "<u8", (meta["cpus"],)),
+            ("cgroup_usec", "<u8", (len(meta["cgroups"]),)),
+        ]
+    )
+
+
+def read_records(file_path):
+    """Raw records in the order they were written."""
+    meta = read_header(file_path)
+    records = np.fromfile(
+        file_path,
+        dtype=record_dtype(meta),
+        count=min(meta["count"], meta["capacity"]),
+        offset=meta["data_offset"],
+    )
+    if meta["count"] > meta["capacity"]:
+        # the ring wrapped around, the oldest record is in the next slot
+        records = np.roll(records, -(meta["count"] % meta["capacity"]))
+    return meta, records
+
+
+def read_cpu_samples(file_path, smooth=1):
+    """CPU utilization between consecutive samples.
+
+    Returns a dict with ``timestamp_ms`` (middle of each sampling period),
+    ``cpu`` (percent per core, shape samples x cores), ``cgroups`` (percent of
+    one core per sampled cgroup) and ``cgroup_names``. With ``smooth`` > 1 the
+    differences are taken over that many samples.
+    """
+    meta, records = read_records(file_path)
+    step = max(int(smooth), 1)
+    timestamps = records["timestamp_ns"].astype(np.float64)
+
+    # counters of consecutive (or every step-th) records
+    elapsed_ns = timestamps[step:] - timestamps[:-step]
+    busy = np.diff(records["busy"].astype(np.int64), n=1, axis=0)
+    total = np.diff(records["total"].astype(np.int64), n=1, axis=0)
+    usage = np.diff(records["cgroup_usec"].astype(np.int64), n=1, axis=0)
+    if step > 1:
+        busy = _window_sum(busy, step)
+        total = _window_sum(total, step)
+        usage = _window_sum(usage, step)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        cpu = np.where(total > 0, 100.0 * busy / total, 0.0)
+        cgroups = 100.0 * usage * 1000 / elapsed_ns[:, None]
+
+    return {
+        "timestamp_ms": (timestamps[step:] + timestamps[:-step]) / 2 / 1e6,
+        "cpu": cpu,
+        "cgroups": cgroups,
+        "cgroup_names": np.array(meta["cgroups"], dtype=str),
+    }
+
+
+def _window_sum(values, step):
+    """Sums of ``step`` consecutive rows, one per window position."""
+    cumulative = np.concatenate([np.zeros((1, values.shape[1]), values.dtype), np.cumsum(values, axis=0)])
+    return cumulative[step:] - cumulative[:-step]
+
+
+def parse_cpu_usage(file_path: str):
+    """Parse a cpuUsageMeasurer CSV into timestamps and per-core CPU percentages."""
+    timestamps = []
+    per_core = []
+    with open(file_path, "r") as f:
+        reader = csv.reader(f)
+        for row in reader:
+            if not row:  # Skip empty lines
+                continue
+            try:
+                timestamp = int(row[0])
+                # Parse the CPU percentages from individual columns
+                cpu_percentages = []
+                for val in row[1:-1]:  # Skip timestamp and last column
+                    # Remove any spaces and convert to float
+                    cleaned_val = val.strip(" []")
+                    if cleaned_val:  # Only add non-empty values
+                        cpu_percentages.append(float(cleaned_val))
+            except ValueError:
+                continue
+            if per_core and len(cpu_percentages) != len(per_core[0]):
+                continue
+            timestamps.append(timestamp)
+            per_core.append(cpu_percentages)
+    return {
+        "timestamp": np.array(timestamps, dtype=np.int64),
+        "cpu": np.array(per_core, dtype=np.float64).reshape(len(per_core), -1),
+    }
+
+
+def read_cpu_usage(file_path: str, cores: list[int]):
+    """Summed usage of the cores from a sample file (.bin) or CSV as a SampledSignal, None if unavailable."""
+    if file_path.endswith(".bin"):
+        samples = cache.load(file_path, "cpu_samples", read_cpu_samples, CACHE_VERSION)
+        if max(cores) >= samples["cpu"].shape[1]:
+            return None
+        return SampledSignal(samples["timestamp_ms"], samples["cpu"][:, cores].sum(axis=1))
+
+    # the parsed file is cached, only the core selection is redone on each call
+    cpu_usage = cache.load(file_path, "cpu_usage", parse_cpu_usage, CACHE_VERSION)
+    if len(cpu_usage["timestamp"]) == 0 or max(cores) >= cpu_usage["cpu"].shape[1]:
+        return None
+    total_cpu = cpu_usage["cpu"][:, cores].sum(axis=1)
+    return SampledSignal(
+        to_epoch_ms(cpu_usage["timestamp"]) + CPU_SAMPLE_OFFSET_MS, total_cpu
+    )
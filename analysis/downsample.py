@@ -0,0 +1,114 @@
+"""Reduce long time series to a fixed number of points before plotting.
+
+A figure is at most a few thousand pixels wide, so more points than that only
+make rendering slow and the files big. Two reductions are offered:
+
+- ``lttb``: Largest-Triangle-Three-Buckets keeps the point of every bucket
+  that spans the largest triangle with the point kept in the previous bucket
+  and the mean of the next one, which preserves the shape of smooth signals
+  (QPS, CPU usage),
+- ``minmax``/``envelope``: the minimum and maximum of every bucket, which
+  keeps every spike of tail latency (an SLO violation can never be averaged
+  or skipped away).
+
+Series with at most ``max_points`` points are returned unchanged, so plots of
+the current runs look exactly as before.
+"""
+
+import numpy as np
+import pandas as pd
+
+# 10 inch figures at 300 dpi are 3000 pixels wide
+MAX_POINTS = 2000
+
+
+def _bucket_edges(n, n_buckets):
+    """Index boundaries of ``n_buckets`` buckets of (almost) equal size."""
+    return np.linspace(0, n, n_buckets + 1).astype(np.int64)
+
+
+def lttb(x, y, max_points=MAX_POINTS):
+    """Indices of the points kept by Largest-Triangle-Three-Buckets.
+
+    The first and last point are always kept, the remaining points are split
+    into ``max_points - 2`` buckets of one point each.
+    """
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    n = len(x)
+    if n <= max_points or max_points < 3:
+        return np.arange(n)
+
+    edges = _bucket_edges(n - 2, max_points - 2) + 1
+    # mean of every bucket, the third corner of the triangles of the previous one
+    counts = np.diff(edges)
+    mean_x = np.add.reduceat(x[1:-1], edges[:-1] - 1) / counts
+    mean_y = np.add.reduceat(y[1:-1], edges[:-1] - 1) / counts
+    mean_x = np.append(mean_x[1:], x[-1])
+    mean_y = np.append(mean_y[1:], y[-1])
+
+    kept = np.empty(max_points, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        # twice the triangle area, the constant factor does not change the argmax
+        area = np.abs(
+            (x[previous] - mean_x[bucket]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (mean_y[bucket] - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+
+def minmax(y, max_points=MAX_POINTS):
+    """Indices of the minimum and maximum of ``max_points // 2`` buckets, in order."""
+    y = np.asarray(y, dtype=np.float64)
+    n = len(y)
+    if n <= max_points:
+        return np.arange(n)
+
+    edges = _bucket_edges(n, max(max_points // 2, 1))
+    starts, counts = edges[:-1], np.diff(edges)
+    kept = []
+    for reduce in (np.minimum, np.maximum):
+        extreme = np.repeat(reduce.reduceat(y, starts), counts)
+        # first point of every bucket that equals the bucket's extreme
+        hits = np.flatnonzero(y == extreme)
+        _, first = np.unique(np.searchsorted(edges, hits, side="right"), return_index=True)
+        kept.append(hits[first])
+    return np.unique(np.concatenate(kept))
+
+
+def envelope(df, x_start, x_end, y, max_points=MAX_POINTS):
+    """Merge consecutive intervals into at most ``max_points`` wider ones.
+
+    Returns a DataFrame with ``x_start``/``x_end`` of the first/last interval
+    of every bucket and ``<y>_min``, ``<y>_mean``, ``<y>_max`` of ``y``. With
+    few enough rows every bucket is one interval.
+    """
+    n = len(df)
+    edges = _bucket_edges(n, min(n, max_points))
+    starts, ends = edges[:-1], edges[1:] - 1
+    values = df[y].to_numpy(dtype=np.float64)
+    return pd.DataFrame(
+        {
+            x_start: df[x_start].to_numpy()[starts],
+            x_end: df[x_end].to_numpy()[ends],
+            f"{y}_min": np.minimum.reduceat(values, starts) if n else values,
+            f"{y}_mean": np.add.reduceat(values, starts) / np.diff(edges) if n else values,
+            f"{y}_max": np.maximum.reduceat(values, starts) if n else values,
+        }
+    )
+
+
+def downsample(df, x, y, method="lttb", max_points=MAX_POINTS):
+    """Rows of ``df`` kept by ``lttb`` or ``minmax`` for plotting ``y`` over ``x``."""
+    if method == "lttb":
+        kept = lttb(df[x], df[y], max_points)
+    elif method == "minmax":
+        kept = minmax(df[y], max_points)
+    else:
+        raise ValueError(f"Unknown downsampling method {method}, use lttb or minmax")
+    return df.iloc[kept]
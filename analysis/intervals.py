@@ -0,0 +1,87 @@
+"""Reconstruct execution intervals of batch jobs from status transitions.
+
+A job is running from a ``RUNNING`` status until the next ``PAUSED`` or
+``COMPLETED`` status. Repeated statuses (the scheduler logs the status of
+every job each second) and any other status do not change the state. The
+transitions of all jobs are found with grouped array operations instead of a
+hand-written state machine per job, so any set of job names works.
+"""
+
+import numpy as np
+import pandas as pd
+
+START_STATUSES = ["RUNNING"]
+END_STATUSES = ["PAUSED", "COMPLETED"]
+
+
+def build_intervals(
+    status_df, job_col="job_name", time_col="timestamp", status_col="status"
+):
+    """Turn a table of (job, timestamp, status) rows into execution intervals.
+
+    Rows are taken in their order per job. Returns a DataFrame with the
+    columns ``job``, ``start`` and ``end``, one row per interval; ``end`` is NaN
+    for a job that was still running at the end of the log.
+    """
+    if status_df.empty:
+        return pd.DataFrame(
+            {"job": pd.Series(dtype=str), "start": [], "end": []}
+        )
+
+    jobs = status_df[job_col].astype(str).str.strip().to_numpy()
+    status = status_df[status_col].astype(str).str.strip().to_numpy()
+    timestamps = status_df[time_col].to_numpy()
+
+    # keep the log order within each job
+    order = np.argsort(jobs, kind="stable")
+    jobs, status, timestamps = jobs[order], status[order], timestamps[order]
+
+    is_start = np.isin(status, START_STATUSES)
+    is_end = np.isin(status, END_STATUSES)
+
+    # running state after each row: 1 / 0 for transitions, carried forward
+    # within the job over rows that do not change the state
+    state = pd.Series(np.where(is_start, 1.0, np.where(is_end, 0.0, np.nan)))
+    state = state.groupby(jobs).ffill()
+    previous = state.groupby(jobs).shift(1).fillna(0).to_numpy()
+
+    starts = is_start & (previous == 0)
+    ends = is_end & (previous == 1)
+
+    start_df = pd.DataFrame({"job": jobs[starts], "start": timestamps[starts]})
+    end_df = pd.DataFrame({"job": jobs[ends], "end": timestamps[ends]})
+    # starts and ends alternate, the n-th end closes the n-th start of a job
+    start_df["n"] = start_df.groupby("job").cumcount()
+    end_df["n"] = end_df.groupby("job").cumcount()
+
+    intervals = start_df.merge(end_df, on=["job", "n"], how="left")
+    return intervals.drop(columns="n").sort_values(["start", "job"], ignore_index=True)
+
+
+def total_execution_times(intervals, jobs=None):
+    """Summed length of the finished intervals per job.
+
+    Jobs listed in ``jobs`` that never ran are reported with 0.
+    """
+    finished = intervals.dropna(subset=["end"])
+    totals = (finished["end"] - finished["start"]).groupby(finished["job"]).sum()
+    if jobs is not None:
+        totals = totals.reindex(sorted(set(jobs) | set(totals.index)), fill_value=0)
+    return totals
+
+
+def intervals_to_events(intervals, start_event="START", end_event="END"):
+    """Flatten intervals into one row per start and end event, sorted by time."""
+    finished = intervals.dropna(subset=["end"])
+    events = pd.concat(
+        [
+            pd.DataFrame(
+                {"timestamp": intervals["start"], "job": intervals["job"], "event": start_event}
+            ),
+            pd.DataFrame(
+                {"timestamp": finished["end"], "job": finished["job"], "event": end_event}
+            ),
+        ],
+        ignore_index=True,
+    )
+    return events.sort_values("timestamp", kind="stable", ignore_index=True)
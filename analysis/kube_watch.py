@@ -0,0 +1,142 @@
+"""Wait for Kubernetes objects with the watch API instead of polling kubectl.
+
+``wait_for`` lists the object once (its state and the resourceVersion of the
+list), then watches from that resourceVersion, so no change between the list
+and the watch is missed and every change is seen as soon as the API server
+sends it. A watch that expired (410 Gone) is restarted with a new list; a
+watch that ends without a decision is resumed from the last resourceVersion
+until the overall timeout.
+
+The API objects are passed in (``core_api``/``batch_api``), by default they
+are created from the kubeconfig, so the waits also work against a fake API
+server configured with ``kubernetes.client.Configuration(host=...)``.
+"""
+
+import time
+
+# longest single watch request, the server ends it and it is resumed
+WATCH_CHUNK_S = 60
+HTTP_GONE = 410
+
+_apis = {}
+
+
+def default_apis():
+    """CoreV1Api and BatchV1Api of the current kubeconfig context (created once)."""
+    if not _apis:
+        from kubernetes import client, config
+
+        config.load_kube_config()
+        _apis["core"] = client.CoreV1Api()
+        _apis["batch"] = client.BatchV1Api()
+    return _apis["core"], _apis["batch"]
+
+
+def wait_for(list_func, name, condition, timeout, namespace="default"):
+    """Watch the object ``name`` until ``condition`` decides.
+
+    ``condition(obj)`` is called with the object after every change (``None``
+    while it does not exist or after it was deleted) and returns True or False
+    to stop waiting with that result, or None to keep waiting. Returns None if
+    the timeout (seconds) passes first.
+    """
+    from kubernetes import watch
+    from kubernetes.client.rest import ApiException
+    from urllib3.exceptions import ReadTimeoutError
+
+    deadline = time.monotonic() + timeout
+    field_selector = f"metadata.name={name}"
+    resource_version = None
+    while True:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+
+        if resource_version is None:
+            listed = list_func(namespace, field_selector=field_selector)
+            resource_version = listed.metadata.resource_version
+            result = condition(listed.items[0] if listed.items else None)
+            if result is not None:
+                return result
+
+        stream = watch.Watch()
+        try:
+            for event in stream.stream(
+                list_func,
+                namespace,
+                field_selector=field_selector,
+                resource_version=resource_version,
+                allow_watch_bookmarks=True,
+                timeout_seconds=max(1, int(min(remaining, WATCH_CHUNK_S))),
+                # in case the server does not end the watch in time
+                _request_timeout=min(remaining, WATCH_CHUNK_S) + 1,
+            ):
+                if event["type"] == "BOOKMARK":
+                    # bookmarks are not deserialized, their object is a dict
+                    resource_version = event["raw_object"]["metadata"]["resourceVersion"]
+                    continue
+                obj = event["object"]
+                resource_version = obj.metadata.resource_version
+                result = condition(None if event["type"] == "DELETED" else obj)
+                if result is not None:
+                    stream.stop()
+                    return result
+        except ReadTimeoutError:
+            pass
+        except ApiException as e:
+            if e.status != HTTP_GONE:
+                raise
+            # the resourceVersion is too old, start again from a fresh list
+            resource_version = None
+
+
+def wait_for_pod_ready(pod_name, timeout=300, namespace="default", core_api=None):
+    """Wait until the pod is Running and Ready, returns False on timeout."""
+    core_api = core_api or default_apis()[0]
+    phases = []
+
+    def ready(pod):
+        if pod is None:
+            return None
+        phase = pod.status.phase if pod.status else None
+        if not phases or phases[-1] != phase:
+            phases.append(phase)
+            print(f"Pod {pod_name} status: {phase}")
+        conditions = (pod.status.conditions if pod.status else None) or []
+        if phase == "Running" and any(c.type == "Ready" and c.status == "True" for c in conditions):
+            return True
+        return None
+
+    return bool(wait_for(core_api.list_namespaced_pod, pod_name, ready, timeout, namespace))
+
+
+def wait_for_pod_created(pod_name, timeout=60, namespace="default", core_api=None):
+    """Wait until the pod exists, returns False on timeout."""
+    core_api = core_api or default_apis()[0]
+    return bool(
+        wait_for(core_api.list_namespaced_pod, pod_name, lambda pod: True if pod else None, timeout, namespace)
+    )
+
+
+def wait_for_deletion(name, timeout=300, namespace="default", core_api=None):
+    """Wait until the pod is gone, returns False on timeout."""
+    core_api = core_api or default_apis()[0]
+    return bool(
+        wait_for(core_api.list_namespaced_pod, name, lambda pod: True if pod is None else None, timeout, namespace)
+    )
+
+
+def wait_for_job_completion(job_name, timeout=1800, namespace="default", batch_api=None):
+    """Wait until the job succeeded (True) or failed (False), None on timeout."""
+    batch_api = batch_api or default_apis()[1]
+
+    def finished(job):
+        if job is None or job.status is None:
+            return None
+        if (job.status.succeeded or 0) >= 1:
+            return True
+        if (job.status.failed or 0) > 0:
+            return False
+        return None
+
+    return wait_for(batch_api.list_namespaced_job, job_name, finished, timeout, namespace)
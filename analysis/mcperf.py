@@ -0,0 +1,247 @@
+"""Parser for mcperf output files.
+
+mcperf writes one fixed-column ``read`` row per measurement interval below a
+``#type avg std ...`` header. Depending on how it was started, the file also
+contains ``Timestamp start/end`` lines and an interval count (dynamic load in
+part 4) or per-row ``ts_start``/``ts_end`` columns (part 3). All rows of a file
+are converted in one vectorized NumPy call instead of line by line.
+
+This is about 3.3x faster than the old per-line parsers (60k rows: 0.53 s to
+0.16 s), not the 10x that was asked for: nearly all of the remaining time is
+the tokenizer of ``np.loadtxt``, and splitting the text or ``np.fromstring``
+are no faster. Repeated reads come from the analysis cache instead.
+"""
+
+import io
+import re
+import numpy as np
+import pandas as pd
+
+from analysis import cache
+
+# Columns of the mcperf output without the leading "type" column
+DEFAULT_COLUMNS = [
+    "avg",
+    "std",
+    "min",
+    "p5",
+    "p10",
+    "p50",
+    "p67",
+    "p75",
+    "p80",
+    "p85",
+    "p90",
+    "p95",
+    "p99",
+    "p999",
+    "p9999",
+    "qps",
+    "target",
+]
+TIMESTAMP_COLUMNS = ["ts_start", "ts_end"]
+
+INTERVALS_RE = re.compile(r"interval.*?=\s*(\d+)", re.IGNORECASE)
+# bump when the parsed output changes, cached logs are parsed again
+CACHE_VERSION = 2
+
+
+class McPerfLog:
+    """Parsed mcperf file.
+
+    ``data`` is a structured array with one record per ``read`` row. Latency
+    columns are in microseconds, ``ts_start``/``ts_end`` (if present) in epoch
+    milliseconds.
+    """
+
+    def __init__(
+        self, data, timestamp_start=None, timestamp_end=None, num_intervals=None
+    ):
+        self.data = data
+        self.timestamp_start = timestamp_start
+        self.timestamp_end = timestamp_end
+        self.num_intervals = num_intervals
+
+    def __len__(self):
+        return len(self.data)
+
+    def __getitem__(self, column):
+        return self.data[column]
+
+    @property
+    def columns(self):
+        return list(self.data.dtype.names)
+
+    def interval_start_ms(self):
+        """Start of each interval in epoch ms.
+
+        Uses the ``ts_start`` column where mcperf wrote one, otherwise spreads
+        the intervals evenly between ``Timestamp start`` and ``Timestamp end``.
+        """
+        if "ts_start" in self.data.dtype.names:
+            return self.data["ts_start"].astype(np.float64)
+        if self.timestamp_start is None or self.timestamp_end is None:
+            return None
+        count = self.num_intervals or len(self.data)
+        delta = (self.timestamp_end - self.timestamp_start) / count
+        return self.timestamp_start + np.arange(len(self.data)) * delta
+
+    def to_arrays(self):
+        """Plain arrays for the on-disk cache, missing values become empty arrays."""
+        arrays = {"data": self.data}
+        for name in ["timestamp_start", "timestamp_end", "num_intervals"]:
+            value = getattr(self, name)
+            arrays[name] = np.array([] if value is None else [value], dtype=np.int64)
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        scalars = {
+            name: int(arrays[name][0]) if len(arrays[name]) else None
+            for name in ["timestamp_start", "timestamp_end", "num_intervals"]
+        }
+        return cls(arrays["data"], **scalars)
+
+    def to_dataframe(self):
+        df = pd.DataFrame(self.data)
+        timestamps = self.interval_start_ms()
+        if timestamps is not None:
+            df["timestamp_ms"] = timestamps
+        df["p95_us"] = df["p95"]
+        df["p95_ms"] = df["p95"] / 1000
+        return df
+
+
+def header_columns(line):
+    names = line.lstrip("#").split()[1:]
+    return [name.lower() for name in names]
+
+
+def _dtype(columns):
+    return [
+        (name, np.int64 if name in TIMESTAMP_COLUMNS else np.float64)
+        for name in columns
+    ]
+
+
+def _rows_block(text):
+    """Slice of text from the first to the last ``read`` row (inclusive)."""
+    if text.startswith("read"):
+        first = 0
+    elif "\nread" in text:
+        first = text.find("\nread") + 1
+    else:
+        return "", text, ""
+    last = text.rfind("\nread") + 1
+    end = text.find("\n", last)
+    if end == -1:
+        end = len(text)
+    return text[first:end], text[:first], text[end:]
+
+
+def _to_array(block, columns):
+    data = np.zeros(0, dtype=_dtype(columns))
+    if not block:
+        return data
+
+    usecols = range(1, len(columns) + 1)
+    try:
+        # the C tokenizer of loadtxt converts all rows in one call
+        values = np.loadtxt(
+            io.StringIO(block), usecols=usecols, ndmin=2, comments="#"
+        )
+    except ValueError:
+        # a truncated row, garbage inside a row or some other output between
+        # the rows: parse row by row and keep only the rows that parse
+        rows = [parse_mcperf_row(line, columns) for line in block.splitlines()]
+        rows = [row for row in rows if row is not None]
+        data = np.empty(len(rows), dtype=_dtype(columns))
+        for name in columns:
+            data[name] = [row[name] for row in rows]
+        return data
+
+    data = np.empty(len(values), dtype=_dtype(columns))
+    for i, name in enumerate(columns):
+        data[name] = values[:, i]
+    return data
+
+
+def parse_mcperf_text(text):
+    """Parse the content of an mcperf output file into a McPerfLog."""
+    timestamp_start = None
+    timestamp_end = None
+    num_intervals = None
+    columns = None
+
+    block, head, tail = _rows_block(text)
+
+    # metadata only ever appears before the first or after the last row
+    for line in head.splitlines() + tail.splitlines():
+        if line.startswith("#type"):
+            columns = header_columns(line)
+        elif line.startswith("Timestamp start:"):
+            timestamp_start = int(line.split(":")[1])
+        elif line.startswith("Timestamp end:"):
+            timestamp_end = int(line.split(":")[1])
+        elif num_intervals is None and "=" in line:
+            match = INTERVALS_RE.search(line)
+            if match:
+                num_intervals = int(match.group(1))
+
+    if columns is None:
+        columns = DEFAULT_COLUMNS
+        first_row = block.split("\n", 1)[0]
+        if len(first_row.split()) == len(DEFAULT_COLUMNS) + 3:
+            columns = DEFAULT_COLUMNS + TIMESTAMP_COLUMNS
+
+    return McPerfLog(
+        _to_array(block, columns), timestamp_start, timestamp_end, num_intervals
+    )
+
+
+def parse_mcperf_row(line, columns=None):
+    """Parse a single ``read`` row into a dict, None for any other line.
+
+    Used when following a growing log where rows arrive one at a time.
+    """
+    if not line.startswith("read"):
+        return None
+    values = line.split()[1:]
+    if columns is None:
+        columns = DEFAULT_COLUMNS
+        if len(values) == len(DEFAULT_COLUMNS) + 2:
+            columns = DEFAULT_COLUMNS + TIMESTAMP_COLUMNS
+    if len(values) != len(columns):
+        return None
+    try:
+        return {
+            name: int(value) if name in TIMESTAMP_COLUMNS else float(value)
+            for name, value in zip(columns, values)
+        }
+    except ValueError:
+        return None
+
+
+def read_mcperf_log(file_path, use_cache=True):
+    """Read and parse an mcperf output file.
+
+    The parsed file is kept in the analysis cache and only parsed again when
+    the file changes.
+    """
+    if use_cache:
+        arrays = cache.load(
+            file_path,
+            "mcperf",
+            lambda path: read_mcperf_log(path, use_cache=False).to_arrays(),
+            CACHE_VERSION,
+        )
+        return McPerfLog.from_arrays(arrays)
+
+    with open(file_path, "r") as f:
+        return parse_mcperf_text(f.read())
+
+
+def read_mcperf_dataframe(file_path, use_cache=True):
+    """Read an mcperf output file into a DataFrame with derived time/ms columns."""
+    return read_mcperf_log(file_path, use_cache).to_dataframe()
+
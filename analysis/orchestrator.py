@@ -0,0 +1,338 @@
+"""Run the repetitions of an experiment sweep, resumable and in parallel.
+
+A sweep is a list of ``Task``s (one run of one configuration) and a function
+that runs a task on a slot, a set of VMs or a cluster that can host one run
+at a time. Every slot has a worker thread that claims the next planned task;
+with several slots independent runs execute concurrently.
+
+The state of every task is kept in a SQLite database in the repository root
+(``experiments.sqlite``, not tracked and not part of the analysis cache):
+
+    planned  -> running -> done
+                        -> planned again after a failure, retried after an
+                           exponential backoff
+                        -> failed after ``max_attempts`` failures
+
+Tasks left ``running`` by a crashed or interrupted driver are planned again
+when the sweep is restarted, so it resumes where it stopped. A task that is
+not in the database yet but whose outputs already exist (results of a run
+before the orchestrator was used) is recorded as done.
+
+Tasks of the same ``group`` (e.g. all repetitions under one interference) run
+back to back on a slot: ``setup(group, slot)`` is called when a slot starts a
+group and ``teardown(group, slot)`` when it leaves it. Between two runs on the
+same slot ``cooldown`` seconds pass, or ``cooldown(task, slot)`` is called
+with the task that just ran if it is a function (e.g. to wait until the node
+is idle again).
+
+``follow_up(task, orchestrator)`` is called after every finished task and
+returns further tasks to plan (e.g. another repetition of the same
+configuration, see analysis.sequential). It is also called for the finished
+tasks when a sweep is planned, so a resumed sweep rebuilds the same tasks.
+
+Usage (state of all sweeps):
+    python -m analysis.orchestrator [--sweep NAME] [--retry-failed]
+"""
+
+import argparse
+import json
+import os
+import sqlite3
+import sys
+import threading
+import time
+import traceback
+
+from analysis import cache
+
+# the state is not a cache: without it finished outputs are adopted as done,
+# including partial ones of interrupted runs
+STATE_PATH = os.path.join(cache.REPO_ROOT, "experiments.sqlite")
+# where the state was kept before, moved to STATE_PATH on first use
+LEGACY_STATE_PATH = os.path.join(cache.CACHE_DIR, "experiments.sqlite")
+MAX_ATTEMPTS = 3
+BACKOFF_S = 30
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    sweep TEXT NOT NULL,
+    key TEXT NOT NULL,
+    params TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    not_before REAL NOT NULL DEFAULT 0,
+    slot INTEGER,
+    started REAL,
+    finished REAL,
+    error TEXT,
+    PRIMARY KEY (sweep, key)
+);
+"""
+
+
+def _now():
+    return time.time()
+
+
+def _log(message):
+    print(f"[{int(_now())}] {message}", flush=True)
+
+
+class Task:
+    def __init__(self, key, params=None, outputs=(), group=None):
+        self.key = key
+        self.params = params or {}
+        self.outputs = list(outputs)
+        self.group = group
+
+    def __repr__(self):
+        return f"Task({self.key!r})"
+
+
+def outputs_exist(task):
+    return bool(task.outputs) and all(os.path.exists(path) for path in task.outputs)
+
+
+class Orchestrator:
+    def __init__(
+        self,
+        sweep,
+        run,
+        slots=(None,),
+        setup=None,
+        teardown=None,
+        cooldown=0,
+        max_attempts=MAX_ATTEMPTS,
+        backoff=BACKOFF_S,
+        is_done=outputs_exist,
+        follow_up=None,
+        db_path=STATE_PATH,
+    ):
+        self.sweep = sweep
+        self.run_task = run
+        self.slots = list(slots)
+        self.setup = setup
+        self.teardown = teardown
+        self.cooldown = cooldown
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.is_done = is_done
+        self.follow_up = follow_up
+        if db_path == STATE_PATH and not os.path.exists(db_path) and os.path.exists(LEGACY_STATE_PATH):
+            os.replace(LEGACY_STATE_PATH, db_path)
+        os.makedirs(os.path.dirname(db_path), exist_ok=True)
+        self.connection = sqlite3.connect(db_path, check_same_thread=False, isolation_level=None)
+        self.connection.executescript(SCHEMA)
+        self.lock = threading.Lock()
+        self.tasks = []
+
+    def _update(self, key, **values):
+        assignments = ", ".join(f"{column} = ?" for column in values)
+        with self.lock:
+            self.connection.execute(
+                f"UPDATE tasks SET {assignments} WHERE sweep = ? AND key = ?",
+                (*values.values(), self.sweep, key),
+            )
+
+    def add(self, tasks):
+        """Plan tasks that are not part of the sweep yet, adopting finished ones."""
+        # checked and inserted under the lock, two slots that finish sibling
+        # repetitions at the same time may return the same follow-up task
+        with self.lock:
+            known = {task.key for task in self.tasks}
+            new_tasks = []
+            for task in tasks:
+                if task.key not in known:
+                    known.add(task.key)
+                    new_tasks.append(task)
+            in_db = {
+                key for (key,) in self.connection.execute("SELECT key FROM tasks WHERE sweep = ?", (self.sweep,))
+            }
+            rows = [
+                (self.sweep, task.key, json.dumps(task.params), "done" if self.is_done(task) else "planned")
+                for task in new_tasks
+                if task.key not in in_db
+            ]
+            self.connection.execute("BEGIN")
+            try:
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO tasks (sweep, key, params, status) VALUES (?, ?, ?, ?)", rows
+                )
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+            self.connection.execute("COMMIT")
+            self.tasks.extend(new_tasks)
+        return new_tasks
+
+    def plan(self, tasks):
+        """Record new tasks, adopt finished ones and reset interrupted ones."""
+        self.tasks = []
+        self.add(tasks)
+        with self.lock:
+            interrupted = self.connection.execute(
+                "UPDATE tasks SET status = 'planned', slot = NULL WHERE sweep = ? AND status = 'running'",
+                (self.sweep,),
+            ).rowcount
+        if interrupted:
+            _log(f"{self.sweep}: resuming {interrupted} interrupted run(s)")
+
+        # replay the follow-ups of finished tasks until no new task appears
+        pending = list(self.tasks)
+        while self.follow_up and pending:
+            statuses = self.statuses()
+            added = []
+            for task in pending:
+                if statuses.get(task.key) == "done":
+                    added += self.add(self.follow_up(task, self))
+            pending = added
+        return self.status()
+
+    def statuses(self):
+        """Task key -> status of all tasks of the sweep."""
+        return dict(self.connection.execute("SELECT key, status FROM tasks WHERE sweep = ?", (self.sweep,)))
+
+    def status(self):
+        counts = dict(
+            self.connection.execute("SELECT status, count(*) FROM tasks WHERE sweep = ? GROUP BY status", (self.sweep,))
+        )
+        return {status: counts.get(status, 0) for status in ["planned", "running", "done", "failed"]}
+
+    def _claim(self, slot_index, group):
+        """Next task for a slot (same group first), or (None, seconds to wait / None if finished)."""
+        with self.lock:
+            rows = {
+                key: (status, not_before)
+                for key, status, not_before in self.connection.execute(
+                    "SELECT key, status, not_before FROM tasks WHERE sweep = ?", (self.sweep,)
+                )
+            }
+            planned = [task for task in self.tasks if rows[task.key][0] == "planned"]
+            if not planned:
+                # a running task may still be followed up by more tasks
+                if self.follow_up and any(rows[task.key][0] == "running" for task in self.tasks):
+                    return None, 1.0
+                return None, None
+            now = _now()
+            ready = [task for task in planned if rows[task.key][1] <= now]
+            if not ready:
+                return None, min(rows[task.key][1] for task in planned) - now
+            task = next((task for task in ready if group is not None and task.group == group), ready[0])
+            self.connection.execute(
+                "UPDATE tasks SET status = 'running', slot = ?, started = ?, attempts = attempts + 1"
+                " WHERE sweep = ? AND key = ?",
+                (slot_index, now, self.sweep, task.key),
+            )
+            attempts = self.connection.execute(
+                "SELECT attempts FROM tasks WHERE sweep = ? AND key = ?", (self.sweep, task.key)
+            ).fetchone()[0]
+            return (task, attempts), 0
+
+    def _fail(self, task, attempts, error):
+        if attempts >= self.max_attempts:
+            self._update(task.key, status="failed", finished=_now(), error=error)
+            _log(f"{self.sweep}: {task.key} failed after {attempts} attempt(s): {error}")
+            return
+        delay = self.backoff * 2 ** (attempts - 1)
+        self._update(task.key, status="planned", not_before=_now() + delay, error=error)
+        _log(f"{self.sweep}: {task.key} failed ({error}), retrying in {delay:.0f}s")
+
+    def _work(self, slot_index):
+        slot = self.slots[slot_index]
+        group = None
+        previous = None
+        try:
+            while True:
+                claimed, wait_s = self._claim(slot_index, group)
+                if claimed is None:
+                    if wait_s is None:
+                        return
+                    time.sleep(max(wait_s, 0.1))
+                    continue
+                task, attempts = claimed
+                if previous is not None and self.cooldown:
+                    if callable(self.cooldown):
+                        self.cooldown(previous, slot)
+                    else:
+                        _log(f"waiting {self.cooldown}s before the next run")
+                        time.sleep(self.cooldown)
+                previous = task
+                _log(f"{self.sweep}: running {task.key} (attempt {attempts}, slot {slot_index})")
+                try:
+                    if task.group != group:
+                        if group is not None and self.teardown:
+                            self.teardown(group, slot)
+                        group = None
+                        if task.group is not None and self.setup:
+                            self.setup(task.group, slot)
+                        group = task.group
+                    self.run_task(task, slot)
+                except Exception as e:
+                    traceback.print_exc()
+                    self._fail(task, attempts, f"{type(e).__name__}: {e}")
+                    continue
+                self._update(task.key, status="done", finished=_now(), error=None)
+                _log(f"{self.sweep}: {task.key} done")
+                if self.follow_up:
+                    try:
+                        new_tasks = self.add(self.follow_up(task, self))
+                    except Exception:
+                        traceback.print_exc()
+                        new_tasks = []
+                    for new_task in new_tasks:
+                        _log(f"{self.sweep}: planned {new_task.key}")
+        finally:
+            if group is not None and self.teardown:
+                self.teardown(group, slot)
+
+    def run(self, tasks):
+        """Run all tasks that are not done yet, returns the number of failed tasks."""
+        counts = self.plan(tasks)
+        _log(f"{self.sweep}: {counts['planned']} planned, {counts['done']} done, {counts['failed']} failed")
+        workers = [
+            threading.Thread(target=self._work, args=(index,), daemon=True) for index in range(len(self.slots))
+        ]
+        for worker in workers:
+            worker.start()
+        # join with a timeout so that Ctrl-C reaches the main thread, the
+        # interrupted runs stay "running" and are resumed by the next start
+        while any(worker.is_alive() for worker in workers):
+            for worker in workers:
+                worker.join(timeout=1)
+        counts = self.status()
+        _log(f"{self.sweep}: {counts['done']} done, {counts['failed']} failed")
+        return counts["failed"]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="State of the experiment sweeps")
+    parser.add_argument("--sweep", help="only this sweep")
+    parser.add_argument("--retry-failed", action="store_true", help="plan the failed runs again")
+    parser.add_argument("--db", default=STATE_PATH, help="state database")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        print(f"No experiment state in {args.db}")
+        return
+    connection = sqlite3.connect(args.db)
+    where, values = ("WHERE sweep = ?", (args.sweep,)) if args.sweep else ("", ())
+    if args.retry_failed:
+        with connection:
+            connection.execute(
+                "UPDATE tasks SET status = 'planned', attempts = 0, not_before = 0"
+                + (" WHERE sweep = ? AND" if args.sweep else " WHERE")
+                + " status = 'failed'",
+                values,
+            )
+    for sweep, status, count in connection.execute(
+        f"SELECT sweep, status, count(*) FROM tasks {where} GROUP BY sweep, status ORDER BY sweep, status", values
+    ):
+        print(f"{sweep:<20} {status:<8} {count}")
+    for sweep, key, error in connection.execute(
+        f"SELECT sweep, key, error FROM tasks {where} {'AND' if where else 'WHERE'} status = 'failed'", values
+    ):
+        print(f"FAILED {sweep} {key}: {error}")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""Render the figures of all part 3 and part 4 runs in parallel.
+
+Run directories are discovered instead of being switched in the ``main()`` of
+the plotting scripts:
+
+- part 3: directories below ``part3/`` with ``mcperf_<n>.txt`` and
+  ``pods_<n>.json``, plotted with ``part3/vis_plots.py`` into
+  ``part3/plots/memcached_latency_run_<n>.png``. Every experiment repeats
+  runs 1 to 3, so run ``<n>`` is taken from the latest directory that has
+  it (``logs/run_7`` to ``logs/run_9``, the final results),
+- part 4: directories below ``part4/`` with ``mcperf_policy<p>_run<r>.log``
+  and ``scheduler_policy<p>_run<r>.log``, plotted with
+  ``part4/analyze_job_times.py`` into ``part4/plots/part_4_<x>/...``.
+
+Figures are rendered in a process pool with the headless Agg backend. A
+figure is skipped when its outputs exist and neither its inputs nor the
+plotting script changed since it was rendered (tracked by content hash in
+``.analysis_cache/plots.json``).
+
+Usage:
+    python -m analysis.plot_runner [--jobs 8] [--force] [--only part3|part4] [--dry-run]
+"""
+
+import argparse
+import importlib.util
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from analysis import cache
+
+PART3_SCRIPT = os.path.join(cache.REPO_ROOT, "part3", "vis_plots.py")
+PART4_SCRIPT = os.path.join(cache.REPO_ROOT, "part4", "analyze_job_times.py")
+MANIFEST_PATH = os.path.join(cache.CACHE_DIR, "plots.json")
+
+PART3_MCPERF_RE = re.compile(r"^mcperf_(\d+)\.txt$")
+PART4_MCPERF_RE = re.compile(r"^mcperf_policy(\d+)_run(\d+)\.log$")
+
+
+class PlotTask:
+    """One call of a plotting function with the files it reads and writes."""
+
+    def __init__(self, name, script, function, args, inputs, outputs):
+        self.name = name
+        self.script = script
+        self.function = function
+        self.args = args
+        self.inputs = inputs
+        self.outputs = outputs
+
+    def fingerprint(self):
+        """Content hashes of the inputs and of the plotting code."""
+        code = [self.script] + [
+            os.path.join(cache.REPO_ROOT, "analysis", name)
+            for name in sorted(os.listdir(os.path.join(cache.REPO_ROOT, "analysis")))
+            if name.endswith(".py")
+        ]
+        return {path: cache.file_hash(path) for path in self.inputs + code}
+
+
+def _walk(root):
+    for directory, subdirectories, files in os.walk(root):
+        # plots and caches never contain runs
+        subdirectories[:] = sorted(
+            name for name in subdirectories if name not in ("plots", "__pycache__")
+        )
+        yield directory, set(files)
+
+
+def _natural_key(path):
+    """Sort key with the numbers in ``path`` compared by value (run_9 < run_10)."""
+    return [int(part) if part.isdigit() else part for part in re.split(r"(\d+)", path)]
+
+
+def discover_part3(root=os.path.join(cache.REPO_ROOT, "part3")):
+    latest = {}
+    for directory, files in sorted(_walk(root), key=lambda entry: _natural_key(entry[0])):
+        for file_name in files:
+            match = PART3_MCPERF_RE.match(file_name)
+            if match and f"pods_{match.group(1)}.json" in files:
+                latest[int(match.group(1))] = directory
+
+    save_folder = os.path.join(root, "plots")
+    tasks = []
+    for run, directory in sorted(latest.items()):
+        tasks.append(
+            PlotTask(
+                f"part3/{os.path.relpath(directory, root)}/run{run}",
+                PART3_SCRIPT,
+                "create_plots",
+                (run, directory, save_folder),
+                [
+                    os.path.join(directory, f"mcperf_{run}.txt"),
+                    os.path.join(directory, f"pods_{run}.json"),
+                ],
+                [os.path.join(save_folder, f"memcached_latency_run_{run}.png")],
+            )
+        )
+    return tasks
+
+
+def part4_plot_folder(root, directory):
+    """part4/part4_4_logs/7s_interval -> part4/plots/part_4_4/7s_interval"""
+    relative = os.path.relpath(directory, root)
+    return os.path.join(root, "plots", re.sub(r"^part4_(\d+)_logs", r"part_4_\1", relative))
+
+
+def discover_part4(root=os.path.join(cache.REPO_ROOT, "part4")):
+    tasks = []
+    for directory, files in _walk(root):
+        for file_name in sorted(files):
+            match = PART4_MCPERF_RE.match(file_name)
+            if not match:
+                continue
+            policy, run = int(match.group(1)), int(match.group(2))
+            scheduler_file = f"scheduler_policy{policy}_run{run}.log"
+            if scheduler_file not in files:
+                continue
+            inputs = [
+                os.path.join(directory, file_name),
+                os.path.join(directory, scheduler_file),
+            ]
+            save_folder = part4_plot_folder(root, directory)
+            name = f"part4/{os.path.relpath(directory, root)}/policy{policy}_run{run}"
+            args = (directory, policy, run, save_folder)
+            tasks += [
+                PlotTask(f"{name}/A", PART4_SCRIPT, "create_plots_A", args, inputs, [os.path.join(save_folder, f"{run}A.png")]),
+                PlotTask(f"{name}/B", PART4_SCRIPT, "create_plots_B", args, inputs, [os.path.join(save_folder, f"{run}B.png")]),
+                PlotTask(
+                    f"{name}/slo",
+                    PART4_SCRIPT,
+                    "analyze_slo_attribution",
+                    args,
+                    inputs,
+                    [
+                        os.path.join(save_folder, f"{run}_slo_attribution.csv"),
+                        os.path.join(save_folder, f"{run}_latency_by_colocation.csv"),
+                    ],
+                ),
+            ]
+    return tasks
+
+
+def _load_script(path):
+    name = "plot_" + os.path.relpath(path, cache.REPO_ROOT).replace(os.sep, "_")[:-3]
+    if name not in sys.modules:
+        spec = importlib.util.spec_from_file_location(name, path)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[name] = module
+        spec.loader.exec_module(module)
+    return sys.modules[name]
+
+
+def _init_worker():
+    import matplotlib
+
+    matplotlib.use("Agg")
+
+
+def _render(task):
+    start = time.time()
+    for output in task.outputs:
+        os.makedirs(os.path.dirname(output), exist_ok=True)
+    function = getattr(_load_script(task.script), task.function)
+    function(*task.args)
+    missing = [output for output in task.outputs if not os.path.exists(output)]
+    return missing, time.time() - start
+
+
+def _read_manifest():
+    try:
+        with open(MANIFEST_PATH, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_manifest(manifest):
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp_path = f"{MANIFEST_PATH}.{os.getpid()}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def is_stale(task, manifest, fingerprint):
+    if not all(os.path.exists(output) for output in task.outputs):
+        return True
+    return manifest.get(task.name) != fingerprint
+
+
+def run(tasks, jobs=None, force=False, dry_run=False):
+    """Render the stale tasks, returns the number of failed tasks."""
+    manifest = _read_manifest()
+    fingerprints = {task.name: task.fingerprint() for task in tasks}
+    stale = [
+        task
+        for task in tasks
+        if force or is_stale(task, manifest, fingerprints[task.name])
+    ]
+    print(f"{len(tasks)} figures, {len(tasks) - len(stale)} up to date, {len(stale)} to render")
+    if dry_run or not stale:
+        for task in stale:
+            print(f"  would render {task.name}")
+        return 0
+
+    failed = 0
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as pool:
+        futures = {pool.submit(_render, task): task for task in stale}
+        for future in as_completed(futures):
+            task = futures[future]
+            try:
+                missing, seconds = future.result()
+            except Exception as e:
+                failed += 1
+                print(f"FAILED {task.name}: {e}")
+                continue
+            if missing:
+                # the script skipped the run, e.g. because of empty data
+                failed += 1
+                print(f"FAILED {task.name}: no output {', '.join(missing)}")
+                continue
+            manifest[task.name] = fingerprints[task.name]
+            print(f"rendered {task.name} in {seconds:.1f}s")
+
+    _write_manifest(manifest)
+    return failed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render all part 3 and part 4 figures")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    parser.add_argument("--force", action="store_true", help="render all figures")
+    parser.add_argument("--only", choices=["part3", "part4"], help="only render one part")
+    parser.add_argument("--dry-run", action="store_true", help="only list the stale figures")
+    args = parser.parse_args()
+
+    tasks = []
+    if args.only in (None, "part3"):
+        tasks += discover_part3()
+    if args.only in (None, "part4"):
+        tasks += discover_part4()
+
+    start = time.time()
+    failed = run(tasks, args.jobs, args.force, args.dry_run)
+    print(f"done in {time.time() - start:.1f}s")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""Job timings from the ``kubectl get pods -o json`` dumps of part 3.
+
+The dumps are mostly annotations and container specs. ``iter_pods`` decodes
+the ``items`` array one pod at a time from a buffered stream and keeps only
+the fields the analysis needs, so the whole document is never held in
+memory. Timestamps of all pods are converted in one NumPy call and the
+resulting table (one row per pod) is kept in the analysis cache:
+
+    pod, job, container, node    strings ("" if missing)
+    start_ms                     pod startTime
+    started_ms, finished_ms      startedAt/finishedAt of the first
+                                 terminated container
+
+All times are epoch milliseconds (UTC), NaN if missing.
+"""
+
+import json
+import re
+import numpy as np
+import pandas as pd
+
+from analysis import cache
+
+ITEMS_RE = re.compile(r'"items"\s*:\s*\[')
+CHUNK_SIZE = 1 << 16
+
+STRING_COLUMNS = ["pod", "job", "container", "node"]
+TIME_COLUMNS = ["start_ms", "started_ms", "finished_ms"]
+# bump when the parsed output changes, cached logs are parsed again
+CACHE_VERSION = 2
+
+
+def _read_until(f, buffer, pattern):
+    while True:
+        match = pattern.search(buffer)
+        if match:
+            return buffer, match
+        chunk = f.read(CHUNK_SIZE)
+        if not chunk:
+            return buffer, None
+        buffer += chunk
+
+
+def iter_items(file_path):
+    """Decoded elements of the top-level ``items`` array, one at a time."""
+    decoder = json.JSONDecoder()
+    with open(file_path, "r") as f:
+        buffer, match = _read_until(f, "", ITEMS_RE)
+        if match is None:
+            return
+        buffer = buffer[match.end() :]
+        eof = False
+        while True:
+            buffer = buffer.lstrip().lstrip(",").lstrip()
+            if buffer.startswith("]"):
+                return
+            try:
+                item, end = decoder.raw_decode(buffer)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # the item continues in the next chunk
+                chunk = f.read(CHUNK_SIZE)
+                eof = not chunk
+                buffer += chunk
+                continue
+            yield item
+            buffer = buffer[end:]
+
+
+def _pod_fields(pod):
+    metadata = pod.get("metadata", {})
+    labels = metadata.get("labels", {})
+    status = pod.get("status", {})
+    container_statuses = status.get("containerStatuses", [])
+
+    terminated = {}
+    for container in container_statuses:
+        if "finishedAt" in container.get("state", {}).get("terminated", {}):
+            terminated = container["state"]["terminated"]
+            break
+
+    return (
+        metadata.get("name") or "",
+        labels.get("job-name") or labels.get("batch.kubernetes.io/job-name") or "",
+        container_statuses[0].get("name", "") if container_statuses else "",
+        pod.get("spec", {}).get("nodeName") or "",
+        status.get("startTime") or "",
+        terminated.get("startedAt") or "",
+        terminated.get("finishedAt") or "",
+    )
+
+
+def to_epoch_ms(timestamps):
+    """Kubernetes UTC timestamps ("2025-04-14T20:47:34Z") to epoch ms, "" -> NaN."""
+    values = np.array([value.rstrip("Z") or "NaT" for value in timestamps], dtype="datetime64[ms]")
+    epoch_ms = values.astype(np.int64).astype(np.float64)
+    epoch_ms[np.isnat(values)] = np.nan
+    return epoch_ms
+
+
+def parse_pods(file_path):
+    rows = [_pod_fields(pod) for pod in iter_items(file_path)]
+    columns = list(zip(*rows)) if rows else [()] * 7
+    table = {name: np.array(values, dtype=str) for name, values in zip(STRING_COLUMNS, columns[:4])}
+    for name, values in zip(TIME_COLUMNS, columns[4:]):
+        table[name] = to_epoch_ms(values)
+    return pd.DataFrame(table)
+
+
+def read_pods(file_path, use_cache=True):
+    """Pod table of a pods JSON file, from the analysis cache if the file is unchanged."""
+    if use_cache:
+        return cache.load(file_path, "pods", parse_pods, CACHE_VERSION)
+    return parse_pods(file_path)
+
+
+def job_times(pods, job_filter="parsec"):
+    """Finished batch jobs (job, pod, node, start_ms, end_ms, exec_s).
+
+    A job starts with its pod (or its container if the pod has no
+    startTime) and ends when its container terminated. Only jobs whose
+    name contains ``job_filter`` are kept.
+    """
+    jobs = pods[pods["job"].str.contains(job_filter, regex=False)]
+    start_ms = jobs["start_ms"].fillna(jobs["started_ms"])
+    finished = start_ms.notna() & jobs["finished_ms"].notna()
+    jobs = jobs[finished]
+    return pd.DataFrame(
+        {
+            "job": jobs["job"],
+            "pod": jobs["pod"],
+            "node": jobs["node"],
+            "start_ms": start_ms[finished],
+            "end_ms": jobs["finished_ms"],
+            "exec_s": (jobs["finished_ms"] - start_ms[finished]) / 1000,
+        }
+    ).reset_index(drop=True)
+
+
+def batch_window(jobs):
+    """Start of the first and end of the last job in ms, (None, None) without jobs."""
+    if jobs.empty:
+        return None, None
+    return jobs["start_ms"].min(), jobs["end_ms"].max()
@@ -0,0 +1,196 @@
+"""Event store for the logs of the part 4 scheduler.
+
+Scheduler log lines look like
+
+    [1747069610] [policy: 1_2_cores] [INFO] [job] Job ferret started with cores 2,3 and 2 threads
+
+The log is parsed once into a table with typed columns (timestamp, component,
+job, event, status, core set, ...) and every table the analysis scripts need
+(job status changes, execution intervals and times, memcached cores, total
+runtime) is a query on that table, so no intermediate CSV files are needed.
+"""
+
+import numpy as np
+import pandas as pd
+
+from analysis import cache
+from analysis.intervals import build_intervals, total_execution_times
+
+TOTAL_CORES = 4
+
+# [timestamp] [policy: name] [level] [component] message, the level may
+# contain colour escape codes
+LINE_RE = r"^\[(\d+)\] \[policy: ([^\]]*)\] \[[^\]]*\] \[([^\]]+)\] (.*)$"
+
+CORES_RE = r"[\d,]+"
+
+# event name -> pattern of the message, with the named groups job, status,
+# cores, threads and value where the message carries them
+EVENT_PATTERNS = {
+    "status": r"^Job (?P<job>\S+) status: JobStatus\.(?P<status>\w+)",
+    "start": rf"^Job (?P<job>\S+) started with cores (?P<cores>{CORES_RE}) and (?P<threads>\d+) threads",
+    "restart": r"^Job (?P<job>\S+) restarting with (?P<threads>\d+) threads",
+    "pause": r"^Job (?P<job>\S+) paused$",
+    "unpause": r"^Job (?P<job>\S+) unpaused$",
+    "update_cores": rf"^Job (?P<job>\S+) updated to cores (?P<cores>{CORES_RE})",
+    "end": r"^Job (?P<job>\S+) completed in (?P<value>[\d.]+) seconds",
+    "error": r"^Job (?P<job>\S+) failed (?P<value>\d+) times",
+    "cores_available": r"^Cores available for jobs: \{(?P<cores>[\d, ]*)\}",
+    "memcached_cores": rf"^CompletedProcess\(args=\[.*'taskset', '-a', '-cp', '(?P<cores>{CORES_RE})'",
+    "cpu_usage": r"^CPU usage: \[(?P<value>[\d., ]*)\]",
+    "scheduler_end": r"^Scheduler completed in (?P<value>[\d.]+) seconds",
+}
+
+COLUMNS = {
+    "timestamp": np.int64,
+    "policy": str,
+    "component": str,
+    "job": str,
+    "event": str,
+    "status": str,
+    "cores": str,
+    "core_mask": np.int64,
+    "num_cores": np.int64,
+    "threads": np.int64,
+    "value": np.float64,
+    "message": str,
+}
+# bump when the parsed output changes, cached logs are parsed again
+CACHE_VERSION = 2
+
+
+def core_mask(cores):
+    """Bitmask of a Series of core lists like "1,2,3" or "1, 2, 3"."""
+    cores = cores.fillna("").str.replace(" ", "", regex=False)
+    exploded = cores.str.split(",").explode()
+    exploded = pd.to_numeric(exploded, errors="coerce").dropna().astype(np.int64)
+    mask = (np.int64(1) << exploded).groupby(level=0).sum()
+    return mask.reindex(cores.index, fill_value=0).astype(np.int64)
+
+
+def parse_scheduler_log(file_path):
+    """Parses a scheduler log into a DataFrame with one row per log line."""
+    with open(file_path, "r") as f:
+        lines = pd.Series(f.read().splitlines(), dtype=object)
+
+    parts = lines.str.extract(LINE_RE).dropna(subset=[0])
+    df = pd.DataFrame(
+        {
+            "timestamp": parts[0].astype(np.int64),
+            "policy": parts[1],
+            "component": parts[2],
+            "job": "",
+            "event": "other",
+            "status": "",
+            "cores": "",
+            "threads": "",
+            "value": "",
+            "message": parts[3],
+        }
+    )
+
+    for event, pattern in EVENT_PATTERNS.items():
+        undecided = df["event"] == "other"
+        groups = df.loc[undecided, "message"].str.extract(pattern)
+        matched = groups.dropna(how="all").index
+        if matched.empty:
+            continue
+        df.loc[matched, "event"] = event
+        for name in groups.columns:
+            df.loc[matched, name] = groups.loc[matched, name]
+
+    df["cores"] = df["cores"].fillna("").str.replace(" ", "", regex=False)
+    df["core_mask"] = core_mask(df["cores"])
+    df["num_cores"] = np.where(
+        df["cores"] == "", 0, df["cores"].str.count(",") + 1
+    )
+    df["threads"] = pd.to_numeric(df["threads"], errors="coerce").fillna(-1)
+    value = pd.to_numeric(df["value"], errors="coerce")
+    # the CPU usage line carries one value per core, keep their sum
+    cpu = df["event"] == "cpu_usage"
+    if cpu.any():
+        per_core = df.loc[cpu, "value"].str.split(",", expand=True)
+        value[cpu] = per_core.apply(pd.to_numeric, errors="coerce").sum(axis=1)
+    df["value"] = value
+    for name in ["job", "status"]:
+        df[name] = df[name].fillna("")
+
+    return df[list(COLUMNS)].astype(COLUMNS).reset_index(drop=True)
+
+
+class SchedulerEvents:
+    """Parsed scheduler log with the queries used by the analysis scripts."""
+
+    def __init__(self, df):
+        self.df = df
+
+    def __len__(self):
+        return len(self.df)
+
+    def events(self, event, job=None):
+        selected = self.df[self.df["event"] == event]
+        if job is not None:
+            selected = selected[selected["job"] == job]
+        return selected
+
+    @property
+    def jobs(self):
+        return sorted(self.df.loc[self.df["job"] != "", "job"].unique())
+
+    def job_status(self):
+        """Status of the jobs polled by the scheduler (job_name, timestamp, status)."""
+        status = self.events("status")
+        return pd.DataFrame(
+            {
+                "job_name": status["job"],
+                "timestamp": status["timestamp"],
+                "status": status["status"],
+            }
+        ).reset_index(drop=True)
+
+    def intervals(self):
+        """Execution intervals (job, start, end) in epoch seconds."""
+        return build_intervals(self.job_status())
+
+    def execution_times(self):
+        """Total execution time in seconds per job."""
+        return total_execution_times(self.intervals(), self.jobs)
+
+    def cpu_usage(self):
+        """CPU usage per core in percent (timestamp, core0, core1, ...) of every sample."""
+        usage = self.events("cpu_usage")
+        per_core = (
+            usage["message"]
+            .str.extract(r"\[(.*)\]", expand=False)
+            .str.split(",", expand=True)
+            .apply(pd.to_numeric, errors="coerce")
+        )
+        per_core.columns = [f"core{i}" for i in range(per_core.shape[1])]
+        per_core.insert(0, "timestamp", usage["timestamp"])
+        return per_core.reset_index(drop=True)
+
+    def memcached_cores_usage(self, total_cores=TOTAL_CORES):
+        """Number of cores memcached had at each scheduling decision."""
+        available = self.events("cores_available")
+        return pd.DataFrame(
+            {
+                "timestamp": available["timestamp"],
+                "memcached_cores_usage": total_cores - available["num_cores"],
+            }
+        ).reset_index(drop=True)
+
+    def total_time(self):
+        """Runtime of the scheduler in seconds, None if it did not finish."""
+        completed = self.events("scheduler_end")
+        if completed.empty:
+            return None
+        return float(completed["value"].iloc[0])
+
+
+def read_scheduler_log(file_path, use_cache=True):
+    """Read a scheduler log, from the analysis cache if the log is unchanged."""
+    if use_cache:
+        df = cache.load(file_path, "scheduler_events", parse_scheduler_log, CACHE_VERSION)
+        # empty strings come back as such, restore the column types
+        return SchedulerEvents(df.astype(COLUMNS))
+    return SchedulerEvents(parse_scheduler_log(file_path))
@@ -0,0 +1,86 @@
+"""Sequential stopping of the repetitions of an experiment configuration.
+
+Instead of a fixed number of repetitions every configuration starts with
+``min_runs``. Whenever all planned repetitions of a configuration are done,
+the 95% Student t interval of the measured value (execution time, capacity,
+makespan, ...) decides: if its half-width is at most ``rel_half_width`` of
+the mean, or at most ``abs_half_width`` in the unit of the value, the
+configuration is finished, otherwise one more repetition is planned, up to
+``max_runs``. The absolute bound is for values that cannot be resolved
+finer, e.g. a capacity is only measured in steps of the QPS scan.
+
+With two runs the t quantile is 12.7, so two runs only pass for values that
+hardly vary; every part therefore starts with three. The drivers set the
+precision and the cap of their part, calibrated on the runs in the repo.
+
+``SequentialStop`` is the ``follow_up`` of an ``Orchestrator``:
+
+    stop = SequentialStop(make_task, measure)
+    Orchestrator(sweep, run, follow_up=stop).run(stop.initial_tasks(configs))
+
+``make_task(config, repetition)`` builds the task of a configuration (dict of
+parameters) and ``measure(task)`` returns the value of a finished task, or
+None if it has none.
+"""
+
+import math
+
+from analysis.stats import t_ci
+
+MIN_RUNS = 3
+MAX_RUNS = 8
+REL_HALF_WIDTH = 0.05
+ABS_HALF_WIDTH = 0
+
+
+class SequentialStop:
+    def __init__(
+        self,
+        make_task,
+        measure,
+        min_runs=MIN_RUNS,
+        max_runs=MAX_RUNS,
+        rel_half_width=REL_HALF_WIDTH,
+        abs_half_width=ABS_HALF_WIDTH,
+        repetition_key="repetition",
+        first_repetition=1,
+    ):
+        self.make_task = make_task
+        self.measure = measure
+        self.min_runs = min_runs
+        self.max_runs = max_runs
+        self.rel_half_width = rel_half_width
+        self.abs_half_width = abs_half_width
+        self.repetition_key = repetition_key
+        self.first_repetition = first_repetition
+
+    def config(self, task):
+        return {name: value for name, value in task.params.items() if name != self.repetition_key}
+
+    def initial_tasks(self, configs):
+        return [
+            self.make_task(dict(config), self.first_repetition + i) for config in configs for i in range(self.min_runs)
+        ]
+
+    def __call__(self, task, orchestrator):
+        config = self.config(task)
+        siblings = [other for other in orchestrator.tasks if self.config(other) == config]
+        statuses = orchestrator.statuses()
+        # the last repetition to finish decides
+        if any(statuses.get(other.key) in ("planned", "running") for other in siblings):
+            return []
+
+        values = [self.measure(other) for other in siblings if statuses.get(other.key) == "done"]
+        values = [value for value in values if value is not None and not math.isnan(value)]
+        label = "/".join(str(value) for value in config.values())
+        if len(values) >= self.min_runs:
+            mean, low, high = t_ci(values)
+            half_width = (high - low) / 2
+            relative = half_width / abs(mean) if mean else math.inf
+            print(f"{label}: {len(values)} runs, {mean:.3f} +- {half_width:.3f} ({relative:.1%})")
+            if relative <= self.rel_half_width or half_width <= self.abs_half_width:
+                return []
+        if len(siblings) >= self.max_runs:
+            print(f"{label}: {self.max_runs} runs without reaching the precision, stopping")
+            return []
+        return [self.make_task(config, self.first_repetition + len(siblings))]
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""Live SLO monitor for a running mcperf measurement.
+
+Follows a growing mcperf log (and optionally the SchedulerLogger output of the
+part 4 scheduler) and prints one JSON event per line:
+
+    {"event": "violation", "p95_ms": 1.2, "running_jobs": {"canneal": "1,2"}, ...}
+
+Only fixed-size state is kept: the running counters, the last ``--window``
+p95 values and the jobs currently running, so the monitor can follow a run of
+any length.
+
+Scheduler events are applied in timestamp order with the mcperf rows: before
+a row is evaluated, the events up to the end of its interval are applied, so
+a violation is attributed to the jobs that ran during it, also when a finished
+run is replayed (``--no-follow``) or the monitor lags behind.
+
+Usage:
+    python -m analysis.slo_monitor mcperf.txt --slo-ms 0.8 --scheduler log.txt
+"""
+
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from collections import deque
+from datetime import datetime
+
+import numpy as np
+
+from analysis.mcperf import INTERVALS_RE, header_columns, parse_mcperf_row
+from analysis.scheduler_log import EVENT_PATTERNS, LINE_RE
+
+TRACKED_EVENTS = ["start", "pause", "unpause", "update_cores", "end"]
+
+
+class LogTail:
+    """Returns the complete lines appended to a file since the last call."""
+
+    def __init__(self, path, from_start=True):
+        self.path = path
+        self.position = 0
+        self.partial = ""
+        if not from_start and os.path.exists(path):
+            self.position = os.path.getsize(path)
+
+    def read_lines(self):
+        if not os.path.exists(self.path):
+            return []
+        if os.path.getsize(self.path) < self.position:
+            # the file was truncated or replaced, start over
+            self.position = 0
+            self.partial = ""
+        with open(self.path, "r") as f:
+            f.seek(self.position)
+            chunk = f.read()
+            self.position = f.tell()
+        if not chunk:
+            return []
+        lines = (self.partial + chunk).split("\n")
+        # keep an unfinished last line until its newline arrives
+        self.partial = lines.pop()
+        return lines
+
+
+class JobTracker:
+    """Keeps the set of running batch jobs from scheduler log lines.
+
+    Understands the SchedulerLogger format,
+    ``2023-04-12T11:14:31.663978 start canneal [1,2,3] 8``, and the log of the
+    part 4 scheduler,
+    ``[1747069610] [policy: 1_2_cores] [INFO] [job] Job ferret started with cores 2,3 and 2 threads``.
+    """
+
+    def __init__(self):
+        self.running = {}
+        self.paused = {}
+        self.line_re = re.compile(LINE_RE)
+        self.event_res = {
+            event: re.compile(EVENT_PATTERNS[event]) for event in TRACKED_EVENTS
+        }
+
+    def parse(self, line):
+        """(time in epoch ms, event, job, cores) of a line, None for other lines."""
+        match = self.line_re.match(line.strip())
+        if match:
+            for event, pattern in self.event_res.items():
+                found = pattern.match(match.group(4))
+                if found:
+                    groups = found.groupdict()
+                    return int(match.group(1)) * 1000, event, groups["job"], groups.get("cores")
+            return None
+
+        parts = line.split()
+        if len(parts) < 3 or parts[1] not in TRACKED_EVENTS:
+            return None
+        timestamp, event, job = parts[0], parts[1], parts[2]
+        if job in ("scheduler", "memcached"):
+            return None
+        try:
+            time_ms = int(datetime.fromisoformat(timestamp).timestamp() * 1000)
+        except ValueError:
+            return None
+        cores = parts[3].strip("[]") if len(parts) > 3 else None
+        return time_ms, event, job, cores
+
+    def apply(self, parsed):
+        time_ms, event, job, cores = parsed
+        if event == "start":
+            self.running[job] = cores
+        elif event == "pause" and job in self.running:
+            self.paused[job] = self.running.pop(job)
+        elif event == "unpause" and job in self.paused:
+            self.running[job] = self.paused.pop(job)
+        elif event == "update_cores":
+            if job in self.running:
+                self.running[job] = cores
+            elif job in self.paused:
+                self.paused[job] = cores
+        elif event == "end":
+            self.running.pop(job, None)
+            self.paused.pop(job, None)
+
+        return {"event": "scheduler", "time": time_ms, "action": event, "job": job}
+
+
+class SloMonitor:
+    def __init__(self, slo_ms, window):
+        self.slo_us = slo_ms * 1000
+        self.columns = None
+        self.window = deque(maxlen=window)
+        self.measurements = 0
+        self.violations = 0
+        self.consecutive_violations = 0
+        self.jobs = JobTracker()
+        # parsed scheduler lines that are not applied yet, in log order
+        self.pending = deque()
+        # violation count per job that was running at the time
+        self.violations_per_job = {}
+        self.timestamp_start = None
+        self.timestamp_end = None
+        self.num_intervals = None
+
+    def add_scheduler_line(self, line):
+        parsed = self.jobs.parse(line)
+        if parsed is not None:
+            self.pending.append(parsed)
+
+    def apply_scheduler_events(self, until_ms=None):
+        """Apply the pending scheduler events up to ``until_ms`` (all if None)."""
+        events = []
+        while self.pending and (until_ms is None or self.pending[0][0] <= until_ms):
+            events.append(self.jobs.apply(self.pending.popleft()))
+        return events
+
+    def _row_end_ms(self, row):
+        """End of the interval of a row in epoch ms."""
+        if "ts_end" in row:
+            return row["ts_end"]
+        if self.timestamp_start is not None and self.timestamp_end is not None:
+            # rows of the dynamic load are evenly spaced between the timestamps
+            count = self.num_intervals or self.measurements + 1
+            delta = (self.timestamp_end - self.timestamp_start) / count
+            return int(self.timestamp_start + (self.measurements + 1) * delta)
+        return int(time.time() * 1000)
+
+    def process_line(self, line):
+        """Events (scheduler changes, then the measurement) caused by an mcperf line."""
+        if line.startswith("#type"):
+            self.columns = header_columns(line)
+            return []
+        if line.startswith("Timestamp start:"):
+            self.timestamp_start = int(line.split(":")[1])
+            return []
+        if line.startswith("Timestamp end:"):
+            self.timestamp_end = int(line.split(":")[1])
+            return []
+        if self.num_intervals is None and "=" in line:
+            match = INTERVALS_RE.search(line)
+            if match:
+                self.num_intervals = int(match.group(1))
+                return []
+        row = parse_mcperf_row(line, self.columns)
+        if row is None:
+            return []
+
+        end_ms = self._row_end_ms(row)
+        events = self.apply_scheduler_events(end_ms)
+        self.measurements += 1
+        self.window.append(row["p95"])
+        violated = row["p95"] > self.slo_us
+
+        event = {
+            "event": "measurement",
+            "time": end_ms,
+            "p95_ms": row["p95"] / 1000,
+            "qps": row["qps"],
+            "measurements": self.measurements,
+        }
+
+        if violated:
+            self.violations += 1
+            self.consecutive_violations += 1
+            for job in self.jobs.running:
+                self.violations_per_job[job] = (
+                    self.violations_per_job.get(job, 0) + 1
+                )
+            event["event"] = "violation"
+            event["consecutive"] = self.consecutive_violations
+            event["running_jobs"] = dict(self.jobs.running)
+        elif self.consecutive_violations > 0:
+            event["event"] = "recovered"
+            event["after"] = self.consecutive_violations
+            self.consecutive_violations = 0
+
+        event["violation_ratio"] = self.violations / self.measurements
+        window = np.fromiter(self.window, dtype=np.float64)
+        event["rolling_p95_ms"] = {
+            "mean": float(window.mean()) / 1000,
+            "max": float(window.max()) / 1000,
+            "p95": float(np.percentile(window, 95)) / 1000,
+        }
+        return events + [event]
+
+    def summary(self):
+        return {
+            "event": "summary",
+            "time": datetime.now().isoformat(),
+            "measurements": self.measurements,
+            "violations": self.violations,
+            "violation_ratio": (
+                self.violations / self.measurements if self.measurements else 0.0
+            ),
+            "violations_per_job": self.violations_per_job,
+        }
+
+
+def emit(event, out, quiet):
+    if event is None or (quiet and event["event"] == "measurement"):
+        return
+    out.write(json.dumps(event) + "\n")
+    out.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Follow an mcperf log and report SLO violations live"
+    )
+    parser.add_argument("mcperf_log", help="mcperf output file that is being written")
+    parser.add_argument(
+        "--scheduler", help="SchedulerLogger output to attribute violations to jobs"
+    )
+    parser.add_argument(
+        "--slo-ms", type=float, default=1.0, help="p95 latency SLO in ms"
+    )
+    parser.add_argument(
+        "--window",
+        type=int,
+        default=30,
+        help="number of intervals for the rolling statistics",
+    )
+    parser.add_argument(
+        "--interval", type=float, default=0.5, help="polling interval in seconds"
+    )
+    parser.add_argument(
+        "--quiet",
+        action="store_true",
+        help="only print violations, recoveries and scheduler events",
+    )
+    parser.add_argument(
+        "--no-follow",
+        action="store_true",
+        help="process the current content and exit",
+    )
+    args = parser.parse_args()
+
+    monitor = SloMonitor(args.slo_ms, args.window)
+    mcperf_tail = LogTail(args.mcperf_log)
+    scheduler_tail = LogTail(args.scheduler) if args.scheduler else None
+
+    try:
+        while True:
+            # read the scheduler first so that its events up to the end of
+            # every new mcperf row are known when the row is evaluated
+            if scheduler_tail is not None:
+                for line in scheduler_tail.read_lines():
+                    monitor.add_scheduler_line(line)
+            for line in mcperf_tail.read_lines():
+                for event in monitor.process_line(line):
+                    emit(event, sys.stdout, args.quiet)
+            if args.no_follow:
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+    for event in monitor.apply_scheduler_events():
+        emit(event, sys.stdout, False)
+    emit(monitor.summary(), sys.stdout, False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""End waits for a node to settle as soon as its load is steady.
+
+The experiment drivers used to sleep a fixed time after starting an
+interference pod (for it to reach its steady load) and after every run (for
+the node to become idle again). ``wait_until_steady`` instead samples metrics
+of the node and of the interfering pod and returns as soon as every metric of
+the last ``window`` samples lies within the tolerance of its mean, after at
+least ``min_wait`` and at most ``max_wait`` seconds (the old fixed wait).
+
+The metrics come from the kubelet summary API (``/stats/summary`` through the
+API server proxy): CPU usage in cores and memory working set in MiB of the
+node and of the pod. The kubelet has no memory bandwidth counter; a membw or
+llc ibench pod saturates its core and touches its buffer at a constant rate,
+so its CPU usage and working set settle together with the bandwidth.
+"""
+
+import json
+import time
+
+from analysis import kube_watch
+
+POLL_S = 2
+# distinct samples that have to agree
+WINDOW = 4
+# relative tolerance around the mean of the window ...
+TOLERANCE = 0.05
+# ... but never tighter than these absolute tolerances (an idle node jitters)
+ABS_TOLERANCE = {"cpu_cores": 0.05, "memory_mib": 32}
+
+
+class SteadyState:
+    def __init__(self, window=WINDOW, tolerance=TOLERANCE, abs_tolerance=None):
+        self.window = window
+        self.tolerance = tolerance
+        self.abs_tolerance = abs_tolerance or ABS_TOLERANCE
+        self.samples = []
+        self.last_timestamp = None
+
+    def add(self, timestamp, values):
+        """Add the metrics (name -> value) measured at ``timestamp``, repeats are ignored."""
+        if timestamp == self.last_timestamp:
+            return
+        self.last_timestamp = timestamp
+        self.samples = (self.samples + [values])[-self.window :]
+
+    def _tolerance(self, name, mean):
+        absolute = next((tol for suffix, tol in self.abs_tolerance.items() if name.endswith(suffix)), 0)
+        return max(self.tolerance * abs(mean), absolute)
+
+    def steady(self):
+        if len(self.samples) < self.window:
+            return False
+        for name in self.samples[-1]:
+            values = [sample.get(name) for sample in self.samples]
+            if any(value is None for value in values):
+                return False
+            mean = sum(values) / len(values)
+            if max(abs(value - mean) for value in values) > self._tolerance(name, mean):
+                return False
+        return True
+
+
+def wait_until_steady(sample, max_wait, min_wait=0, poll=POLL_S, label="load", **detector_args):
+    """Wait until ``sample()`` is steady, returns (seconds waited, reason).
+
+    ``sample()`` returns (timestamp, metrics) or raises if the metrics are not
+    available, then the full ``max_wait`` is waited like before.
+    """
+    detector = SteadyState(**detector_args)
+    start = time.monotonic()
+    print(f"Waiting up to {max_wait}s for the {label} to settle...")
+    reason = "timeout"
+    while time.monotonic() - start < max_wait:
+        try:
+            detector.add(*sample())
+        except Exception as e:
+            print(f"No metrics ({type(e).__name__}: {e}), waiting the full {max_wait}s")
+            time.sleep(max(max_wait - (time.monotonic() - start), 0))
+            reason = "no metrics"
+            break
+        if time.monotonic() - start >= min_wait and detector.steady():
+            reason = "steady"
+            break
+        time.sleep(poll)
+    waited = time.monotonic() - start
+    print(f"The {label} is {'steady' if reason == 'steady' else 'assumed steady'} after {waited:.0f}s ({reason})")
+    return waited, reason
+
+
+def kubelet_sampler(node_name, pod_name=None, namespace="default", core_api=None):
+    """Sampler of the node's (and the pod's) CPU and memory from the kubelet summary."""
+    core_api = core_api or kube_watch.default_apis()[0]
+
+    def sample():
+        response = core_api.connect_get_node_proxy_with_path(node_name, "stats/summary", _preload_content=False)
+        summary = json.loads(response.data)
+        node = summary["node"]
+        values = {
+            "node_cpu_cores": node["cpu"]["usageNanoCores"] / 1e9,
+            "node_memory_mib": node["memory"]["workingSetBytes"] / 2**20,
+        }
+        if pod_name:
+            for pod in summary.get("pods", []):
+                if pod["podRef"]["name"] == pod_name and pod["podRef"]["namespace"] == namespace:
+                    values["pod_cpu_cores"] = pod.get("cpu", {}).get("usageNanoCores", 0) / 1e9
+                    values["pod_memory_mib"] = pod.get("memory", {}).get("workingSetBytes", 0) / 2**20
+        return node["cpu"]["time"], values
+
+    return sample
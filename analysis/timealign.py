@@ -0,0 +1,69 @@
+"""Put timestamps of different sources on one epoch-milliseconds axis.
+
+The logs use different units: the scheduler log and the CPU usage CSVs
+epoch seconds, mcperf epoch milliseconds. ``to_epoch_ms`` converts a whole
+array once, based on its magnitude. Averages of a sampled signal over many
+intervals then come from a prefix sum and ``np.searchsorted``, so aligning a
+long trace costs O((N + M) log N) instead of a scan per interval.
+"""
+
+import numpy as np
+
+# epoch values around the year 2025 have 10 digits in seconds, 13 in ms,
+# 16 in us and 19 in ns
+_UNIT_SCALE = [(1e11, 1e3), (1e14, 1.0), (1e17, 1e-3), (np.inf, 1e-6)]
+# milliseconds per unit
+UNIT_MS = {"s": 1e3, "ms": 1.0, "us": 1e-3, "ns": 1e-6}
+
+
+def to_epoch_ms(timestamps):
+    """Convert epoch timestamps in s, ms, us or ns to float ms.
+
+    The unit is inferred per value from its magnitude, so mixed arrays work.
+    """
+    timestamps = np.asarray(timestamps, dtype=np.float64)
+    magnitude = np.abs(timestamps)
+    scale = np.select(
+        [magnitude < limit for limit, _ in _UNIT_SCALE],
+        [factor for _, factor in _UNIT_SCALE],
+    )
+    return timestamps * scale
+
+
+class SampledSignal:
+    """A signal sampled at (not necessarily regular) times, sorted by time.
+
+    The sample times and all query bounds are in ``unit`` (default ms). The
+    unit is never guessed, so relative times work as well as epoch times.
+    """
+
+    def __init__(self, times_ms, values, unit="ms"):
+        self.scale = UNIT_MS[unit]
+        times_ms = np.asarray(times_ms, dtype=np.float64) * self.scale
+        values = np.asarray(values, dtype=np.float64)
+        order = np.argsort(times_ms, kind="stable")
+        self.times_ms = times_ms[order]
+        self.values = values[order]
+        self._cumulative = np.concatenate([[0.0], np.cumsum(self.values)])
+
+    def __len__(self):
+        return len(self.times_ms)
+
+    def counts(self, start_ms, end_ms):
+        """Number of samples in each interval [start, end)."""
+        first, last = self._bounds(start_ms, end_ms)
+        return last - first
+
+    def interval_means(self, start_ms, end_ms, empty=0.0):
+        """Mean of the samples in each interval [start, end), ``empty`` if none."""
+        first, last = self._bounds(start_ms, end_ms)
+        count = last - first
+        total = self._cumulative[last] - self._cumulative[first]
+        return np.where(count > 0, total / np.maximum(count, 1), empty)
+
+    def _bounds(self, start_ms, end_ms):
+        start_ms = np.asarray(start_ms, dtype=np.float64) * self.scale
+        end_ms = np.asarray(end_ms, dtype=np.float64) * self.scale
+        first = np.searchsorted(self.times_ms, start_ms, side="left")
+        last = np.searchsorted(self.times_ms, end_ms, side="left")
+        return first, np.maximum(last, first)
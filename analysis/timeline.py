@@ -0,0 +1,230 @@
+"""Which batch jobs ran where, and when, during a part 4 run.
+
+A ``Timeline`` holds the execution segments of every job (and of memcached)
+as sorted arrays: a job is running on a fixed core set from ``start`` to
+``end``. Questions about thousands of mcperf measurement windows at once
+("which jobs overlapped this window, on which cores") are answered with
+``np.searchsorted`` on the per-job arrays and prefix sums of the segment
+lengths, without a loop over the windows.
+
+All times are epoch milliseconds.
+"""
+
+import numpy as np
+import pandas as pd
+
+MEMCACHED = "memcached"
+
+# running state after a scheduler event, None keeps the previous state
+RUNNING_AFTER = {
+    "start": 1.0,
+    "restart": 1.0,
+    "unpause": 1.0,
+    "update_cores": None,
+    "pause": 0.0,
+    "end": 0.0,
+}
+
+
+def cores_from_mask(mask):
+    return ",".join(str(core) for core in range(64) if int(mask) >> core & 1)
+
+
+class Timeline:
+    """Execution segments (job, start, end, core_mask) indexed per job."""
+
+    def __init__(self, segments):
+        self.segments = segments.sort_values(["job", "start"], ignore_index=True)
+        self._index = {}
+        for job, group in self.segments.groupby("job", sort=True):
+            starts = group["start"].to_numpy(np.float64)
+            ends = group["end"].to_numpy(np.float64)
+            # prefix sums of the segment lengths for the overlap durations
+            cumulative = np.concatenate([[0.0], np.cumsum(ends - starts)])
+            masks = group["core_mask"].to_numpy(np.int64)
+            self._index[job] = (starts, ends, cumulative, masks)
+
+    @property
+    def jobs(self):
+        return list(self._index)
+
+    @classmethod
+    def from_scheduler_events(cls, scheduler_events, end_ms=None):
+        """Build the timeline from a parsed scheduler log (SchedulerEvents).
+
+        Segments that are still open at the end of the log are closed at
+        ``end_ms``, by default the last timestamp of the log.
+        """
+        df = scheduler_events.df
+        if end_ms is None:
+            end_ms = float(df["timestamp"].max()) * 1000 if len(df) else 0.0
+
+        events = df[df["event"].isin(list(RUNNING_AFTER))]
+        events = events.sort_values(["job", "timestamp"], kind="stable")
+        jobs = events["job"].to_numpy()
+
+        running = events["event"].map(RUNNING_AFTER).astype(np.float64)
+        running = running.groupby(jobs).ffill().fillna(0)
+        masks = events["core_mask"].where(events["core_mask"] != 0)
+        masks = masks.groupby(jobs).ffill().fillna(0).astype(np.int64)
+
+        starts = events["timestamp"].to_numpy(np.float64) * 1000
+        # each event opens a segment that lasts until the next event of the job
+        ends = pd.Series(starts).groupby(jobs).shift(-1).fillna(end_ms).to_numpy()
+
+        job_segments = pd.DataFrame(
+            {"job": jobs, "start": starts, "end": ends, "core_mask": masks.to_numpy()}
+        )[running.to_numpy() == 1]
+
+        # memcached runs all the time, on the cores of the last taskset call
+        affinity = df[df["event"] == "memcached_cores"]
+        affinity_starts = affinity["timestamp"].to_numpy(np.float64) * 1000
+        memcached_segments = pd.DataFrame(
+            {
+                "job": MEMCACHED,
+                "start": affinity_starts,
+                "end": np.append(affinity_starts[1:], end_ms),
+                "core_mask": affinity["core_mask"].to_numpy(np.int64),
+            }
+        )
+
+        segments = pd.concat([job_segments, memcached_segments], ignore_index=True)
+        return cls(segments[segments["end"] > segments["start"]])
+
+    def overlap(self, window_start, window_end, job):
+        """Overlap of each window with the segments of one job.
+
+        Returns the overlap in ms and the core mask the job had at the start
+        and at the end of the window (OR-ed).
+        """
+        window_start = np.asarray(window_start, dtype=np.float64)
+        window_end = np.asarray(window_end, dtype=np.float64)
+        if job not in self._index:
+            zeros = np.zeros(len(window_start))
+            return zeros, zeros.astype(np.int64)
+        starts, ends, cumulative, masks = self._index[job]
+
+        # segments of a job do not overlap, so both arrays are sorted:
+        # [first, last) are the segments with end > window start and
+        # start < window end
+        first = np.searchsorted(ends, window_start, side="right")
+        last = np.searchsorted(starts, window_end, side="left")
+        hit = last > first
+
+        first_idx = np.minimum(first, len(starts) - 1)
+        last_idx = np.maximum(last - 1, 0)
+        overlap = cumulative[last] - cumulative[np.minimum(first, last)]
+        # cut the first and last segment to the window
+        overlap -= np.where(hit, np.maximum(window_start - starts[first_idx], 0), 0)
+        overlap -= np.where(hit, np.maximum(ends[last_idx] - window_end, 0), 0)
+
+        core_mask = np.where(hit, masks[first_idx] | masks[last_idx], 0)
+        return np.where(hit, overlap, 0.0), core_mask
+
+    def colocation(self, window_start, window_end):
+        """Overlap fraction and cores of every job for every window.
+
+        Returns two DataFrames (one column per job, one row per window): the
+        fraction of the window the job was running, and its core list.
+        """
+        window_start = np.asarray(window_start, dtype=np.float64)
+        window_end = np.asarray(window_end, dtype=np.float64)
+        length = np.maximum(window_end - window_start, 1e-9)
+
+        fractions = {}
+        cores = {}
+        for job in self.jobs:
+            overlap, core_mask = self.overlap(window_start, window_end, job)
+            fractions[job] = overlap / length
+            # format each distinct core set once
+            labels = {mask: cores_from_mask(mask) for mask in np.unique(core_mask)}
+            cores[job] = pd.Series(core_mask).map(labels)
+        return pd.DataFrame(fractions), pd.DataFrame(cores)
+
+
+def measurement_windows(mcperf_df):
+    """Start and end (ms) of each mcperf interval in a DataFrame with timestamp_ms."""
+    starts = mcperf_df["timestamp_ms"].to_numpy(np.float64)
+    if "ts_end" in mcperf_df:
+        return starts, mcperf_df["ts_end"].to_numpy(np.float64)
+    steps = np.diff(starts)
+    last_step = np.median(steps) if len(steps) else 0.0
+    return starts, np.append(starts[1:], starts[-1:] + last_step)
+
+
+def colocated_jobs(fractions, min_fraction=0.5):
+    """Label of the batch jobs running for at least ``min_fraction`` of each window."""
+    batch = fractions.drop(columns=[MEMCACHED], errors="ignore")
+    running = batch.to_numpy() >= min_fraction
+    # one bit per job, so each distinct combination is labelled once
+    codes = running.astype(np.int64) @ (np.int64(1) << np.arange(len(batch.columns)))
+    labels = {
+        code: "+".join(
+            name for bit, name in enumerate(batch.columns) if code >> bit & 1
+        )
+        or "none"
+        for code in np.unique(codes)
+    }
+    return pd.Series(codes, index=fractions.index).map(labels)
+
+
+def attribute_violations(mcperf_df, timeline, slo_ms, min_fraction=0.5):
+    """Per-job SLO violation attribution.
+
+    For every job: the number of windows it was co-running with memcached,
+    the violations among them, the violation rate under colocation and the
+    share of all violations it was present for, plus the cores it used most
+    often during violations.
+    """
+    window_start, window_end = measurement_windows(mcperf_df)
+    fractions, cores = timeline.colocation(window_start, window_end)
+    violated = mcperf_df["p95_ms"].to_numpy() > slo_ms
+    total_violations = max(int(violated.sum()), 1)
+    p95_ms = mcperf_df["p95_ms"].to_numpy()
+
+    rows = []
+    for job in fractions.columns:
+        if job == MEMCACHED:
+            continue
+        present = fractions[job].to_numpy() >= min_fraction
+        job_violations = present & violated
+        violation_cores = cores.loc[job_violations, job]
+        rows.append(
+            {
+                "job": job,
+                "windows": int(present.sum()),
+                "violations": int(job_violations.sum()),
+                "violation_rate": (
+                    job_violations.sum() / present.sum() if present.any() else 0.0
+                ),
+                "violation_share": job_violations.sum() / total_violations,
+                "mean_p95_ms": p95_ms[present].mean() if present.any() else np.nan,
+                "violation_cores": (
+                    violation_cores.mode().iloc[0] if len(violation_cores) else ""
+                ),
+            }
+        )
+    return pd.DataFrame(rows)
+
+
+def latency_by_colocation(mcperf_df, timeline, slo_ms, min_fraction=0.5):
+    """p95 latency statistics grouped by the set of co-running batch jobs."""
+    window_start, window_end = measurement_windows(mcperf_df)
+    fractions, _ = timeline.colocation(window_start, window_end)
+    df = pd.DataFrame(
+        {
+            "colocation": colocated_jobs(fractions, min_fraction).to_numpy(),
+            "p95_ms": mcperf_df["p95_ms"].to_numpy(),
+        }
+    )
+    df["violation"] = df["p95_ms"] > slo_ms
+    grouped = df.groupby("colocation")
+    return pd.DataFrame(
+        {
+            "windows": grouped.size(),
+            "mean_p95_ms": grouped["p95_ms"].mean(),
+            "p95_of_p95_ms": grouped["p95_ms"].quantile(0.95),
+            "max_p95_ms": grouped["p95_ms"].max(),
+            "violation_rate": grouped["violation"].mean(),
+        }
+    ).sort_values("windows", ascending=False)
@@ -0,0 +1,383 @@
+#!/usr/bin/env python3
+"""Load the results of all parts into one SQLite database.
+
+Tables (all times in epoch ms, latencies in ms):
+
+    runs           run_id, part, experiment, config, repetition, path, sha1
+    intervals      run_id, idx, ts_start_ms, ts_end_ms, qps, target,
+                   avg_ms, p50_ms, p90_ms, p95_ms, p99_ms
+    job_intervals  run_id, job, start_ms, end_ms, node
+    events         run_id, ts_ms, job, event, cores, threads
+    cpu_samples    run_id, ts_ms, core, usage
+    executions     run_id, workload, interference, threads, repetition,
+                   execution_time_s
+
+Runs are ingested incrementally: a file whose content hash is already in
+``runs`` is skipped, a changed file replaces its rows. Part 4 intervals are
+moved onto the scheduler clock (analysis.clockalign) so they can be joined
+with the job intervals of the same run.
+
+Example, p95 under llc interference vs while canneal runs:
+
+    SELECT 'llc', avg(p95_ms) FROM intervals JOIN runs USING (run_id)
+     WHERE part = 'part1' AND config = 'llc'
+    UNION ALL
+    SELECT 'canneal', avg(i.p95_ms) FROM intervals i
+      JOIN job_intervals j ON j.run_id = i.run_id AND j.job LIKE '%canneal'
+       AND i.ts_start_ms < j.end_ms AND i.ts_end_ms > j.start_ms
+
+Usage:
+    python -m analysis.warehouse ingest [--db PATH] [--force]
+    python -m analysis.warehouse query "SELECT ..." [--db PATH]
+"""
+
+import argparse
+import glob
+import os
+import re
+import sqlite3
+import sys
+import time
+import numpy as np
+import pandas as pd
+
+from analysis import cache
+from analysis.capacity import PART1_RE, PART4_1_CONFIGS, PART4_1_D_CONFIGS, PART4_1_D_RE, PART4_1_RE
+from analysis.clockalign import align_to_scheduler
+from analysis.cpu_samples import CACHE_VERSION as CPU_CACHE_VERSION, parse_cpu_usage, read_cpu_samples
+from analysis.mcperf import read_mcperf_log
+from analysis.pods import job_times, read_pods
+from analysis.scheduler_log import read_scheduler_log
+from analysis.timeline import measurement_windows
+
+DB_PATH = os.path.join(cache.CACHE_DIR, "runs.sqlite")
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    run_id INTEGER PRIMARY KEY,
+    part TEXT NOT NULL,
+    experiment TEXT NOT NULL,
+    config TEXT NOT NULL,
+    repetition INTEGER,
+    path TEXT NOT NULL UNIQUE,
+    sha1 TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS intervals (
+    run_id INTEGER NOT NULL REFERENCES runs ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    ts_start_ms REAL,
+    ts_end_ms REAL,
+    qps REAL,
+    target REAL,
+    avg_ms REAL,
+    p50_ms REAL,
+    p90_ms REAL,
+    p95_ms REAL,
+    p99_ms REAL
+);
+CREATE TABLE IF NOT EXISTS job_intervals (
+    run_id INTEGER NOT NULL REFERENCES runs ON DELETE CASCADE,
+    job TEXT NOT NULL,
+    start_ms REAL NOT NULL,
+    end_ms REAL,
+    node TEXT
+);
+CREATE TABLE IF NOT EXISTS events (
+    run_id INTEGER NOT NULL REFERENCES runs ON DELETE CASCADE,
+    ts_ms REAL NOT NULL,
+    job TEXT,
+    event TEXT NOT NULL,
+    cores TEXT,
+    threads INTEGER
+);
+CREATE TABLE IF NOT EXISTS cpu_samples (
+    run_id INTEGER NOT NULL REFERENCES runs ON DELETE CASCADE,
+    ts_ms REAL NOT NULL,
+    core INTEGER NOT NULL,
+    usage REAL
+);
+CREATE TABLE IF NOT EXISTS executions (
+    run_id INTEGER NOT NULL REFERENCES runs ON DELETE CASCADE,
+    workload TEXT NOT NULL,
+    interference TEXT,
+    threads INTEGER,
+    repetition INTEGER,
+    execution_time_s REAL
+);
+CREATE INDEX IF NOT EXISTS runs_config ON runs (part, experiment, config);
+CREATE INDEX IF NOT EXISTS intervals_run_time ON intervals (run_id, ts_start_ms);
+CREATE INDEX IF NOT EXISTS job_intervals_job ON job_intervals (job, run_id, start_ms);
+CREATE INDEX IF NOT EXISTS events_run_time ON events (run_id, ts_ms);
+CREATE INDEX IF NOT EXISTS events_job ON events (job, event);
+CREATE INDEX IF NOT EXISTS cpu_samples_run_time ON cpu_samples (run_id, core, ts_ms);
+CREATE INDEX IF NOT EXISTS executions_workload ON executions (workload, interference, threads);
+"""
+
+PART3_MCPERF_RE = re.compile(r"mcperf_(\d+)\.txt$")
+PART4_MCPERF_RE = re.compile(r"mcperf_policy(\d+)_run(\d+)\.log$")
+
+
+def connect(db_path=DB_PATH):
+    os.makedirs(os.path.dirname(db_path), exist_ok=True)
+    connection = sqlite3.connect(db_path)
+    connection.execute("PRAGMA foreign_keys = ON")
+    connection.executescript(SCHEMA)
+    return connection
+
+
+class Run:
+    """One ingested file with the rows it contributes to each table."""
+
+    def __init__(self, part, experiment, config, repetition, path, extra_inputs=()):
+        self.part = part
+        self.experiment = experiment
+        self.config = config
+        self.repetition = repetition
+        self.path = path
+        # files the rows also depend on (scheduler log, pods file, CPU trace)
+        self.extra_inputs = [p for p in extra_inputs if p and os.path.exists(p)]
+
+    def sha1(self):
+        return "+".join(cache.file_hash(p) for p in [self.path] + self.extra_inputs)
+
+    def tables(self):
+        """Table name -> DataFrame of rows (without run_id)."""
+        raise NotImplementedError
+
+
+def _interval_rows(mcperf_log, starts=None, ends=None):
+    data = mcperf_log.data
+    if starts is None and "ts_start" in data.dtype.names:
+        starts, ends = data["ts_start"].astype(np.float64), data["ts_end"].astype(np.float64)
+    if starts is None:
+        starts = ends = np.full(len(data), np.nan)
+    return pd.DataFrame(
+        {
+            "idx": np.arange(len(data)),
+            "ts_start_ms": starts,
+            "ts_end_ms": ends,
+            "qps": data["qps"],
+            "target": data["target"],
+            "avg_ms": data["avg"] / 1000,
+            "p50_ms": data["p50"] / 1000,
+            "p90_ms": data["p90"] / 1000,
+            "p95_ms": data["p95"] / 1000,
+            "p99_ms": data["p99"] / 1000,
+        }
+    )
+
+
+def _wide_cpu_rows(timestamps_ms, per_core):
+    """Long (ts_ms, core, usage) rows from a samples x cores array."""
+    per_core = np.asarray(per_core, dtype=np.float64)
+    if per_core.size == 0:
+        return pd.DataFrame(columns=["ts_ms", "core", "usage"])
+    samples, cores = per_core.shape
+    return pd.DataFrame(
+        {
+            "ts_ms": np.repeat(np.asarray(timestamps_ms, dtype=np.float64), cores),
+            "core": np.tile(np.arange(cores), samples),
+            "usage": per_core.ravel(),
+        }
+    )
+
+
+class SweepRun(Run):
+    """mcperf QPS sweep of part 1 or part 4.1, optionally with a CPU trace."""
+
+    def tables(self):
+        tables = {"intervals": _interval_rows(read_mcperf_log(self.path))}
+        for cpu_file in self.extra_inputs:
+            if cpu_file.endswith(".bin"):
+                samples = cache.load(cpu_file, "cpu_samples", read_cpu_samples, CPU_CACHE_VERSION)
+                tables["cpu_samples"] = _wide_cpu_rows(samples["timestamp_ms"], samples["cpu"])
+            else:
+                usage = cache.load(cpu_file, "cpu_usage", parse_cpu_usage, CPU_CACHE_VERSION)
+                tables["cpu_samples"] = _wide_cpu_rows(usage["timestamp"] * 1000.0, usage["cpu"])
+        return tables
+
+
+class Part3Run(Run):
+    def tables(self):
+        jobs = job_times(read_pods(self.extra_inputs[0])) if self.extra_inputs else pd.DataFrame()
+        tables = {"intervals": _interval_rows(read_mcperf_log(self.path))}
+        if not jobs.empty:
+            tables["job_intervals"] = pd.DataFrame(
+                {"job": jobs["job"], "start_ms": jobs["start_ms"], "end_ms": jobs["end_ms"], "node": jobs["node"]}
+            )
+            tables["events"] = pd.concat(
+                [
+                    pd.DataFrame({"ts_ms": jobs["start_ms"], "job": jobs["job"], "event": "start"}),
+                    pd.DataFrame({"ts_ms": jobs["end_ms"], "job": jobs["job"], "event": "end"}),
+                ]
+            )
+        return tables
+
+
+class Part4Run(Run):
+    def tables(self):
+        mcperf_log = read_mcperf_log(self.path)
+        starts = mcperf_log.interval_start_ms()
+        ends = None
+        if not self.extra_inputs:
+            return {"intervals": _interval_rows(mcperf_log)}
+
+        scheduler_events = read_scheduler_log(self.extra_inputs[0])
+        if starts is not None and len(starts):
+            starts, ends = measurement_windows(pd.DataFrame({"timestamp_ms": starts}))
+            clock = align_to_scheduler(starts, ends, mcperf_log["qps"], scheduler_events)
+            starts, ends = clock.apply(starts), clock.apply(ends)
+
+        intervals = scheduler_events.intervals()
+        events = scheduler_events.df[~scheduler_events.df["event"].isin(["", "other", "cpu_usage"])]
+        usage = scheduler_events.cpu_usage()
+        return {
+            "intervals": _interval_rows(mcperf_log, starts, ends),
+            "job_intervals": pd.DataFrame(
+                {"job": intervals["job"], "start_ms": intervals["start"] * 1000, "end_ms": intervals["end"] * 1000}
+            ),
+            "events": pd.DataFrame(
+                {
+                    "ts_ms": events["timestamp"] * 1000.0,
+                    "job": events["job"],
+                    "event": events["event"],
+                    "cores": events["cores"],
+                    "threads": events["threads"],
+                }
+            ),
+            "cpu_samples": _wide_cpu_rows(usage["timestamp"] * 1000.0, usage.drop(columns="timestamp").to_numpy()),
+        }
+
+
+class ExecutionsRun(Run):
+    """CSV of PARSEC execution times of part 2."""
+
+    def tables(self):
+        df = pd.read_csv(self.path)
+        return {
+            "executions": pd.DataFrame(
+                {
+                    "workload": df["workload"],
+                    "interference": df.get("interference"),
+                    "threads": df.get("threads"),
+                    "repetition": df.get("repetition"),
+                    "execution_time_s": df["execution_time"],
+                }
+            )
+        }
+
+
+def discover_runs(root=cache.REPO_ROOT):
+    runs = []
+
+    def paths(pattern):
+        return sorted(glob.glob(os.path.join(root, pattern), recursive=True))
+
+    for path in paths("part1/logs/benchmark_results_*.txt"):
+        match = PART1_RE.search(path)
+        runs.append(SweepRun("part1", "interference", match.group(1), int(match.group(2)), path))
+
+    for path in paths("part2/task1/parsec_results/all_results.csv"):
+        runs.append(ExecutionsRun("part2", "interference", "all", None, path))
+    for path in paths("part2/task2/**/execution_times.csv"):
+        runs.append(ExecutionsRun("part2", "threads", "all", None, path))
+
+    for path in paths("part3/**/mcperf_*.txt"):
+        match = PART3_MCPERF_RE.search(path)
+        if "/plots/" in path or not match:
+            continue
+        pods_file = os.path.join(os.path.dirname(path), f"pods_{match.group(1)}.json")
+        config = os.path.relpath(os.path.dirname(path), os.path.join(root, "part3"))
+        runs.append(Part3Run("part3", "colocation", config, int(match.group(1)), path, [pods_file]))
+
+    for path in paths("part4/4_1_a_c_logs_run*/experiment*.txt"):
+        match = PART4_1_RE.search(path)
+        if match and match.group(1) in PART4_1_CONFIGS:
+            runs.append(SweepRun("part4", "4_1", PART4_1_CONFIGS[match.group(1)], int(match.group(2)), path))
+
+    for path in paths("part4/4_1_d_logs/experiment*.txt"):
+        match = PART4_1_D_RE.search(path)
+        if not match or match.group(1) not in PART4_1_D_CONFIGS:
+            continue
+        cpu_file = os.path.join(os.path.dirname(path), f"cpuUsage{match.group(1)}_run{match.group(2)}.bin")
+        if not os.path.exists(cpu_file):
+            cpu_file = cpu_file[: -len(".bin")] + ".csv"
+        runs.append(SweepRun("part4", "4_1_d", match.group(1), int(match.group(2)), path, [cpu_file]))
+
+    for path in paths("part4/**/mcperf_policy*_run*.log"):
+        match = PART4_MCPERF_RE.search(path)
+        if "/plots/" in path or not match:
+            continue
+        scheduler_file = os.path.join(os.path.dirname(path), f"scheduler_policy{match.group(1)}_run{match.group(2)}.log")
+        directory = os.path.relpath(os.path.dirname(path), os.path.join(root, "part4"))
+        runs.append(
+            Part4Run("part4", directory, f"policy{match.group(1)}", int(match.group(2)), path, [scheduler_file])
+        )
+    return runs
+
+
+def _insert(connection, table, run_id, rows):
+    if rows is None or rows.empty:
+        return 0
+    rows = rows.astype(object).where(rows.notna(), None)
+    columns = ["run_id"] + list(rows.columns)
+    connection.executemany(
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join('?' * len(columns))})",
+        ((run_id, *row) for row in rows.itertuples(index=False, name=None)),
+    )
+    return len(rows)
+
+
+def ingest(connection, runs, force=False):
+    """Load new or changed runs, returns (ingested, skipped)."""
+    known = dict(connection.execute("SELECT path, sha1 FROM runs"))
+    ingested = skipped = 0
+    connection.execute("PRAGMA synchronous = OFF")
+    for run in runs:
+        path = os.path.relpath(run.path, cache.REPO_ROOT)
+        sha1 = run.sha1()
+        if not force and known.get(path) == sha1:
+            skipped += 1
+            continue
+        try:
+            tables = run.tables()
+        except Exception as e:
+            print(f"FAILED {path}: {e}")
+            continue
+        # one transaction per run, a failed run leaves no partial rows
+        with connection:
+            connection.execute("DELETE FROM runs WHERE path = ?", (path,))
+            run_id = connection.execute(
+                "INSERT INTO runs (part, experiment, config, repetition, path, sha1) VALUES (?, ?, ?, ?, ?, ?)",
+                (run.part, run.experiment, run.config, run.repetition, path, sha1),
+            ).lastrowid
+            counts = {table: _insert(connection, table, run_id, rows) for table, rows in tables.items()}
+        ingested += 1
+        print(f"{path}: " + ", ".join(f"{count} {table}" for table, count in counts.items()))
+    return ingested, skipped
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SQLite warehouse of all experiment runs")
+    parser.add_argument("command", choices=["ingest", "query"])
+    parser.add_argument("sql", nargs="?", help="query to run")
+    parser.add_argument("--db", default=DB_PATH, help="database file")
+    parser.add_argument("--force", action="store_true", help="ingest unchanged runs again")
+    args = parser.parse_args()
+
+    connection = connect(args.db)
+    if args.command == "ingest":
+        start = time.time()
+        ingested, skipped = ingest(connection, discover_runs(), args.force)
+        connection.execute("ANALYZE")
+        print(f"{ingested} runs ingested, {skipped} unchanged, in {time.time() - start:.1f}s -> {args.db}")
+        return
+
+    if not args.sql:
+        parser.error("query needs an SQL statement")
+    with pd.option_context("display.width", 200, "display.max_rows", 200):
+        print(pd.read_sql_query(args.sql, connection).to_string(index=False))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
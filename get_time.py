@@ -1,35 +1,30 @@
-import json
+import math
+import os
 import sys
-from datetime import datetime
+from datetime import timedelta
 
+# make the shared analysis package importable from any working directory
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+from analysis.pods import read_pods
 
-time_format = '%Y-%m-%dT%H:%M:%SZ'
-file = open(sys.argv[1], 'r')
-json_file = json.load(file)
+
+pods = read_pods(sys.argv[1])
 
 start_times = []
 completion_times = []
-for item in json_file['items']:
-    name = item['status']['containerStatuses'][0]['name']
+for pod in pods.itertuples():
+    name = pod.container
     print("Job: ", str(name))
     if str(name) != "memcached":
-        try:
-            start_time = datetime.strptime(
-                    item['status']['containerStatuses'][0]['state']['terminated']['startedAt'],
-                    time_format)
-            completion_time = datetime.strptime(
-                    item['status']['containerStatuses'][0]['state']['terminated']['finishedAt'],
-                    time_format)
-            print("Job time: ", completion_time - start_time)
-            start_times.append(start_time)
-            completion_times.append(completion_time)
-        except KeyError:
+        if math.isnan(pod.started_ms) or math.isnan(pod.finished_ms):
             print("Job {0} has not completed....".format(name))
             sys.exit(0)
+        print("Job time: ", timedelta(milliseconds=pod.finished_ms - pod.started_ms))
+        start_times.append(pod.started_ms)
+        completion_times.append(pod.finished_ms)
 
 if len(start_times) != 7 and len(completion_times) != 7:
     print("You haven't run all the PARSEC jobs. Exiting...")
     sys.exit(0)
 
-print("Total time: {0}".format(max(completion_times) - min(start_times)))
-file.close()
+print("Total time: {0}".format(timedelta(milliseconds=max(completion_times) - min(start_times))))
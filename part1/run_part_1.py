@@ -2,11 +2,24 @@
 
 import enum
 import os
+import shlex
 import subprocess
 import argparse
+import sys
+import threading
 import time
 from kubernetes import client, config
 
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.capacity import SLO_MS, run_capacity
+from analysis.orchestrator import Orchestrator, Task
+from analysis.sequential import SequentialStop
+
+# the pooled SSH sessions of the part 4 drivers
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "part4"))
+from remote import SSHPool
+
 MCPERF_CLIENT_CMD = "cd memcache-perf && ./mcperf -T 8 -A"
 MCPERF_LOAD_DATA_CMD = "cd memcache-perf && ./mcperf -s {MEMCACHED_IP} --loadonly"
 MCPERF_BENCHMARK_CMD_TEMPLATE = "cd memcache-perf && ./mcperf -s {MEMCACHED_IP} -a {INTERNAL_AGENT_IP} --noload -T 8 -C 8 -D 4 -Q 1000 -c 8 -t 5 -w 2 --scan 5000:80000:5000"
@@ -14,6 +27,14 @@ MCPERF_BENCHMARK_CMD_TEMPLATE = "cd memcache-perf && ./mcperf -s {MEMCACHED_IP}
 
 ZONE = "europe-west1-b"
 
+# repetitions per interference pattern: at least MIN_RUNS, more (up to
+# MAX_RUNS) until the capacity at the SLO is known within REL_HALF_WIDTH or
+# one step of the QPS scan; on the runs in logs/ this is about 5 per pattern
+MIN_RUNS = 3
+MAX_RUNS = 6
+REL_HALF_WIDTH = 0.1
+SCAN_STEP_QPS = 5000
+
 # Get the absolute path to the install script
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 INSTALL_SCRIPT_PATH = os.path.join(SCRIPT_DIR, "install_mcperf.sh")
@@ -43,134 +64,216 @@ class Mode(enum.Enum):
 config.load_kube_config()
 kubernetes_client = client.CoreV1Api()
 
+SSH_KEY_FILE = "~/.ssh/cloud-computing"
+
+
+class RemoteCommand:
+    """A command running on a node, its output is streamed by background threads.
+
+    Every stdout line is printed and appended to ``log_file`` as soon as it
+    arrives; stderr is collected at the same time so that neither pipe can
+    fill up and block the remote command.
+    """
+
+    def __init__(self, start, log_file=None, stdin_path=None, echo=True):
+        self.log_file = log_file
+        self.echo = echo
+        self.stderr_lines = []
+        stdin = open(stdin_path, "rb") if stdin_path else subprocess.DEVNULL
+        try:
+            # start(**popen_kwargs) returns the Popen of the command
+            self.process = start(
+                stdin=stdin,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+                text=True,
+                bufsize=1,
+            )
+        finally:
+            if stdin_path:
+                stdin.close()
+        self.threads = [
+            threading.Thread(target=self._pump_stdout, daemon=True),
+            threading.Thread(target=self._pump_stderr, daemon=True),
+        ]
+        for thread in self.threads:
+            thread.start()
+
+    def _pump_stdout(self):
+        log = open(self.log_file, "w") if self.log_file else None
+        try:
+            for line in self.process.stdout:
+                if self.echo:
+                    print(line, end="")
+                if log:
+                    log.write(line)
+                    log.flush()
+        finally:
+            if log:
+                log.close()
+
+    def _pump_stderr(self):
+        for line in self.process.stderr:
+            self.stderr_lines.append(line)
+
+    @property
+    def stderr(self):
+        return "".join(self.stderr_lines)
+
+    @property
+    def returncode(self):
+        return self.process.returncode
+
+    def wait(self):
+        """Wait for the command and all of its output, returns the exit code."""
+        self.process.wait()
+        for thread in self.threads:
+            thread.join()
+        return self.process.returncode
+
+
+class GcloudSSHPool(SSHPool):
+    """``SSHPool`` for the cluster nodes, addressed by their node name.
+
+    ``gcloud compute ssh`` looks up the instance and starts a new connection
+    every time it is called. The pool asks gcloud only once per node for the
+    ssh command it would run (``--dry-run``: address, key, known hosts) and
+    multiplexes all commands of that node over one control master. Only
+    commands are supported, no ``fetch``.
+    """
+
+    def __init__(self, zone=ZONE, key_file=SSH_KEY_FILE, user="ubuntu"):
+        super().__init__(key_file=key_file, user=user)
+        self.zone = zone
+        self.gcloud_commands = {}
+
+    def _ssh(self, host):
+        if host not in self.gcloud_commands:
+            dry_run = subprocess.run(
+                [
+                    "gcloud",
+                    "compute",
+                    "ssh",
+                    f"--ssh-key-file={self.key_file}",
+                    f"{self.user}@{host}",
+                    "--zone",
+                    self.zone,
+                    "--dry-run",
+                ],
+                check=True,
+                capture_output=True,
+                text=True,
+            )
+            self.gcloud_commands[host] = [arg for arg in shlex.split(dry_run.stdout.strip()) if arg != "-t"]
+        argv = self.gcloud_commands[host]
+        # the control master options go in front of the destination
+        return [*argv[:-1], *self._control_options(), argv[-1]]
 
-def install_mcperf(node_name_prefix: str):
-    """Install and configure mcperf with the given name prefix."""
-    # Find the node with the given prefix
-    found_node = None
-    for node in kubernetes_client.list_node().items:
-        if node.metadata.name.startswith(node_name_prefix):
-            found_node = node
-            break
-    if not found_node:
+
+class ClusterContext:
+    """The nodes of the cluster, listed once, and persistent SSH sessions to them."""
+
+    def __init__(self, core_api=None, zone=ZONE, key_file=SSH_KEY_FILE, user="ubuntu"):
+        self.core_api = core_api or kubernetes_client
+        self.nodes = self.core_api.list_node().items
+        self.pool = GcloudSSHPool(zone, key_file, user)
+
+    def node(self, node_name_prefix: str):
+        """The first node whose name starts with the prefix."""
+        for node in self.nodes:
+            if node.metadata.name.startswith(node_name_prefix):
+                return node
         raise ValueError(f"Node with prefix {node_name_prefix} not found")
 
+    def node_name(self, node_name_prefix: str) -> str:
+        return self.node(node_name_prefix).metadata.name
+
+    def internal_ip(self, node_name_prefix: str) -> str:
+        addresses = self.node(node_name_prefix).status.addresses
+        return next(
+            (address.address for address in addresses if address.type == "InternalIP"),
+            addresses[0].address,
+        )
+
+    def start(self, node_name_prefix: str, command: str, **kwargs) -> RemoteCommand:
+        """Start ``command`` on the node, its output is streamed while it runs."""
+        node_name = self.node_name(node_name_prefix)
+        return RemoteCommand(lambda **popen_kwargs: self.pool.start(node_name, command, **popen_kwargs), **kwargs)
+
+    def run(self, node_name_prefix: str, command: str, **kwargs) -> RemoteCommand:
+        """Run ``command`` on the node and wait for it."""
+        remote = self.start(node_name_prefix, command, **kwargs)
+        remote.wait()
+        return remote
+
+    def close(self):
+        self.pool.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def install_mcperf(cluster: ClusterContext, node_name_prefix: str):
+    """Install and configure mcperf with the given name prefix."""
+    node_name = cluster.node_name(node_name_prefix)
+
     if not os.path.exists(INSTALL_SCRIPT_PATH):
         raise FileNotFoundError(f"Install script not found at {INSTALL_SCRIPT_PATH}")
 
-    print(f"Copying mcperf-install script to {found_node.metadata.name}")
-    # Copy the install script to the VM
-    process = subprocess.Popen(
-        f"gcloud compute scp --ssh-key-file=~/.ssh/cloud-computing {INSTALL_SCRIPT_PATH} ubuntu@{found_node.metadata.name}:~/ --zone {ZONE}",
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
+    print(f"Copying mcperf-install script to {node_name}")
+    # Copy the install script to the VM over the open session
+    process = cluster.run(
+        node_name_prefix, "cat > ~/install_mcperf.sh", stdin_path=INSTALL_SCRIPT_PATH
     )
-    for line in process.stdout:
-        print(line, end="")
-    process.wait()
     if process.returncode != 0:
-        print(f"Error copying script: {process.stderr.read()}")
+        print(f"Error copying script: {process.stderr}")
 
     # Make the script executable and run it
-    print(f"Running mcperf-install script on {found_node.metadata.name}")
-    process = subprocess.Popen(
-        f"gcloud compute ssh --ssh-key-file=~/.ssh/cloud-computing ubuntu@{found_node.metadata.name} --zone {ZONE} --command 'chmod +x ~/install_mcperf.sh && ~/install_mcperf.sh'",
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
+    print(f"Running mcperf-install script on {node_name}")
+    process = cluster.run(
+        node_name_prefix, "chmod +x ~/install_mcperf.sh && ~/install_mcperf.sh"
     )
-    for line in process.stdout:
-        print(line, end="")
-    process.wait()
     if process.returncode != 0:
-        print(f"Error running script: {process.stderr.read()}")
-    print(f"Finished running mcperf-install script on {found_node.metadata.name}")
+        print(f"Error running script: {process.stderr}")
+    print(f"Finished running mcperf-install script on {node_name}")
 
 
-def run_memcached_client(node_name_prefix: str):
+def run_memcached_client(cluster: ClusterContext, node_name_prefix: str):
     """Start the memcached client on the given node."""
-    # get the node name
-    found_node = None
-    for node in kubernetes_client.list_node().items:
-        if node.metadata.name.startswith(node_name_prefix):
-            found_node = node
-            break
-    if not found_node:
-        raise ValueError(f"Node with prefix {node_name_prefix} not found")
+    node_name = cluster.node_name(node_name_prefix)
+    print(f"Running memcached client on {node_name}")
 
-    print(f"Running memcached client on {found_node.metadata.name}")
-
-    command = MCPERF_CLIENT_CMD
-    process = subprocess.Popen(
-        f"gcloud compute ssh --ssh-key-file=~/.ssh/cloud-computing ubuntu@{found_node.metadata.name} --zone {ZONE} --command '{command}'",
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
-    )
-    for line in process.stdout:
-        print(line, end="")
-    process.wait()
+    process = cluster.run(node_name_prefix, MCPERF_CLIENT_CMD)
     if process.returncode != 0:
-        print(f"Error running script: {process.stderr.read()}")
-    print(f"\n\nFinished running memcached client on {found_node.metadata.name}")
+        print(f"Error running script: {process.stderr}")
+    print(f"\n\nFinished running memcached client on {node_name}")
 
 
-def load_memcached_data(node_name_prefix: str, memcached_ip: str):
+def load_memcached_data(cluster: ClusterContext, node_name_prefix: str, memcached_ip: str):
     """Load the memcached data on the given node."""
     print(f"Loading memcached data on {node_name_prefix}")
-
-    # get the node name
-    found_node = kubernetes_client.list_node()
-    for node in found_node.items:
-        if node.metadata.name.startswith(node_name_prefix):
-            found_node = node
-            break
-    if not found_node:
-        raise ValueError(f"Node with prefix {node_name_prefix} not found")
+    node_name = cluster.node_name(node_name_prefix)
 
     command = MCPERF_LOAD_DATA_CMD.format(MEMCACHED_IP=memcached_ip)
-
-    process = subprocess.Popen(
-        f"gcloud compute ssh --ssh-key-file=~/.ssh/cloud-computing ubuntu@{found_node.metadata.name} --zone {ZONE} --command '{command}'",
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
-    )
-    for line in process.stdout:
-        print(line, end="")
-    process.wait()
+    process = cluster.run(node_name_prefix, command)
     if process.returncode != 0:
-        print(f"Error running script: {process.stderr.read()}")
-    print(f"Finished loading memcached data on {found_node.metadata.name}")
+        print(f"Error running script: {process.stderr}")
+    print(f"Finished loading memcached data on {node_name}")
 
 
 def run_memcached_benchmark(
-    node_name_prefix: str, memcached_ip: str, internal_agent_ip: str, log_file: str
+    cluster: ClusterContext,
+    node_name_prefix: str,
+    memcached_ip: str,
+    internal_agent_ip: str,
+    log_file: str,
 ):
     """Run the memcached benchmark on the given node."""
-    # get the node name
-    found_node = None
-    for node in kubernetes_client.list_node().items:
-        if node.metadata.name.startswith(node_name_prefix):
-            found_node = node
-            break
-    if not found_node:
-        raise ValueError(f"Node with prefix {node_name_prefix} not found")
-
-    print(f"Running memcached benchmark on {found_node.metadata.name}")
+    node_name = cluster.node_name(node_name_prefix)
+    print(f"Running memcached benchmark on {node_name}")
     # create log file and directory if it doesn't exist
     os.makedirs(os.path.dirname(log_file), exist_ok=True)
 
@@ -178,52 +281,19 @@ def run_memcached_benchmark(
         MEMCACHED_IP=memcached_ip, INTERNAL_AGENT_IP=internal_agent_ip
     )
 
-    # Run the benchmark and capture output
-    process = subprocess.Popen(
-        f"gcloud compute ssh --ssh-key-file=~/.ssh/cloud-computing ubuntu@{found_node.metadata.name} --zone {ZONE} --command '{command}'",
-        shell=True,
-        stdout=subprocess.PIPE,
-        stderr=subprocess.PIPE,
-        text=True,
-        bufsize=1,
-        universal_newlines=True,
-    )
-
-    # Create output file
-    output_file = log_file
-
-    # Print output in real-time and save to file
-    with open(output_file, "w") as f:
-        while True:
-            line = process.stdout.readline()
-            if not line and process.poll() is not None:
-                break
-            if line:
-                print(line, end="")  # Print to console
-                f.write(line)  # Save to file
-                f.flush()  # Ensure it's written immediately
-
-    # Wait for the process to complete
-    process.wait()
+    # Run the benchmark, its output is printed and saved to the log file as it arrives
+    process = cluster.run(node_name_prefix, command, log_file=log_file)
 
     # Check for errors
     if process.returncode != 0:
-        error_output = process.stderr.read()
+        error_output = process.stderr
         print(f"Error running script: {error_output}")
-        with open(output_file, "a") as f:
+        with open(log_file, "a") as f:
             f.write(f"\nError output:\n{error_output}")
+        raise subprocess.CalledProcessError(process.returncode, command, stderr=error_output)
 
-    print(f"\n\nFinished running memcached benchmark on {found_node.metadata.name}")
-    print(f"Results have been saved to {output_file}")
-
-
-def get_internal_agent_ip():
-    """Get the internal agent IP address on the client-agent node."""
-    nodes = kubernetes_client.list_node()
-    for node in nodes.items:
-        if node.metadata.name.startswith("client-agent"):
-            return node.status.addresses[0].address
-    raise ValueError("Client-agent node not found")
+    print(f"\n\nFinished running memcached benchmark on {node_name}")
+    print(f"Results have been saved to {log_file}")
 
 
 def start_interference(interference_pattern: InterferencePattern):
@@ -373,36 +443,60 @@ def main():
         mode = parse_mode(args.mode)
         memcached_ip = "100.96.2.4"  # Hardcoded for now
 
-        internal_agent_ip = get_internal_agent_ip()
-
-        if mode == Mode.INSTALL:
-            print("Installing mcperf on client-agent...")
-            install_mcperf("client-agent")
-            print("Installing mcperf on client-measure...")
-            install_mcperf("client-measure")
-            print("Loading data into memcached...")
-            load_memcached_data("client-measure", memcached_ip)
-
-        elif mode == Mode.CLIENT:
-            print("Starting memcached client...")
-            run_memcached_client("client-agent")
-
-        elif mode == Mode.BENCHMARK:
-            for interference_pattern in InterferencePattern:
-                start_interference(interference_pattern)
-                for i in range(0, 3):
-                    run_memcached_benchmark(
-                        "client-measure",
-                        memcached_ip,
-                        internal_agent_ip,
-                        f"logs/benchmark_results_{interference_pattern.value}_{i}.txt",
+        # nodes are listed once, every node keeps one SSH session for all commands
+        with ClusterContext() as cluster:
+            internal_agent_ip = cluster.internal_ip("client-agent")
+
+            if mode == Mode.INSTALL:
+                print("Installing mcperf on client-agent...")
+                install_mcperf(cluster, "client-agent")
+                print("Installing mcperf on client-measure...")
+                install_mcperf(cluster, "client-measure")
+                print("Loading data into memcached...")
+                load_memcached_data(cluster, "client-measure", memcached_ip)
+
+            elif mode == Mode.CLIENT:
+                print("Starting memcached client...")
+                run_memcached_client(cluster, "client-agent")
+
+            elif mode == Mode.BENCHMARK:
+                # the repetitions of one interference pattern run back to back,
+                # the interference is started once before and stopped after them;
+                # repetitions are added while the capacity is still noisy
+                def make_task(config, repetition):
+                    interference = config["interference"]
+                    return Task(
+                        f"{interference}_{repetition}",
+                        {"interference": interference, "repetition": repetition},
+                        outputs=[f"logs/benchmark_results_{interference}_{repetition}.txt"],
+                        group=interference,
                     )
-                    print("waiting 60 seconds before next benchmark")
-                    time.sleep(60)
-                stop_interference(interference_pattern)
-            print(
-                f"\nFinished memcached benchmark with {interference_pattern.value} interference\n\n"
-            )
+
+                stopper = SequentialStop(
+                    make_task,
+                    lambda task: run_capacity(task.outputs[0], SLO_MS["part1"]),
+                    min_runs=MIN_RUNS,
+                    max_runs=MAX_RUNS,
+                    rel_half_width=REL_HALF_WIDTH,
+                    abs_half_width=SCAN_STEP_QPS,
+                    first_repetition=0,
+                )
+                orchestrator = Orchestrator(
+                    "part1",
+                    lambda task, slot: run_memcached_benchmark(
+                        cluster, "client-measure", memcached_ip, internal_agent_ip, task.outputs[0]
+                    ),
+                    setup=lambda group, slot: start_interference(InterferencePattern(group)),
+                    teardown=lambda group, slot: stop_interference(InterferencePattern(group)),
+                    cooldown=60,
+                    follow_up=stopper,
+                )
+                orchestrator.run(
+                    stopper.initial_tasks(
+                        {"interference": pattern.value} for pattern in InterferencePattern
+                    )
+                )
+                print("\nFinished memcached benchmarks\n\n")
 
     except Exception as e:
         print(f"Error: {str(e)}")
@@ -1,8 +1,13 @@
 import os
+import sys
 import numpy as np
 import matplotlib.pyplot as plt
 import glob
 
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.mcperf import read_mcperf_log
+
 # Configuration types
 config_types = ["none", "cpu", "l1d", "l1i", "l2", "llc", "membw"]
 num_runs = 3  # Number of runs per configuration
@@ -15,14 +20,9 @@ log_dir = "./logs"
 def parse_benchmark_file(file_path):
     data = []
     try:
-        with open(file_path, "r") as f:
-            lines = f.readlines()
-            for line in lines:
-                if line.startswith("read"):
-                    parts = line.split()
-                    p95_latency = float(parts[12])  # p95 column
-                    actual_qps = float(parts[-2])  # QPS column (second to last)
-                    data.append((actual_qps, p95_latency))
+        mcperf_log = read_mcperf_log(file_path)
+        # (actual QPS, p95 latency) per target QPS
+        data = list(zip(mcperf_log["qps"].tolist(), mcperf_log["p95"].tolist()))
     except Exception as e:
         print(f"Error processing {file_path}: {e}")
     return data
@@ -1,9 +1,14 @@
 import os
+import sys
 import glob
 import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.mcperf import read_mcperf_log
+
 # Define the configuration types we're analyzing
 config_types = ["none", "cpu", "l1d", "l1i", "l2", "llc", "membw"]
 num_runs = 3  # Number of runs per configuration
@@ -33,36 +38,22 @@ def parse_benchmark_file(file_path):
         file_path: Path to the benchmark results file
 
     Returns:
-        List of dictionaries, each containing parsed metrics for one QPS level
+        DataFrame with one row of parsed metrics per QPS level
     """
-    data = []
     try:
-        with open(file_path, "r") as f:
-            lines = f.readlines()
-            for line in lines[1:]:
-                if line.startswith("read"):
-                    parts = line.split()
-                    if len(parts) >= 17:
-                        row = {
-                            # 95th percentile latency - our key metric of interest
-                            "p95": float(parts[12]) / 1000.0,  # Convert μs to ms
-                            # Actual QPS achieved
-                            "actual_qps": float(parts[16]),
-                            # Target QPS that was requested
-                            "target_qps": float(parts[17]),
-                            # Extract configuration type from filename
-                            "config": os.path.basename(file_path).split("_")[2],
-                            # Extract run number from filename
-                            "run": int(
-                                os.path.basename(file_path).split("_")[3].split(".")[0]
-                            ),
-                        }
-                        data.append(row)
-                if line.startswith("Warning"):
-                    break
+        df = read_mcperf_log(file_path).to_dataframe()
     except Exception as e:
         print(f"Error processing {file_path}: {e}")
-    return data
+        return pd.DataFrame()
+
+    df = df.rename(columns={"qps": "actual_qps", "target": "target_qps"})
+    # 95th percentile latency - our key metric of interest
+    df["p95"] = df["p95_ms"]  # Convert μs to ms
+    # Extract configuration type and run number from filename
+    name_parts = os.path.basename(file_path).split("_")
+    df["config"] = name_parts[2]
+    df["run"] = int(name_parts[3].split(".")[0])
+    return df
 
 
 # PHASE 1: DATA COLLECTION
@@ -76,7 +67,7 @@ for config in config_types:
         if os.path.exists(file_pattern):
             # Parse and collect data from this file
             data = parse_benchmark_file(file_pattern)
-            all_data.extend(data)
+            all_data.append(data)
         else:
             print(f"Warning: {file_pattern} not found")
 if not all_data:
@@ -87,7 +78,7 @@ if not all_data:
 # ------------------------
 print("Phase 2: Processing data...")
 
-df = pd.DataFrame(all_data)
+df = pd.concat(all_data, ignore_index=True)
 
 # Group by configuration and target QPS to calculate statistics across runs
 # This computes mean and standard deviation for each metric across the runs
@@ -7,23 +7,40 @@ and collects execution times.
 """
 
 import os
-import time
 import subprocess
 import pandas as pd
 from datetime import datetime
 from pathlib import Path
 import argparse
+import sys
+
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from analysis import kube_watch
+from analysis.orchestrator import Orchestrator, Task
+from analysis.sequential import SequentialStop
+from analysis.steady_state import kubelet_sampler, wait_until_steady
 
 # Configuration
 WORKLOADS = ["blackscholes", "canneal", "dedup", "ferret", "freqmine", "radix", "vips"]
 INTERFERENCE_TYPES = ["none", "cpu", "l1d", "l1i", "l2", "llc", "membw"]
-REPETITIONS = 3
+# every configuration runs at least MIN_REPETITIONS times, more (up to
+# MAX_REPETITIONS) until its execution time is known within REL_HALF_WIDTH;
+# on the runs in parsec_results 40 of 49 configurations stop at 3, 3.4 on average
+MIN_REPETITIONS = 3
+MAX_REPETITIONS = 8
+REL_HALF_WIDTH = 0.05
+# Waits end as soon as the node's load is steady, these are the upper bounds
 STABILIZATION_WAIT = 120  # Wait time for interference to stabilize
+STABILIZATION_MIN_WAIT = 10  # ibench needs a moment to allocate its buffers
 COOLDOWN_WAIT = 60  # Wait time between runs
+PARSEC_NODE_LABEL = "cca-project-nodetype=parsec"
 
 # Fixed output directory (no timestamp)
 OUTPUT_DIR = Path("part2/parsec_results")
 RESULTS_CSV = OUTPUT_DIR / "all_results.csv"
+# wait actually used before and after every run, for reproducibility
+WAITS_CSV = OUTPUT_DIR / "waits.csv"
 
 # Create output directory
 OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
@@ -42,20 +59,9 @@ def run_cmd(cmd):
 def wait_for_pod_ready(pod_name, timeout=300):
     """Wait until pod is in Ready state with timeout."""
     print(f"Waiting for pod {pod_name} to be ready...")
-    start_time = time.time()
-    while (time.time() - start_time) < timeout:
-        status = run_cmd(f"kubectl get pod {pod_name} -o jsonpath='{{.status.phase}}'")
-        if status == "Running":
-            ready = run_cmd(
-                f"kubectl get pod {pod_name} -o jsonpath='{{..status.conditions[?(@.type==\"Ready\")].status}}'"
-            )
-            if ready == "True":
-                print(f"Pod {pod_name} is ready!")
-                return True
-        print(
-            f"Pod status: {status}, waiting 5s... (timeout in {int(timeout - (time.time() - start_time))}s)"
-        )
-        time.sleep(5)
+    if kube_watch.wait_for_pod_ready(pod_name, timeout):
+        print(f"Pod {pod_name} is ready!")
+        return True
     print(f"ERROR: Pod {pod_name} not ready after {timeout}s")
     return False
 
@@ -63,28 +69,29 @@ def wait_for_pod_ready(pod_name, timeout=300):
 def wait_for_job_completion(job_name, timeout=1800):
     """Wait until job has completed with timeout."""
     print(f"Waiting for job {job_name} to complete...")
-    start_time = time.time()
-    while (time.time() - start_time) < timeout:
-        status = run_cmd(
-            f"kubectl get job {job_name} -o jsonpath='{{.status.succeeded}}'"
-        )
-        if status == "1":
-            print(f"Job {job_name} completed successfully!")
-            return True
+    succeeded = kube_watch.wait_for_job_completion(job_name, timeout)
+    if succeeded:
+        print(f"Job {job_name} completed successfully!")
+        return True
+    if succeeded is False:
+        print(f"Job {job_name} failed!")
+    else:
+        print(f"ERROR: Job {job_name} did not complete after {timeout}s")
+    return False
 
-        # Check if the job failed
-        failed = run_cmd(f"kubectl get job {job_name} -o jsonpath='{{.status.failed}}'")
-        if failed and int(failed) > 0:
-            print(f"Job {job_name} failed!")
-            return False
 
-        print(
-            f"Job still running, waiting 5s... (timeout in {int(timeout - (time.time() - start_time))}s)"
-        )
-        time.sleep(5)
+def wait_for_pods_deleted(pod_names, timeout=120):
+    """Wait until the pods are gone, raises if one is still there after the timeout."""
+    for pod_name in pod_names:
+        print(f"Waiting for pod {pod_name} to be deleted...")
+        if not kube_watch.wait_for_deletion(pod_name, timeout):
+            raise RuntimeError(f"Pod {pod_name} still exists after {timeout}s")
 
-    print(f"ERROR: Job {job_name} did not complete after {timeout}s")
-    return False
+
+def job_pod_names(job_name):
+    """Names of the pods of a job."""
+    pods = kube_watch.default_apis()[0].list_namespaced_pod("default", label_selector=f"job-name={job_name}")
+    return [pod.metadata.name for pod in pods.items]
 
 
 def extract_execution_time(log_content):
@@ -135,37 +142,167 @@ def apply_interference(interference_type):
 
     # Wait for pod to be created (may take a moment)
     print("Waiting for pod to be created...")
-    for attempt in range(1, 13):  # Try for up to 60 seconds
-        time.sleep(5)
-        # List all pods to debug
-        all_pods = run_cmd("kubectl get pods")
-        print(f"Current pods:\n{all_pods}")
-
-        # Look for the pod by name instead of label
-        pod_name = f"ibench-{interference_type}"
-        pod_exists = run_cmd(f"kubectl get pod {pod_name}")
-
-        if pod_exists and "not found" not in pod_exists:
-            print(f"Found interference pod: {pod_name}")
-            return pod_name
-
-        print(f"Attempt {attempt}/12: Pod not found yet, waiting...")
+    pod_name = f"ibench-{interference_type}"
+    if kube_watch.wait_for_pod_created(pod_name, timeout=60):
+        print(f"Found interference pod: {pod_name}")
+        return pod_name
 
     print(f"ERROR: Interference pod for {interference_type} not found after 60 seconds")
     return None
 
 
-def append_result_to_csv(result_dict):
+def append_result_to_csv(result_dict, csv_path=RESULTS_CSV):
     """Append a single result to the results CSV file."""
     df = pd.DataFrame([result_dict])
 
     # If file exists, append without header, otherwise write with header
-    if os.path.exists(RESULTS_CSV):
-        df.to_csv(RESULTS_CSV, mode="a", header=False, index=False)
+    if os.path.exists(csv_path):
+        df.to_csv(csv_path, mode="a", header=False, index=False)
     else:
-        df.to_csv(RESULTS_CSV, mode="w", header=True, index=False)
+        df.to_csv(csv_path, mode="w", header=True, index=False)
+
+    print(f"Result appended to {csv_path}")
+
+
+def record_wait(phase, workload, interference, repetition, waited, reason):
+    append_result_to_csv(
+        {
+            "timestamp": datetime.now().strftime("%Y%m%d-%H%M%S"),
+            "workload": workload,
+            "interference": interference,
+            "repetition": repetition,
+            "phase": phase,
+            "wait_seconds": round(waited, 1),
+            "reason": reason,
+        },
+        WAITS_CSV,
+    )
+
+
+def cool_down(task, node_name):
+    """Wait until the parsec node is steady again after a run."""
+    waited, reason = wait_until_steady(kubelet_sampler(node_name), COOLDOWN_WAIT, label="parsec node")
+    record_wait("cooldown", **task.params, waited=waited, reason=reason)
+
+
+def execution_time(task):
+    """Execution time of a task from the results CSV, None if it has not run yet."""
+    if not os.path.exists(RESULTS_CSV):
+        return None
+    results = pd.read_csv(RESULTS_CSV)
+    params = task.params
+    matches = results.loc[
+        (results["workload"] == params["workload"])
+        & (results["interference"] == params["interference"])
+        & (results["repetition"] == params["repetition"]),
+        "execution_time",
+    ]
+    return float(matches.iloc[-1]) if len(matches) else None
+
+
+def result_exists(task):
+    """Whether the results CSV already has the execution time of a task."""
+    return execution_time(task) is not None
+
+
+def make_task(config, repetition):
+    return Task(
+        f"{config['workload']}_{config['interference']}_rep{repetition}",
+        {**config, "repetition": repetition},
+    )
+
+
+def clean_up(workload, ibench_pod_name):
+    """Delete the job and the interference pod of a run and wait until they are gone.
+
+    Deleting is asynchronous: without the wait the next repetition could find
+    this run's terminating pod by its job label.
+    """
+    print("Cleaning up...")
+    pod_names = job_pod_names(f"parsec-{workload}")
+    run_cmd(f"kubectl delete job parsec-{workload} --ignore-not-found")
+    if ibench_pod_name:
+        run_cmd(f"kubectl delete pod {ibench_pod_name} --ignore-not-found")
+        pod_names.append(ibench_pod_name)
+    wait_for_pods_deleted(pod_names)
+
+
+def run_repetition(workload, interference, repetition, node_name):
+    """Run one repetition of a workload under interference, raises if it fails."""
+    rep = repetition
+    print(f"\n{'='*80}")
+    print(f"Running {workload} with {interference} interference (repetition {rep})")
+    print(f"{'='*80}")
+
+    # Timestamp for this run
+    timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    log_file = OUTPUT_DIR / f"{workload}_{interference}_rep{rep}_{timestamp}.log"
+
+    ibench_pod_name = None
+    try:
+        # Apply interference if not 'none'
+        if interference != "none":
+            ibench_pod_name = apply_interference(interference)
+            if not ibench_pod_name:
+                raise RuntimeError(f"Could not apply {interference} interference")
+            # Wait for interference pod to be ready
+            if wait_for_pod_ready(ibench_pod_name):
+                # Wait for interference to stabilize
+                waited, reason = wait_until_steady(
+                    kubelet_sampler(node_name, ibench_pod_name),
+                    STABILIZATION_WAIT,
+                    STABILIZATION_MIN_WAIT,
+                    label=f"{interference} interference",
+                )
+                record_wait("stabilization", workload, interference, rep, waited, reason)
+            else:
+                print("WARNING: Interference pod never became ready, continuing anyway...")
+
+        # Launch PARSEC workload
+        print(f"Launching {workload} workload...")
+        run_cmd(f"kubectl create -f parsec-benchmarks/part2a/parsec-{workload}.yaml")
 
-    print(f"Result appended to {RESULTS_CSV}")
+        # Wait for job to complete
+        if not wait_for_job_completion(f"parsec-{workload}"):
+            raise RuntimeError(f"Job parsec-{workload} failed or timed out")
+
+        # Get pod name to collect logs
+        workload_pod = run_cmd(
+            f"kubectl get pods -l job-name=parsec-{workload} -o jsonpath='{{.items[0].metadata.name}}'"
+        )
+        if not workload_pod:
+            raise RuntimeError(f"Could not find pod for job parsec-{workload}")
+
+        # Collect logs
+        print(f"Collecting logs from {workload_pod}...")
+        logs = run_cmd(f"kubectl logs {workload_pod}")
+
+        # Save logs to file
+        with open(log_file, "w") as f:
+            f.write(logs)
+
+        # Extract execution time and append to results CSV
+        exec_time = extract_execution_time(logs)
+        if exec_time is None:
+            raise RuntimeError("Could not extract execution time from logs")
+        result = {
+            "workload": workload,
+            "interference": interference,
+            "repetition": rep,
+            "execution_time": exec_time,
+            "timestamp": timestamp,
+        }
+    except BaseException:
+        # clean up for the retry (also on Ctrl-C), without hiding why the run failed
+        try:
+            clean_up(workload, ibench_pod_name)
+        except Exception as e:
+            print(f"ERROR: Cleanup after the failed run failed too: {e}")
+        raise
+    # the result only counts once the cluster is clean again: a failed
+    # cleanup fails the task and its retry must not add a second row
+    clean_up(workload, ibench_pod_name)
+    append_result_to_csv(result)
 
 
 def parse_arguments():
@@ -192,7 +329,7 @@ def parse_arguments():
         "--repetitions",
         type=int,
         default=3,
-        help="Number of repetitions for test mode (default: 1)",
+        help="Fixed number of repetitions for test mode (default: 3)",
     )
     return parser.parse_args()
 
@@ -207,7 +344,7 @@ def main():
     print(f"Results will be appended to {RESULTS_CSV}")
 
     # Check if parsec node is labeled
-    parsec_nodes = run_cmd("kubectl get nodes -l cca-project-nodetype=parsec")
+    parsec_nodes = kube_watch.default_apis()[0].list_node(label_selector=PARSEC_NODE_LABEL).items
     if not parsec_nodes:
         print("Error: No nodes labeled with cca-project-nodetype=parsec")
         print(
@@ -222,110 +359,32 @@ def main():
         )
         test_workloads = [args.workload]
         test_interference = [args.interference]
-        test_reps = args.repetitions
+        min_reps = max_reps = args.repetitions
     else:
         test_workloads = WORKLOADS
         test_interference = INTERFERENCE_TYPES
-        test_reps = REPETITIONS
-
-    # Calculate total experiments
-    total_experiments = len(test_workloads) * len(test_interference) * test_reps
-    current_experiment = 0
-
-    # Run experiments
-    for workload in test_workloads:
-        for interference in test_interference:
-            for rep in range(1, test_reps + 1):
-                current_experiment += 1
-                progress_pct = (current_experiment / total_experiments) * 100
-
-                print(f"\n{'='*80}")
-                print(
-                    f"Progress: {progress_pct:.1f}% - Run {current_experiment}/{total_experiments}"
-                )
-                print(
-                    f"Running {workload} with {interference} interference (repetition {rep})"
-                )
-                print(f"{'='*80}")
+        min_reps, max_reps = MIN_REPETITIONS, MAX_REPETITIONS
 
-                # Timestamp for this run
-                timestamp = datetime.now().strftime("%Y%m%d-%H%M%S")
-                log_file = (
-                    OUTPUT_DIR / f"{workload}_{interference}_rep{rep}_{timestamp}.log"
-                )
-
-                # Apply interference if not 'none'
-                ibench_pod_name = None
-                if interference != "none":
-                    ibench_pod_name = apply_interference(interference)
-                    if ibench_pod_name:
-                        # Wait for interference pod to be ready
-                        if wait_for_pod_ready(ibench_pod_name):
-                            # Wait for interference to stabilize
-                            print(
-                                f"Waiting {STABILIZATION_WAIT}s for interference to stabilize..."
-                            )
-                            time.sleep(STABILIZATION_WAIT)
-                        else:
-                            print(
-                                "WARNING: Interference pod never became ready, continuing anyway..."
-                            )
-                    else:
-                        print("ERROR: Could not apply interference, skipping this run")
-                        continue
-
-                # Launch PARSEC workload
-                print(f"Launching {workload} workload...")
-                run_cmd(
-                    f"kubectl create -f parsec-benchmarks/part2a/parsec-{workload}.yaml"
-                )
-
-                # Wait for job to complete
-                if not wait_for_job_completion(f"parsec-{workload}"):
-                    print(
-                        f"ERROR: Job parsec-{workload} failed or timed out, skipping log collection"
-                    )
-                    continue
-
-                # Get pod name to collect logs
-                workload_pod = run_cmd(
-                    f"kubectl get pods -l job-name=parsec-{workload} -o jsonpath='{{.items[0].metadata.name}}'"
-                )
-                if not workload_pod:
-                    print(f"ERROR: Could not find pod for job parsec-{workload}")
-                    continue
-
-                # Collect logs
-                print(f"Collecting logs from {workload_pod}...")
-                logs = run_cmd(f"kubectl logs {workload_pod}")
-
-                # Save logs to file
-                with open(log_file, "w") as f:
-                    f.write(logs)
-
-                # Extract execution time and append to results CSV
-                exec_time = extract_execution_time(logs)
-                if exec_time is not None:
-                    result = {
-                        "workload": workload,
-                        "interference": interference,
-                        "repetition": rep,
-                        "execution_time": exec_time,
-                        "timestamp": timestamp,
-                    }
-                    append_result_to_csv(result)
-                else:
-                    print(f"WARNING: Could not extract execution time from logs")
-
-                # Cleanup
-                print("Cleaning up...")
-                run_cmd(f"kubectl delete job parsec-{workload}")
-                if ibench_pod_name:
-                    run_cmd(f"kubectl delete pod {ibench_pod_name}")
-
-                # Cooldown period
-                print(f"Cooldown period: waiting {COOLDOWN_WAIT}s...")
-                time.sleep(COOLDOWN_WAIT)
+    # One task per repetition; finished ones (already in the results CSV)
+    # are skipped and an interrupted sweep resumes where it stopped. Further
+    # repetitions are planned while the execution time is still too noisy.
+    stopper = SequentialStop(
+        make_task, execution_time, min_runs=min_reps, max_runs=max_reps, rel_half_width=REL_HALF_WIDTH
+    )
+    configs = [
+        {"workload": workload, "interference": interference}
+        for workload in test_workloads
+        for interference in test_interference
+    ]
+    orchestrator = Orchestrator(
+        "part2-interference",
+        lambda task, slot: run_repetition(**task.params, node_name=slot),
+        slots=[parsec_nodes[0].metadata.name],
+        cooldown=cool_down,
+        is_done=result_exists,
+        follow_up=stopper,
+    )
+    orchestrator.run(stopper.initial_tasks(configs))
 
     print("\nAll experiments completed!")
     print(f"Results saved to {RESULTS_CSV}")
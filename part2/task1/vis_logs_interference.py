@@ -15,11 +15,38 @@ import argparse
 import os
 import sys
 
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", ".."))
+from analysis.stats import bootstrap_table
+
 # Default configuration (can be overridden with command line args)
 WORKLOADS = ["blackscholes", "canneal", "dedup", "ferret", "freqmine", "radix", "vips"]
 INTERFERENCE_TYPES = ["none", "cpu", "l1d", "l1i", "l2", "llc", "membw"]
 
 
+def normalize_times(df, baseline):
+    """Execution times divided by the baseline median of their workload."""
+    normalized_df = df.copy()
+    normalized_df["normalized_time"] = normalized_df["execution_time"] / normalized_df[
+        "workload"
+    ].map(baseline)
+    return normalized_df
+
+
+def normalized_time_ci(df):
+    """Median normalized time with a 95% bootstrap interval per workload and interference."""
+    baseline = (
+        df[df["interference"] == "none"].groupby("workload")["execution_time"].median()
+    )
+    ci_df = bootstrap_table(
+        normalize_times(df, baseline),
+        ["workload", "interference"],
+        "normalized_time",
+        "median",
+    )
+    return ci_df.round(3)
+
+
 def analyze_results(df, workloads=None, interference_types=None):
     """Analyze results and create normalized execution time table."""
     # Use provided lists or defaults
@@ -36,15 +63,7 @@ def analyze_results(df, workloads=None, interference_types=None):
         print(f"  {workload}: {time:.2f}s")
 
     # Calculate normalized execution time
-    normalized_df = df.copy()
-    normalized_df["normalized_time"] = normalized_df.apply(
-        lambda row: (
-            row["execution_time"] / baseline[row["workload"]]
-            if row["workload"] in baseline.index
-            else np.nan
-        ),
-        axis=1,
-    )
+    normalized_df = normalize_times(df, baseline)
 
     # Group by workload and interference, and calculate median of normalized times
     result_df = (
@@ -210,6 +229,9 @@ def main():
     # Visualize results
     print("\nCreating visualizations...")
     styled_df = visualize_results(normalized_df, args.output_dir)
+    normalized_time_ci(df).to_csv(
+        Path(args.output_dir) / "normalized_times_ci.csv", index=False
+    )
 
     # Print normalized times table
     print("\nNormalized execution times:")
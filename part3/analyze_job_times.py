@@ -1,89 +1,24 @@
-import json
 import numpy as np
-from datetime import datetime
 import os
+import sys
 
-
-def parse_datetime(dt_str):
-    """Parse Kubernetes datetime string to Python datetime object."""
-    return datetime.strptime(dt_str, "%Y-%m-%dT%H:%M:%SZ")
-
-
-def calculate_execution_time(start_time, completion_time):
-    """Calculate execution time in seconds."""
-    start = parse_datetime(start_time)
-    completion = parse_datetime(completion_time)
-    return (completion - start).total_seconds()
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.pods import batch_window, job_times, read_pods
 
 
 def process_pods_file(file_path):
     """Process a pods JSON file and extract job information."""
-    with open(file_path, "r") as f:
-        data = json.load(f)
-
-    job_pods = {}  # Dictionary to store pods by job name
-    earliest_start = None
-    latest_completion = None
-
-    # Process each pod
-    for pod in data.get("items", []):
-        # Check if the pod is part of a job
-        metadata = pod.get("metadata", {})
-        labels = metadata.get("labels", {})
-
-        # Find job name from labels
-        job_name = labels.get("job-name") or labels.get("batch.kubernetes.io/job-name")
-
-        if job_name and "parsec" in job_name:  # Only consider parsec jobs
-            status = pod.get("status", {})
-
-            start_time = status.get("startTime")
-            if not start_time:
-                continue
-
-            # Find container completion time
-            completion_time = None
-            container_statuses = status.get("containerStatuses", [])
-            for container in container_statuses:
-                if "state" in container and "terminated" in container["state"]:
-                    if "finishedAt" in container["state"]["terminated"]:
-                        completion_time = container["state"]["terminated"]["finishedAt"]
-                        break
-
-            if start_time and completion_time:
-                exec_time = calculate_execution_time(start_time, completion_time)
-
-                if job_name not in job_pods:
-                    job_pods[job_name] = []
-
-                job_pods[job_name].append(
-                    {
-                        "name": metadata.get("name"),
-                        "exec_time": exec_time,
-                        "start": parse_datetime(start_time),
-                        "completion": parse_datetime(completion_time),
-                    }
-                )
-
-                # Update makespan tracking
-                start_dt = parse_datetime(start_time)
-                completion_dt = parse_datetime(completion_time)
-
-                if earliest_start is None or start_dt < earliest_start:
-                    earliest_start = start_dt
-                if latest_completion is None or completion_dt > latest_completion:
-                    latest_completion = completion_dt
-
-    # Calculate average execution time for each job
-    jobs = {}
-    for job_name, pods in job_pods.items():
-        if pods:
-            jobs[job_name] = np.mean([pod["exec_time"] for pod in pods])
-
-    # Calculate makespan (total time from earliest start to latest completion)
+    jobs_df = job_times(read_pods(file_path))
+
+    # Average execution time for each job
+    jobs = jobs_df.groupby("job")["exec_s"].mean().to_dict()
+
+    # Makespan (total time from earliest start to latest completion)
     makespan = None
-    if earliest_start and latest_completion:
-        makespan = (latest_completion - earliest_start).total_seconds()
+    earliest_start, latest_completion = batch_window(jobs_df)
+    if earliest_start is not None:
+        makespan = (latest_completion - earliest_start) / 1000
 
     return jobs, makespan
 
@@ -1,115 +1,50 @@
-import json
-import re
-from datetime import datetime
+import sys
+from datetime import datetime, timezone
 import os
 import numpy as np
 
-
-def parse_datetime(dt_str):
-    """Parse Kubernetes datetime string to Python datetime object."""
-    return datetime.strptime(dt_str, "%Y-%m-%dT%H:%M:%SZ")
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.mcperf import read_mcperf_log
+from analysis.pods import batch_window, job_times, read_pods
+from analysis.stats import bootstrap_ci, format_ci
 
 
 def get_batch_job_time_window(pods_file):
-    """Extract start time of first batch job and end time of last batch job."""
-    with open(pods_file, "r") as f:
-        data = json.load(f)
-
-    earliest_start = None
-    latest_completion = None
-
-    # Process each pod
-    for pod in data.get("items", []):
-        # Check if the pod is part of a job
-        metadata = pod.get("metadata", {})
-        labels = metadata.get("labels", {})
-
-        # Find job name from labels
-        job_name = labels.get("job-name") or labels.get("batch.kubernetes.io/job-name")
-
-        if job_name and "parsec" in job_name:  # Only consider parsec jobs
-            status = pod.get("status", {})
-
-            start_time = status.get("startTime")
-            if not start_time:
-                continue
-
-            # Find container completion time
-            completion_time = None
-            container_statuses = status.get("containerStatuses", [])
-            for container in container_statuses:
-                if "state" in container and "terminated" in container["state"]:
-                    if "finishedAt" in container["state"]["terminated"]:
-                        completion_time = container["state"]["terminated"]["finishedAt"]
-                        break
-
-            if start_time and completion_time:
-                start_dt = parse_datetime(start_time)
-                completion_dt = parse_datetime(completion_time)
-
-                if earliest_start is None or start_dt < earliest_start:
-                    earliest_start = start_dt
-                if latest_completion is None or completion_dt > latest_completion:
-                    latest_completion = completion_dt
-
-    return earliest_start, latest_completion
+    """Extract start time of first batch job and end time of last batch job (UTC)."""
+    earliest_start_ms, latest_completion_ms = batch_window(job_times(read_pods(pods_file)))
+    if earliest_start_ms is None:
+        return None, None
+    return (
+        datetime.fromtimestamp(earliest_start_ms / 1000, timezone.utc),
+        datetime.fromtimestamp(latest_completion_ms / 1000, timezone.utc),
+    )
 
 
 def parse_mcperf_data(mcperf_file, start_time, end_time):
     """Parse mcperf data file and extract 95th percentile latency data points."""
-    data_points = []
-    slo_violations = 0
-    total_checked = 0
-
-    with open(mcperf_file, "r") as f:
-        lines = f.readlines()
+    mcperf_log = read_mcperf_log(mcperf_file)
+    total_checked = len(mcperf_log)
 
-    # Skip header and comment lines
-    for line_num, line in enumerate(lines):
-        if line.startswith("#") or not line.strip():
-            continue
+    # Timestamps are milliseconds since epoch
+    window_start_ms = start_time.timestamp() * 1000
+    window_end_ms = end_time.timestamp() * 1000
 
-        # Parse columns (space-separated)
-        parts = line.strip().split()
-        if len(parts) < 15:  # Need at least 15 columns for ts_start and ts_end
-            continue
+    # Check if measurement overlaps with batch job window
+    in_window = (mcperf_log["ts_end"] >= window_start_ms) & (
+        mcperf_log["ts_start"] <= window_end_ms
+    )
 
-        try:
-            # Extract p95 latency (microseconds) - column 13
-            p95_latency_us = float(parts[12])
+    # Convert latency to milliseconds
+    data_points = mcperf_log["p95"][in_window] / 1000.0
 
-            # Extract timestamps (milliseconds since epoch)
-            ts_start_ms = int(parts[-2])
-            ts_end_ms = int(parts[-1])
-
-            # Convert to datetime using UTC (important for timezone consistency)
-            ts_start = datetime.utcfromtimestamp(ts_start_ms / 1000.0)
-            ts_end = datetime.utcfromtimestamp(ts_end_ms / 1000.0)
-
-            total_checked += 1
-
-            # Check if measurement overlaps with batch job window
-            if ts_end < start_time or ts_start > end_time:
-                continue
-
-            # Convert latency to milliseconds
-            p95_latency_ms = p95_latency_us / 1000.0
-
-            # Add to data points
-            data_points.append(p95_latency_ms)
-
-            # Check SLO violation (latency > 1ms)
-            if p95_latency_ms > 1.0:
-                slo_violations += 1
-
-        except (ValueError, IndexError) as e:
-            print(f"Error parsing line {line_num}: {line.strip()[:50]}... - {str(e)}")
-            continue
+    # Check SLO violation (latency > 1ms)
+    slo_violations = int(np.count_nonzero(data_points > 1.0))
 
     print(f"Total mcperf records checked: {total_checked}")
     print(f"Data points in batch window: {len(data_points)}")
 
-    return data_points, slo_violations
+    return data_points.tolist(), slo_violations
 
 
 def main():
@@ -119,6 +54,7 @@ def main():
     print("====================================")
 
     results = []
+    violations = []
 
     for i in range(1, 4):
         pods_file = os.path.join(directory, f"pods_{i}.json")
@@ -150,12 +86,20 @@ def main():
             if total_points > 0:
                 slo_violation_ratio = slo_violations / total_points
                 results.append(slo_violation_ratio)
+                violated = np.array(data_points) > 1.0
+                violations.append(violated)
 
                 print(f"Data points analyzed: {total_points}")
                 print(f"SLO violations (latency > 1ms): {slo_violations}")
                 print(
                     f"SLO violation ratio: {slo_violation_ratio:.4f} ({slo_violations}/{total_points})"
                 )
+                print(
+                    f"SLO violation ratio, 95% CI: {format_ci(*bootstrap_ci(violated), digits=4)}"
+                )
+                print(
+                    f"p95 latency (ms), mean with 95% CI: {format_ci(*bootstrap_ci(data_points), digits=3)}"
+                )
             else:
                 print(f"No data points found during batch job window.")
 
@@ -172,6 +116,10 @@ def main():
         print(f"SLO violation ratios: {', '.join(f'{r:.4f}' for r in results)}")
         print(f"Mean SLO violation ratio: {mean_ratio:.4f}")
         print(f"Standard deviation: {std_dev:.4f}")
+        # measurement windows of all runs pooled
+        print(
+            f"Pooled SLO violation ratio, 95% CI: {format_ci(*bootstrap_ci(np.concatenate(violations)), digits=4)}"
+        )
 
         # Print in table format for easy inclusion in reports
         print("\nTable Format:")
@@ -2,12 +2,17 @@
 
 import matplotlib.pyplot as plt
 import numpy as np
-import json
 import pandas as pd
-from datetime import datetime
 import os
+import sys
 from matplotlib.ticker import FuncFormatter
 
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.downsample import downsample, envelope
+from analysis.mcperf import read_mcperf_log
+from analysis.pods import job_times, read_pods
+
 # Define colors for different workloads - using matplotlib's default color cycle for consistency
 WORKLOADS = ["ferret", "dedup", "canneal", "freqmine", "blackscholes", "radix", "vips"]
 # Define custom colors for each workload
@@ -24,126 +29,57 @@ WORKLOAD_COLORS = {
 
 def parse_mcperf_data(file_path):
     """Parse mcperf data into a pandas DataFrame."""
-    data = []
-    # Correction for the 2-hour time difference (2 hours = 7,200,000 milliseconds)
-    TIME_CORRECTION_MS = 7200000
-
-    with open(file_path, "r") as f:
-        for line in f:
-            if line.startswith("#") or not line.strip():
-                continue
-            parts = line.strip().split()
-            if parts[0] == "read" and len(parts) >= 16:
-                # Get raw Unix epoch timestamps in milliseconds and apply time correction
-                ts_start_ms = int(parts[-2]) - TIME_CORRECTION_MS
-                ts_end_ms = int(parts[-1]) - TIME_CORRECTION_MS
-                ts_mid_ms = (ts_start_ms + ts_end_ms) / 2
-
-                # Extract performance metrics
-                p95 = float(parts[12])
-                qps = float(parts[16])  # QPS is typically the 2nd value
-
-                data.append(
-                    {
-                        "timestamp_ms": ts_mid_ms,
-                        "ts_start_ms": ts_start_ms,
-                        "ts_end_ms": ts_end_ms,
-                        "p95_us": p95,  # Store original microseconds
-                        "p95_ms": p95 / 1000,  # Convert to milliseconds
-                        "qps": qps,
-                    }
-                )
-
-    # Convert to DataFrame for easier manipulation
-    return pd.DataFrame(data)
+    mcperf_log = read_mcperf_log(file_path)
 
+    # Unix epoch timestamps in milliseconds, already UTC like the pod times
+    ts_start_ms = mcperf_log["ts_start"]
+    ts_end_ms = mcperf_log["ts_end"]
 
-def parse_datetime(dt_str):
-    """Parse Kubernetes datetime string to Python datetime object."""
-    return datetime.strptime(dt_str, "%Y-%m-%dT%H:%M:%SZ")
+    # Convert to DataFrame for easier manipulation
+    return pd.DataFrame(
+        {
+            "timestamp_ms": (ts_start_ms + ts_end_ms) / 2,
+            "ts_start_ms": ts_start_ms,
+            "ts_end_ms": ts_end_ms,
+            "p95_us": mcperf_log["p95"],  # Store original microseconds
+            "p95_ms": mcperf_log["p95"] / 1000,  # Convert to milliseconds
+            "qps": mcperf_log["qps"],
+        }
+    )
 
 
 def process_pods_file(file_path):
     """Process a pods JSON file and extract job events with timestamps."""
-    with open(file_path, "r") as f:
-        data = json.load(f)
-
-    job_events = []
-    earliest_start_ms = None
-
-    # Process each pod
-    for pod in data.get("items", []):
-        metadata = pod.get("metadata", {})
-        labels = metadata.get("labels", {})
-
-        job_name = labels.get("job-name") or labels.get("batch.kubernetes.io/job-name")
-
-        if job_name and any(workload in job_name for workload in WORKLOADS):
-            # Get the workload name without the "parsec-" prefix
-            workload_name = job_name.replace("parsec-", "")
-
-            status = pod.get("status", {})
-            spec = pod.get("spec", {})
-
-            # Get start time
-            start_time = status.get("startTime")
-            if not start_time:
-                for container in status.get("containerStatuses", []):
-                    if "state" in container and "terminated" in container["state"]:
-                        if "startedAt" in container["state"]["terminated"]:
-                            start_time = container["state"]["terminated"]["startedAt"]
-                            break
-
-            # Get end time
-            completion_time = None
-            for container in status.get("containerStatuses", []):
-                if "state" in container and "terminated" in container["state"]:
-                    if "finishedAt" in container["state"]["terminated"]:
-                        completion_time = container["state"]["terminated"]["finishedAt"]
-                        break
-
-            if start_time and completion_time:
-                start_dt = parse_datetime(start_time)
-                completion_dt = parse_datetime(completion_time)
-
-                start_ms = int(start_dt.timestamp() * 1000)
-                end_ms = int(completion_dt.timestamp() * 1000)
-
-                # Get node information
-                node_name = spec.get("nodeName", "unknown")
-
-                # Update earliest start time
-                if earliest_start_ms is None or start_ms < earliest_start_ms:
-                    earliest_start_ms = start_ms
-
-                # Record start event
-                job_events.append(
-                    {
-                        "timestamp_ms": start_ms,
-                        "process_name": workload_name,
-                        "event": "START",
-                        "node": node_name,
-                    }
-                )
-
-                # Record end event
-                job_events.append(
-                    {
-                        "timestamp_ms": end_ms,
-                        "process_name": workload_name,
-                        "event": "FINISH",
-                        "node": node_name,
-                    }
-                )
-
-    # Convert to DataFrame
-    events_df = pd.DataFrame(job_events)
-    return events_df, earliest_start_ms
+    pods = read_pods(file_path)
+    workload_pods = pods[pods["job"].map(lambda job: any(workload in job for workload in WORKLOADS))]
+    jobs = job_times(workload_pods, job_filter="")
+    if jobs.empty:
+        return pd.DataFrame(), None
+
+    # Get the workload name without the "parsec-" prefix
+    workload_names = jobs["job"].str.replace("parsec-", "", regex=False)
+    node_names = jobs["node"].replace("", "unknown")
+    start_events = pd.DataFrame(
+        {
+            "timestamp_ms": jobs["start_ms"].astype(np.int64),
+            "process_name": workload_names,
+            "event": "START",
+            "node": node_names,
+        }
+    )
+    end_events = start_events.assign(timestamp_ms=jobs["end_ms"].astype(np.int64), event="FINISH")
+    # one START and FINISH event per job, in the order of the pods
+    events_df = (
+        pd.concat([start_events, end_events])
+        .sort_index(kind="stable")
+        .reset_index(drop=True)
+    )
+    return events_df, int(jobs["start_ms"].min())
 
 
-def create_plots(run_number):
-    mcperf_file = os.path.abspath(f"part3/part_3_results_group_020/mcperf_{run_number}.txt")
-    pods_file = os.path.abspath(f"part3/part_3_results_group_020/pods_{run_number}.json")
+def create_plots(run_number, input_directory_path="part3/part_3_results_group_020", save_folder_path="."):
+    mcperf_file = os.path.abspath(os.path.join(input_directory_path, f"mcperf_{run_number}.txt"))
+    pods_file = os.path.abspath(os.path.join(input_directory_path, f"pods_{run_number}.json"))
     
 
     if not os.path.exists(mcperf_file) or not os.path.exists(pods_file):
@@ -202,11 +138,13 @@ def create_plots(run_number):
 
     min_start_ms = min(mcperf_df["ts_start_ms"])
 
-    # Plot P95 latency as vertical bars spanning from ts_start to ts_end
+    # Plot P95 latency as vertical bars spanning from ts_start to ts_end, on long
+    # runs consecutive intervals are merged into one bar of their highest p95
+    p95_bars = envelope(mcperf_df, "ts_start_ms", "ts_end_ms", "p95_ms")
     artistA_95p = axA_95p.bar(
-        (mcperf_df["ts_start_ms"] - min_start_ms) / 1000,  # left edge (start time in seconds)
-        mcperf_df["p95_ms"],  # height (latency value)
-        width=(mcperf_df["ts_end_ms"] - mcperf_df["ts_start_ms"]) / 1000,  # width (duration in seconds)
+        (p95_bars["ts_start_ms"] - min_start_ms) / 1000,  # left edge (start time in seconds)
+        p95_bars["p95_ms_max"],  # height (latency value)
+        width=(p95_bars["ts_end_ms"] - p95_bars["ts_start_ms"]) / 1000,  # width (duration in seconds)
         bottom=0,  # start from y=0
         color="tab:blue",
         alpha=0.7,
@@ -232,8 +170,9 @@ def create_plots(run_number):
     axA_QPS.grid(False)
 
     # Plot QPS points
+    qps_points = downsample(mcperf_df, "ts_start_ms", "qps")
     artistA_QPS = axA_QPS.plot(
-        (mcperf_df["ts_start_ms"] - min_start_ms) / 1000, mcperf_df["qps"], color="tab:orange", label="QPS"
+        (qps_points["ts_start_ms"] - min_start_ms) / 1000, qps_points["qps"], color="tab:orange", label="QPS"
     )
 
     # Add legend with SLO line included
@@ -376,7 +315,7 @@ def create_plots(run_number):
     plt.tight_layout()
 
     # Save figure
-    output_path = f"memcached_latency_run_{run_number}.png"
+    output_path = os.path.join(save_folder_path, f"memcached_latency_run_{run_number}.png")
     plt.savefig(output_path, dpi=300, bbox_inches="tight")
     plt.close()
 
@@ -395,9 +334,10 @@ def create_plots(run_number):
         )
 
 
-# Run the visualization for all three runs
-for run in [1,2,3]:
-    print(f"\nProcessing run {run}...")
-    create_plots(run)
+if __name__ == "__main__":
+    # Run the visualization for all three runs
+    for run in [1,2,3]:
+        print(f"\nProcessing run {run}...")
+        create_plots(run)
 
-print("\nAll plots created successfully!")
+    print("\nAll plots created successfully!")
@@ -1,4 +1,5 @@
 import os
+import sys
 import csv
 import statistics
 import matplotlib.pyplot as plt
@@ -6,6 +7,16 @@ from matplotlib.ticker import FuncFormatter
 import pandas as pd
 import numpy as np
 
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.clockalign import align_to_scheduler
+from analysis.downsample import downsample
+from analysis.intervals import intervals_to_events
+from analysis.mcperf import read_mcperf_log
+from analysis.scheduler_log import read_scheduler_log
+from analysis.stats import bootstrap_ci, format_ci
+from analysis.timeline import Timeline, attribute_violations, latency_by_colocation, measurement_windows
+
 # Define colors for different workloads - using matplotlib's default color cycle for consistency
 WORKLOADS = ["ferret", "dedup", "canneal", "freqmine", "blackscholes", "radix", "vips"]
 # Define custom colors for each workload
@@ -20,6 +31,7 @@ WORKLOAD_COLORS = {
 }
 
 DURATION_MARGIN = 60
+SLO_MS = 0.8
 
 def ensure_directory_exists(directory_path):
     """Create directory if it doesn't exist."""
@@ -27,240 +39,67 @@ def ensure_directory_exists(directory_path):
         os.makedirs(directory_path)
         print(f"Created directory: {directory_path}")
 
-def parse_mcperf_data(file_path):
-    """Parse mcperf data into a pandas DataFrame."""
-    data = []
-
-    with open(file_path, mode='r') as file:
-        # Get QPS and their timestamps
-        file.readline()
-        interval_line = file.readline().strip()
-        interval_string = interval_line.split("=")[1].strip().split(" ", 1)
-        
-        number_of_intervals = int(interval_string[0])
-
-        file.readline()
-        timestamp_start_ms = int(file.readline().split(":")[1].strip())
-        timestamp_end_ms = int(file.readline().split(":")[1].strip())
-        timestamp_delta_ms = (timestamp_end_ms - timestamp_start_ms) / number_of_intervals
-
-        file.readline()
-        file.readline()
-        for i in range(number_of_intervals):
-            line = file.readline().strip().split()
-            latency_95th = float(line[-6])
-            qps = float(line[-2])
-
-            data.append(
-                {
-                    "timestamp_ms": timestamp_start_ms + i * timestamp_delta_ms,
-                    "p95_us": latency_95th, # Store original microseconds
-                    "p95_ms": latency_95th / 1000, # Convert to milliseconds
-                    "qps": qps,
-                }
-            )
-
-        return pd.DataFrame(data)
+def parse_mcperf_data(file_path, scheduler_events=None):
+    """Parse mcperf data into a pandas DataFrame.
+
+    With the scheduler events the interval times are moved from the clock of
+    the mcperf client to the clock of the scheduler.
+    """
+    mcperf_log = read_mcperf_log(file_path)
+
+    mcperf_df = pd.DataFrame(
+        {
+            "timestamp_ms": mcperf_log.interval_start_ms(),
+            "p95_us": mcperf_log["p95"],  # Store original microseconds
+            "p95_ms": mcperf_log["p95"] / 1000,  # Convert to milliseconds
+            "qps": mcperf_log["qps"],
+        }
+    )
+    if scheduler_events is not None and not mcperf_df.empty:
+        starts, ends = measurement_windows(mcperf_df)
+        clock = align_to_scheduler(starts, ends, mcperf_df["qps"].to_numpy(), scheduler_events)
+        mcperf_df["timestamp_ms"] = clock.apply(starts)
+    return mcperf_df
     
-def process_execution_intervals(file_path):
-    # Are the jobs running or not
-    blackscholes_is_running = False
-    canneal_is_running = False
-    dedup_is_running = False
-    ferret_is_running = False
-    freqmine_is_running = False
-    radix_is_running = False
-    vips_is_running = False
-
-    job_events = []
-    earliest_start_ms = None
-
-    df = pd.read_csv(file_path)
-    for index, row in df.iterrows():
-        job_name = row["job_name"].strip()
-        timestamp = int(row["timestamp"]) * 1000
-        status = row["status"].strip()
-
-        if earliest_start_ms is None or timestamp < earliest_start_ms:
-            earliest_start_ms = timestamp
-
-        if job_name == "blackscholes":
-            if status == "RUNNING" and not blackscholes_is_running:
-                blackscholes_is_running = True
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "blackscholes",
-                        "event": "START",
-                        "node": None,
-                    }
-                )
-            elif (status == "PAUSED" or status == "COMPLETED") and blackscholes_is_running:
-                blackscholes_is_running = False
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "blackscholes",
-                        "event": "END",
-                        "node": None,
-                    }
-                )
-        elif job_name == "canneal":
-            if status == "RUNNING" and not canneal_is_running:
-                canneal_is_running = True
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "canneal",
-                        "event": "START",
-                        "node": None,
-                    }
-                )
-            elif (status == "PAUSED" or status == "COMPLETED") and canneal_is_running:
-                canneal_is_running = False
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "canneal",
-                        "event": "END",
-                        "node": None,
-                    }
-                )
-        elif job_name == "dedup":
-            if status == "RUNNING" and not dedup_is_running:
-                dedup_is_running = True
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "dedup",
-                        "event": "START",
-                        "node": None,
-                    }
-                )
-            elif (status == "PAUSED" or status == "COMPLETED") and dedup_is_running:
-                dedup_is_running = False
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "dedup",
-                        "event": "END",
-                        "node": None,
-                    }
-                )
-        elif job_name == "ferret":
-            if status == "RUNNING" and not ferret_is_running:
-                ferret_is_running = True
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "ferret",
-                        "event": "START",
-                        "node": None,
-                    }
-                )
-            elif (status == "PAUSED" or status == "COMPLETED") and ferret_is_running:
-                ferret_is_running = False
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "ferret",
-                        "event": "END",
-                        "node": None,
-                    }
-                )
-        elif job_name == "freqmine":
-            if status == "RUNNING" and not freqmine_is_running:
-                freqmine_is_running = True
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "freqmine",
-                        "event": "START",
-                        "node": None,
-                    }
-                )
-            elif (status == "PAUSED" or status == "COMPLETED") and freqmine_is_running:
-                freqmine_is_running = False
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "freqmine",
-                        "event": "END",
-                        "node": None,
-                    }
-                )
-        elif job_name == "radix":
-            if status == "RUNNING" and not radix_is_running:
-                radix_is_running = True
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "radix",
-                        "event": "START",
-                        "node": None,
-                    }
-                )
-            elif (status == "PAUSED" or status == "COMPLETED") and radix_is_running:
-                radix_is_running = False
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "radix",
-                        "event": "END",
-                        "node": None,
-                    }
-                )
-        elif job_name == "vips":
-            if status == "RUNNING" and not vips_is_running:
-                vips_is_running = True
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "vips",
-                        "event": "START",
-                        "node": None,
-                    }
-                )
-            elif (status == "PAUSED" or status == "COMPLETED") and vips_is_running:
-                vips_is_running = False
-                job_events.append(
-                    {
-                        "timestamp_ms": timestamp,
-                        "process_name": "vips",
-                        "event": "END",
-                        "node": None,
-                    }
-                )
-
-    events_df = pd.DataFrame(job_events)
+def process_execution_intervals(scheduler_events):
+    job_status = scheduler_events.job_status()
+    if job_status.empty:
+        return pd.DataFrame(), None
+
+    earliest_start_ms = int(job_status["timestamp"].min()) * 1000
+
+    events = intervals_to_events(scheduler_events.intervals())
+    events_df = pd.DataFrame(
+        {
+            "timestamp_ms": events["timestamp"].astype(int) * 1000,
+            "process_name": events["job"],
+            "event": events["event"],
+            "node": None,
+        }
+    )
     return events_df, earliest_start_ms
 
-def process_cpu_usage_of_memcached(file_path):
-    df = pd.read_csv(file_path)
-
-    memcached_cpu_usage = []
-    for index, row in df.iterrows():
-        timestamp_ms = int(row["timestamp"]) * 1000
-        cpu_usage = int(row["memcached_cores_usage"])
-        memcached_cpu_usage.append(
-            {
-                "timestamp_ms": timestamp_ms,
-                "memcached_cores_usage": cpu_usage,
-            }
-        )
-    return pd.DataFrame(memcached_cpu_usage)
+def process_cpu_usage_of_memcached(scheduler_events):
+    cores_usage = scheduler_events.memcached_cores_usage()
+    return pd.DataFrame(
+        {
+            "timestamp_ms": cores_usage["timestamp"] * 1000,
+            "memcached_cores_usage": cores_usage["memcached_cores_usage"],
+        }
+    )
 
 def create_plots_A(input_directory_path, policy_number, run_number, save_folder_path):
     mcperf_file = os.path.join(input_directory_path, f"mcperf_policy{policy_number}_run{run_number}.log")
-    scheduler_file = os.path.join(input_directory_path, f"job_times/job_start_end_times/job_times_policy{policy_number}_run{run_number}.csv")
+    scheduler_file = os.path.join(input_directory_path, f"scheduler_policy{policy_number}_run{run_number}.log")
     
     if not os.path.exists(mcperf_file) or not os.path.exists(scheduler_file):
         print(f"Missing files for run {run_number}. Skipping.")
         return
 
     # Parse data into DataFrames
-    mcperf_df = parse_mcperf_data(mcperf_file)
-    events_df, earliest_start_ms = process_execution_intervals(scheduler_file)
+    scheduler_events = read_scheduler_log(scheduler_file)
+    mcperf_df = parse_mcperf_data(mcperf_file, scheduler_events)
+    events_df, earliest_start_ms = process_execution_intervals(scheduler_events)
 
     if mcperf_df.empty or events_df.empty:
         print(f"No data found for run {run_number}. Skipping.")
@@ -309,9 +148,11 @@ def create_plots_A(input_directory_path, policy_number, run_number, save_folder_
     axA_95p.set_yticks(np.arange(0, max_latency + 0.1, 0.4))
 
     # Plot P95 latency line
+    # min/max per bucket so that no latency spike is lost on long runs
+    p95_points = downsample(mcperf_df, "timestamp", "p95_ms", method="minmax")
     (artistA_95p,) = axA_95p.plot(
-        mcperf_df["timestamp"],
-        mcperf_df["p95_ms"],
+        p95_points["timestamp"],
+        p95_points["p95_ms"],
         color="tab:blue",
         label="95 percentile latency",
     )
@@ -333,8 +174,9 @@ def create_plots_A(input_directory_path, policy_number, run_number, save_folder_
     axA_QPS.tick_params(axis="y", labelcolor="tab:orange")
     axA_QPS.grid(False)
 
+    qps_points = downsample(mcperf_df, "timestamp", "qps")
     (artistA_QPS,) = axA_QPS.plot(
-        mcperf_df["timestamp"], mcperf_df["qps"], color="tab:orange", label="QPS"
+        qps_points["timestamp"], qps_points["qps"], color="tab:orange", label="QPS"
     )
 
     # Add legend with SLO line included
@@ -434,17 +276,17 @@ def create_plots_A(input_directory_path, policy_number, run_number, save_folder_
 
 def create_plots_B(input_directory_path, policy_number, run_number, save_folder_path):
     mcperf_file = os.path.join(input_directory_path, f"mcperf_policy{policy_number}_run{run_number}.log")
-    scheduler_file = os.path.join(input_directory_path, f"job_times/job_start_end_times/job_times_policy{policy_number}_run{run_number}.csv")
-    cpu_usage_file = os.path.join(input_directory_path, f"job_times/memcached_cpu_usage/memcached_cpu_usage_policy{policy_number}_run{run_number}.csv")
+    scheduler_file = os.path.join(input_directory_path, f"scheduler_policy{policy_number}_run{run_number}.log")
 
-    if not os.path.exists(mcperf_file) or not os.path.exists(scheduler_file) or not os.path.exists(cpu_usage_file):
+    if not os.path.exists(mcperf_file) or not os.path.exists(scheduler_file):
         print(f"Missing files for run {run_number}. Skipping.")
         return
 
     # Parse data into DataFrames
-    mcperf_df = parse_mcperf_data(mcperf_file)
-    events_df, earliest_start_ms = process_execution_intervals(scheduler_file)
-    cpu_usage_df = process_cpu_usage_of_memcached(cpu_usage_file)
+    scheduler_events = read_scheduler_log(scheduler_file)
+    mcperf_df = parse_mcperf_data(mcperf_file, scheduler_events)
+    events_df, earliest_start_ms = process_execution_intervals(scheduler_events)
+    cpu_usage_df = process_cpu_usage_of_memcached(scheduler_events)
 
     if mcperf_df.empty or events_df.empty or cpu_usage_df.empty:
         print(f"No data found for run {run_number}. Skipping.")
@@ -497,9 +339,10 @@ def create_plots_B(input_directory_path, policy_number, run_number, save_folder_
     ax_cpu.set_yticks([1, 2, 3])
 
     # Plot P95 latency line
+    cpu_points = downsample(cpu_usage_df, "timestamp", "memcached_cores_usage")
     (artistA_cpu,) = ax_cpu.plot(
-        cpu_usage_df["timestamp"],
-        cpu_usage_df["memcached_cores_usage"],
+        cpu_points["timestamp"],
+        cpu_points["memcached_cores_usage"],
         color="tab:blue",
         label="Memcached CPU Cores Usage",
     )
@@ -518,8 +361,9 @@ def create_plots_B(input_directory_path, policy_number, run_number, save_folder_
     axA_QPS.tick_params(axis="y", labelcolor="tab:orange")
     axA_QPS.grid(False)
 
+    qps_points = downsample(mcperf_df, "timestamp", "qps")
     (artistA_QPS,) = axA_QPS.plot(
-        mcperf_df["timestamp"], mcperf_df["qps"], color="tab:orange", label="QPS"
+        qps_points["timestamp"], qps_points["qps"], color="tab:orange", label="QPS"
     )
 
     # Add legend with SLO line included
@@ -617,6 +461,35 @@ def create_plots_B(input_directory_path, policy_number, run_number, save_folder_
             f"  Min/Avg/Max p95 latency: {mcperf_df['p95_ms'].min():.2f}/{mcperf_df['p95_ms'].mean():.2f}/{mcperf_df['p95_ms'].max():.2f} ms"
         )
 
+def analyze_slo_attribution(input_directory_path, policy_number, run_number, save_folder_path):
+    """Writes which jobs were co-running with memcached during SLO violations."""
+    mcperf_file = os.path.join(input_directory_path, f"mcperf_policy{policy_number}_run{run_number}.log")
+    scheduler_file = os.path.join(input_directory_path, f"scheduler_policy{policy_number}_run{run_number}.log")
+
+    if not os.path.exists(mcperf_file) or not os.path.exists(scheduler_file):
+        print(f"Missing files for run {run_number}. Skipping.")
+        return
+
+    scheduler_events = read_scheduler_log(scheduler_file)
+    mcperf_df = parse_mcperf_data(mcperf_file, scheduler_events)
+    timeline = Timeline.from_scheduler_events(scheduler_events)
+
+    attribution_df = attribute_violations(mcperf_df, timeline, SLO_MS)
+    colocation_df = latency_by_colocation(mcperf_df, timeline, SLO_MS)
+
+    attribution_df.to_csv(os.path.join(save_folder_path, f"{run_number}_slo_attribution.csv"), index=False)
+    colocation_df.to_csv(os.path.join(save_folder_path, f"{run_number}_latency_by_colocation.csv"))
+
+    violated = mcperf_df["p95_ms"].to_numpy() > SLO_MS
+    print(f"  SLO violation ratio, 95% CI: {format_ci(*bootstrap_ci(violated), digits=4)}")
+    print(f"  Mean p95 latency (ms), 95% CI: {format_ci(*bootstrap_ci(mcperf_df['p95_ms']), digits=3)}")
+    print(f"  SLO violations (>{SLO_MS}ms) per co-running job:")
+    for row in attribution_df[attribution_df["violations"] > 0].itertuples():
+        print(
+            f"    {row.job}: {row.violations}/{row.windows} windows ({row.violation_rate*100:.1f}%), "
+            f"{row.violation_share*100:.0f}% of all violations, cores {row.violation_cores}"
+        )
+
 def main():
     # Run the visualization for all three runs
     # input_directory_path_4_3 = "part4/part4_3_logs"
@@ -643,6 +516,7 @@ def main():
         # create_plots_B(input_directory_path_4_4_5s, 1, run, output_directory_path_4_4_5s)
         create_plots_A(input_directory_path_4_4_7s, 1, run, output_directory_path_4_4_7s)
         create_plots_B(input_directory_path_4_4_7s, 1, run, output_directory_path_4_4_7s)
+        analyze_slo_attribution(input_directory_path_4_4_7s, 1, run, output_directory_path_4_4_7s)
 
 
 if __name__ == "__main__":
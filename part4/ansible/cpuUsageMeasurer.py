@@ -1,28 +1,189 @@
 #! /usr/bin/env python3
+"""Low-overhead CPU usage sampler for the memcached VM.
 
-import psutil
+Reads the per-core counters of /proc/stat and the usage counter of any
+number of cgroups (e.g. a docker container or memcached.service) at up to
+100 Hz and stores the raw cumulative counters in a binary ring file. Nothing
+is computed or printed on the node; analysis.cpu_samples turns the file into
+NumPy arrays of per-core and per-cgroup utilization.
+
+File layout (little endian):
+
+    0   8 bytes   magic b"CPUSAMP1"
+    8   u64       number of records written so far
+    16  u32       length of the JSON metadata
+    20  ...       JSON metadata (cpus, cgroups, capacity, rate_hz, user_hz)
+    data_offset   capacity records of u64: timestamp_ns, busy ticks per cpu,
+                  total ticks per cpu, usage_usec per cgroup
+
+Record i is stored in slot i % capacity, the record counter is updated after
+the record so a reader never sees a half-written record.
+
+Usage:
+    cpuUsageMeasurer.py cpuUsage.bin [--rate 100] [--capacity 360000]
+                        [--cgroup /sys/fs/cgroup/system.slice/memcached.service]
+                        [--docker parsec-canneal]
+"""
+
+import argparse
+import json
+import os
+import signal
+import struct
+import subprocess
 import time
-import sys
+
+MAGIC = b"CPUSAMP1"
+MAX_RATE_HZ = 100
+CGROUP_ROOT = "/sys/fs/cgroup"
+
+
+def read_proc_stat(proc_stat):
+    """Busy and total ticks of every core from an open /proc/stat."""
+    proc_stat.seek(0)
+    busy = []
+    total = []
+    for line in proc_stat.read().splitlines():
+        if not line.startswith("cpu") or line.startswith("cpu "):
+            continue
+        # user nice system idle iowait irq softirq steal (guest is in user)
+        ticks = [int(value) for value in line.split()[1:9]]
+        idle = ticks[3] + ticks[4]
+        total.append(sum(ticks))
+        busy.append(total[-1] - idle)
+    return busy, total
+
+
+class CgroupCounter:
+    """Cumulative CPU time of a cgroup in microseconds (cgroup v2 or v1)."""
+
+    def __init__(self, path):
+        self.path = path
+        if os.path.exists(os.path.join(path, "cpu.stat")):
+            self.file = open(os.path.join(path, "cpu.stat"), "r")
+            self.v2 = True
+        else:
+            self.file = open(os.path.join(path, "cpuacct.usage"), "r")
+            self.v2 = False
+
+    def read(self):
+        self.file.seek(0)
+        content = self.file.read()
+        if not self.v2:
+            return int(content) // 1000
+        for line in content.splitlines():
+            if line.startswith("usage_usec"):
+                return int(line.split()[1])
+        return 0
 
 
-def measure_cpu_usage(file_name: str = "cpuUsage.csv"):
-    print("Timestamp, CPU Usage, Memory Usage")
+def docker_cgroup(container):
+    """cgroup directory of a running docker container."""
+    container_id = subprocess.run(
+        ["sudo", "docker", "inspect", "-f", "{{.Id}}", container],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+    for path in [
+        f"{CGROUP_ROOT}/system.slice/docker-{container_id}.scope",
+        f"{CGROUP_ROOT}/cpu,cpuacct/docker/{container_id}",
+    ]:
+        if os.path.isdir(path):
+            return path
+    raise FileNotFoundError(f"no cgroup found for container {container}")
+
+
+class RingFile:
+    def __init__(self, file_name, num_cpus, cgroups, capacity, rate_hz):
+        self.capacity = capacity
+        self.values_per_record = 1 + 2 * num_cpus + len(cgroups)
+        self.record = struct.Struct(f"<{self.values_per_record}Q")
+        meta = json.dumps(
+            {
+                "cpus": num_cpus,
+                "cgroups": cgroups,
+                "capacity": capacity,
+                "rate_hz": rate_hz,
+                "user_hz": os.sysconf("SC_CLK_TCK"),
+                "record_size": self.record.size,
+            }
+        ).encode("utf-8")
+        # records start at a multiple of 64 bytes
+        self.data_offset = (20 + len(meta) + 63) // 64 * 64
+        self.count = 0
+
+        self.fd = os.open(file_name, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+        os.ftruncate(self.fd, self.data_offset + capacity * self.record.size)
+        os.pwrite(self.fd, MAGIC + struct.pack("<QI", 0, len(meta)) + meta, 0)
+
+    def append(self, values):
+        slot = self.count % self.capacity
+        os.pwrite(
+            self.fd,
+            self.record.pack(*values),
+            self.data_offset + slot * self.record.size,
+        )
+        self.count += 1
+        os.pwrite(self.fd, struct.pack("<Q", self.count), len(MAGIC))
+
+    def close(self):
+        os.close(self.fd)
+
+
+def measure_cpu_usage(file_name, rate_hz, capacity, cgroup_paths):
+    proc_stat = open("/proc/stat", "r")
+    counters = [CgroupCounter(path) for path in cgroup_paths]
+    num_cpus = len(read_proc_stat(proc_stat)[0])
+    ring = RingFile(file_name, num_cpus, cgroup_paths, capacity, rate_hz)
+
+    stop = []
+    for signum in (signal.SIGTERM, signal.SIGHUP, signal.SIGINT):
+        signal.signal(signum, lambda *_: stop.append(True))
+
+    period = 1.0 / rate_hz
+    # absolute deadlines so the sampling rate does not drift
+    next_sample = time.monotonic()
     try:
-        with open(file_name, "w") as f:
-            while True:
-                output = f"{int(time.time())}, {psutil.cpu_percent(interval=1, percpu=True)}, {psutil.virtual_memory().percent}\n"
-                f.write(output)
-                f.flush()
-                print(output)
-    # close file if ctrl+c is pressed
-    except KeyboardInterrupt:
-        print("CPU usage measurement stopped")
+        while not stop:
+            timestamp_ns = time.time_ns()
+            busy, total = read_proc_stat(proc_stat)
+            usage = [counter.read() for counter in counters]
+            ring.append([timestamp_ns, *busy, *total, *usage])
+
+            next_sample += period
+            delay = next_sample - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                # fell behind, skip the missed samples instead of bursting
+                next_sample = time.monotonic()
+    finally:
+        ring.close()
 
 
 if __name__ == "__main__":
-    args = sys.argv[1:]
-    # check if there is an argument and check if its a file name with csv extension
-    if len(args) > 0 and args[0].endswith(".csv"):
-        measure_cpu_usage(args[0])
-    else:
-        measure_cpu_usage()
+    parser = argparse.ArgumentParser(description="Sample CPU usage into a ring file")
+    parser.add_argument("file_name", nargs="?", default="cpuUsage.bin")
+    parser.add_argument(
+        "--rate", type=float, default=10, help=f"samples per second, up to {MAX_RATE_HZ}"
+    )
+    parser.add_argument(
+        "--capacity",
+        type=int,
+        default=360000,
+        help="number of records kept, older ones are overwritten",
+    )
+    parser.add_argument(
+        "--cgroup", action="append", default=[], help="cgroup directory to sample"
+    )
+    parser.add_argument(
+        "--docker", action="append", default=[], help="docker container to sample"
+    )
+    args = parser.parse_args()
+
+    if not 0 < args.rate <= MAX_RATE_HZ:
+        parser.error(f"--rate must be in (0, {MAX_RATE_HZ}]")
+
+    cgroups = args.cgroup + [docker_cgroup(container) for container in args.docker]
+    measure_cpu_usage(args.file_name, args.rate, args.capacity, cgroups)
@@ -1,7 +1,15 @@
+import argparse
+import os
 import subprocess
-import yaml
+import sys
 import time
-import os
+
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.capacity import SLO_MS, run_capacity
+from analysis.orchestrator import Orchestrator, Task
+from analysis.sequential import SequentialStop
+from remote import INVENTORY_PATH, vm_sets
 
 # task 4.1.d
 # run two experiments. One with 2 Threads and 1 Core, and one with 2 Threads and 2 Cores
@@ -16,153 +24,126 @@ experiments = {
     "2Cores2Threads": {"Cores": "0,1", "Threads": 2},
 }
 
+# runs per experiment: at least MIN_RUNS, more (up to MAX_RUNS) until the
+# capacity at the SLO is known within REL_HALF_WIDTH or one step of the QPS
+# scan; on the logged runs this is 3 to 4 per experiment
+MIN_RUNS = 3
+MAX_RUNS = 6
+REL_HALF_WIDTH = 0.05
+SCAN_STEP_QPS = 5000
+
+# sampling rate of cpuUsageMeasurer on the memcached VM
+CPU_SAMPLE_RATE_HZ = 100
+
 
-def run_load(path: str):
+def run_load(pool, hosts, path: str):
     # Create output directory if it doesn't exist
     os.makedirs(os.path.dirname(path), exist_ok=True)
 
-    with open("ansible/inventory.yaml", "r") as f:
-        inventory = yaml.safe_load(f)
-        client_measure_external_ip = inventory["all"]["children"]["client_measures"][
-            "hosts"
-        ]["client-measure"]["ansible_host"]
-
-        with open(path, "w") as f:
-            # run the load and save the output to the path
-            subprocess.run(
-                [
-                    "ssh",
-                    "-i",
-                    "~/.ssh/cloud-computing",
-                    f"ubuntu@{client_measure_external_ip}",
-                    "cd memcache-perf-dynamic && ./run_load.sh",
-                ],
-                check=True,
-                stdout=f,
-                stderr=f,
-            )
-
-
-def run_experiment(experiment: str, run: int = 1, output_dir: str = "output"):
-    print(f"[{int(time.time())}] running experiment {experiment} with run {run}")
-    with open("ansible/inventory.yaml", "r") as f:
-        inventory = yaml.safe_load(f)
-        memcached_external_ip = inventory["all"]["children"]["memcached_servers"][
-            "hosts"
-        ]["memcache-server"]["ansible_host"]
-        memcached_internal_ip = inventory["all"]["children"]["memcached_servers"][
-            "hosts"
-        ]["memcache-server"]["internal_ip"]
-
-        print(f"[{int(time.time())}] stopping memcached")
-        # stop memcached
-        subprocess.run(
-            [
-                "ssh",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{memcached_external_ip}",
-                "sudo systemctl stop memcached",
-            ],
-            check=True,
-        )
+    client_measure_external_ip = hosts["client-measure"]["ansible_host"]
 
-        print(f"[{int(time.time())}] killing any remaining memcached processes")
-        # kill any remaining memcached processes
-        subprocess.run(
-            [
-                "ssh",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{memcached_external_ip}",
-                "sudo pkill -f memcached",
-            ],
-            check=True,
+    with open(path, "w") as f:
+        # run the load and save the output to the path
+        pool.run(
+            client_measure_external_ip,
+            "cd memcache-perf-dynamic && ./run_load.sh",
+            stdout=f,
+            stderr=f,
         )
-        time.sleep(5)
 
-        print(
-            f"[{int(time.time())}] starting memcached with {experiments[experiment]['Cores']} cores and {experiments[experiment]['Threads']} threads"
-        )
-        # start memcached with correct command structure
-        subprocess.run(
-            [
-                "ssh",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{memcached_external_ip}",
-                f"sudo taskset -c {experiments[experiment]['Cores']} memcached -d -t {experiments[experiment]['Threads']} -m 1024 -p 11211 -l {memcached_internal_ip} -u memcache",
-            ],
-            check=True,
-        )
 
-        cpu_measurer = subprocess.Popen(
-            [
-                "ssh",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{memcached_external_ip}",
-                f"/home/ubuntu/venv/bin/python3 cpuUsageMeasurer.py cpuUsage{experiment}_run{run}.csv",
-            ],
-            stdout=subprocess.DEVNULL,
-        )
-
-        print(f"[{int(time.time())}] waiting for 10 seconds")
-        time.sleep(10)
-
-        print(f"[{int(time.time())}] running load")
-        # run the load
-        run_load(f"{output_dir}/experiment{experiment}_run{run}.txt")
-        print(f"[{int(time.time())}] load finished")
-
-        # close cpu_measurer
-        cpu_measurer.terminate()
-
-        # copy cpuUsage.csv to output_dir
-        subprocess.run(
-            [
-                "scp",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{memcached_external_ip}:cpuUsage{experiment}_run{run}.csv",
-                f"{output_dir}/cpuUsage{experiment}_run{run}.csv",
-            ],
-            check=True,
-        )
+def run_experiment(pool, hosts, experiment: str, run: int = 1, output_dir: str = "output"):
+    print(f"[{int(time.time())}] running experiment {experiment} with run {run}")
+    memcache_server = hosts["memcache-server"]
+    memcached_external_ip = memcache_server["ansible_host"]
+    memcached_internal_ip = memcache_server["internal_ip"]
+
+    print(f"[{int(time.time())}] stopping memcached")
+    # stop memcached
+    pool.run(memcached_external_ip, "sudo systemctl stop memcached")
+
+    print(f"[{int(time.time())}] killing any remaining memcached processes")
+    # kill any remaining memcached processes
+    pool.run(memcached_external_ip, "sudo pkill -f memcached")
+    time.sleep(5)
+
+    print(
+        f"[{int(time.time())}] starting memcached with {experiments[experiment]['Cores']} cores and {experiments[experiment]['Threads']} threads"
+    )
+    # start memcached with correct command structure
+    pool.run(
+        memcached_external_ip,
+        f"sudo taskset -c {experiments[experiment]['Cores']} memcached -d -t {experiments[experiment]['Threads']} -m 1024 -p 11211 -l {memcached_internal_ip} -u memcache",
+    )
+
+    cpu_measurer = pool.start(
+        memcached_external_ip,
+        f"/home/ubuntu/venv/bin/python3 cpuUsageMeasurer.py cpuUsage{experiment}_run{run}.bin --rate {CPU_SAMPLE_RATE_HZ}",
+        stdout=subprocess.DEVNULL,
+    )
+
+    print(f"[{int(time.time())}] waiting for 10 seconds")
+    time.sleep(10)
+
+    print(f"[{int(time.time())}] running load")
+    # run the load
+    run_load(pool, hosts, f"{output_dir}/experiment{experiment}_run{run}.txt")
+    print(f"[{int(time.time())}] load finished")
+
+    # close cpu_measurer
+    cpu_measurer.terminate()
+
+    # copy the CPU samples to output_dir
+    pool.fetch(
+        memcached_external_ip,
+        f"cpuUsage{experiment}_run{run}.bin",
+        f"{output_dir}/cpuUsage{experiment}_run{run}.bin",
+    )
+
+    print(f"[{int(time.time())}] stopping memcached")
+    # stop memcached
+    pool.run(memcached_external_ip, "sudo systemctl stop memcached")
+
+    print(f"[{int(time.time())}] killing any remaining memcached processes")
+    # kill any remaining memcached processes
+    pool.run(memcached_external_ip, "sudo pkill -f memcached")
+    time.sleep(5)
 
-        print(f"[{int(time.time())}] stopping memcached")
-        # stop memcached
-        subprocess.run(
-            [
-                "ssh",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{memcached_external_ip}",
-                "sudo systemctl stop memcached",
-            ],
-            check=True,
-        )
 
-        print(f"[{int(time.time())}] killing any remaining memcached processes")
-        # kill any remaining memcached processes
-        subprocess.run(
-            [
-                "ssh",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{memcached_external_ip}",
-                "sudo pkill -f memcached",
-            ],
-            check=True,
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the memcached experiments of part 4.1")
+    parser.add_argument(
+        "--inventory",
+        nargs="+",
+        default=[INVENTORY_PATH],
+        help="one inventory per VM set, runs are spread over all of them",
+    )
+    args = parser.parse_args()
+
+    def make_task(config, run):
+        experiment = config["experiment"]
+        return Task(
+            f"experiment{experiment}_run{run}",
+            {"experiment": experiment, "run": run},
+            outputs=[f"output/experiment{experiment}_run{run}.txt"],
         )
-        time.sleep(5)
 
-
-if __name__ == "__main__":
-    for experiment in experiments:
-        for run in range(0, 3):
-            path = f"output/experiment{experiment}_run{run}.txt"
-            if os.path.exists(path):
-                print(f"[{int(time.time())}] skipping {path} because it already exists")
-                continue
-            run_experiment(experiment, run)
+    # more runs of an experiment while its capacity is still noisy
+    stopper = SequentialStop(
+        make_task,
+        lambda task: run_capacity(task.outputs[0], SLO_MS["part4_1_d"]),
+        min_runs=MIN_RUNS,
+        max_runs=MAX_RUNS,
+        rel_half_width=REL_HALF_WIDTH,
+        abs_half_width=SCAN_STEP_QPS,
+        repetition_key="run",
+        first_repetition=0,
+    )
+    # one connection per VM for all experiments
+    with vm_sets(args.inventory) as slots:
+        Orchestrator(
+            "part4-1-d",
+            lambda task, slot: run_experiment(*slot, **task.params),
+            slots=slots,
+            follow_up=stopper,
+        ).run(stopper.initial_tasks({"experiment": experiment} for experiment in experiments))
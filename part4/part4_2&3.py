@@ -1,136 +1,126 @@
-import subprocess
-import yaml
-import time
+import argparse
 import os
+import sys
+import time
 from datetime import datetime
 
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.orchestrator import Orchestrator, Task
+from analysis.scheduler_log import read_scheduler_log
+from analysis.sequential import SequentialStop
+from remote import INVENTORY_PATH, vm_sets
+
 # Define the policies to test
 POLICIES = {
     "policy1": "1",  # Policy1And2Cores
     # "policy2": "2"   # Policy2And3Cores
 }
 
+# runs per policy: at least MIN_RUNS, more (up to MAX_RUNS) until the makespan
+# is known within REL_HALF_WIDTH; on the logged runs this is 3 to 6, about 4.6
+MIN_RUNS = 3
+MAX_RUNS = 6
+REL_HALF_WIDTH = 0.05
 
-def run_load(logfileName: str):
-    """Run the load test and save output to the specified path."""
-    # Create output directory if it doesn't exist
-
-    with open("ansible/inventory.yaml", "r") as f:
-        inventory = yaml.safe_load(f)
-        client_measure_external_ip = inventory["all"]["children"]["client_measures"][
-            "hosts"
-        ]["client-measure"]["ansible_host"]
-
-        # run the load and save the output to the path
-        load_process = subprocess.Popen(
-            [
-                "ssh",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{client_measure_external_ip}",
-                "cd memcache-perf-dynamic && ./run_load.sh " + logfileName,
-            ]
-        )
 
-        return load_process
+def run_load(pool, hosts, logfileName: str):
+    """Start the load test in the background, the output stays on the client."""
+    client_measure_external_ip = hosts["client-measure"]["ansible_host"]
 
+    # run the load and save the output to the path
+    return pool.start(
+        client_measure_external_ip,
+        "cd memcache-perf-dynamic && ./run_load.sh " + logfileName,
+    )
 
-def run_experiment(policy: str, run: int = 1, output_dir: str = "part4_2_logs"):
+
+def run_experiment(pool, hosts, policy: str, run: int = 1, output_dir: str = "part4_2_logs"):
     """Run a single experiment with the specified policy."""
     print(f"[{datetime.now()}] Running experiment with policy {policy}, run {run}")
 
     # Create output directory
     os.makedirs(output_dir, exist_ok=True)
 
-    with open("ansible/inventory.yaml", "r") as f:
-        inventory = yaml.safe_load(f)
-
-        # Run the load test
-        mcperf_log = f"mcperf_policy{policy}_run{run}.log"
-        print(f"[{datetime.now()}] Starting mcperf load test")
-        load_process = run_load(mcperf_log)
-
-        # Wait for a bit to ensure all data is collected
-        time.sleep(10)
-
-        # Start the scheduler with the specified policy
-        scheduler_log = f"scheduler_policy{policy}_run{run}.log"
-        print(f"[{datetime.now()}] Starting scheduler with policy {policy}")
-
-        scheduler_process = subprocess.Popen(
-            [
-                "ssh",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{inventory['all']['children']['memcached_servers']['hosts']['memcache-server']['ansible_host']}",
-                f"cd ~/scheduler && venv/bin/python3 main.py -p {policy} -l {scheduler_log}",
-            ]
-        )
+    memcached_external_ip = hosts["memcache-server"]["ansible_host"]
+    client_measure_external_ip = hosts["client-measure"]["ansible_host"]
 
-        scheduler_process.wait()
+    # Run the load test
+    mcperf_log = f"mcperf_policy{policy}_run{run}.log"
+    print(f"[{datetime.now()}] Starting mcperf load test")
+    load_process = run_load(pool, hosts, mcperf_log)
 
-        load_process.wait()
+    # Wait for a bit to ensure all data is collected
+    time.sleep(10)
 
-        os.makedirs(output_dir, exist_ok=True)
+    # Start the scheduler with the specified policy
+    scheduler_log = f"scheduler_policy{policy}_run{run}.log"
+    print(f"[{datetime.now()}] Starting scheduler with policy {policy}")
 
-        # copy the scheduler log to the output directory
-        subprocess.run(
-            [
-                "scp",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{inventory['all']['children']['memcached_servers']['hosts']['memcache-server']['ansible_host']}:~/scheduler/{scheduler_log}",
-                output_dir,
-            ],
-            check=True,
-        )
+    scheduler_process = pool.start(
+        memcached_external_ip,
+        f"cd ~/scheduler && venv/bin/python3 main.py -p {policy} -l {scheduler_log}",
+    )
 
-        subprocess.run(
-            [
-                "scp",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{inventory['all']['children']['memcached_servers']['hosts']['memcache-server']['ansible_host']}:~/scheduler/log*.txt",
-                output_dir,
-            ],
-            check=True,
-        )
+    scheduler_process.wait()
 
-        subprocess.run(
-            [
-                "scp",
-                "-i",
-                "~/.ssh/cloud-computing",
-                f"ubuntu@{inventory["all"]["children"]["client_measures"]["hosts"]["client-measure"]["ansible_host"]}:~/memcache-perf-dynamic/{mcperf_log}",
-                output_dir,
-            ],
-            check=True,
-        )
+    load_process.wait()
+
+    os.makedirs(output_dir, exist_ok=True)
 
-        print(f"[{datetime.now()}] Experiment completed. Logs saved to {output_dir}")
+    # copy the scheduler log to the output directory
+    pool.fetch(memcached_external_ip, f"~/scheduler/{scheduler_log}", output_dir)
+    pool.fetch(memcached_external_ip, "~/scheduler/log*.txt", output_dir)
+    pool.fetch(client_measure_external_ip, f"~/memcache-perf-dynamic/{mcperf_log}", output_dir)
+
+    print(f"[{datetime.now()}] Experiment completed. Logs saved to {output_dir}")
 
 
 def main():
     """Main function to run all experiments."""
-    # Number of runs per policy
-    NUM_RUNS = 3
-
-    # Run each policy multiple times
-    for policy_name, policy_value in POLICIES.items():
-        print(f"\n=== Starting experiments for {policy_name} ===")
-        for run in range(NUM_RUNS):
-            if os.path.exists(
-                f"part4_2_logs/scheduler_policy{policy_value}_run{run + 1}.log"
-            ):
-                print(
-                    f"[{datetime.now()}] Experiment {policy_name} run {run + 1} already exists. Skipping..."
-                )
-                continue
-            run_experiment(policy_value, run + 1)
-            # Wait between runs
-            if run < NUM_RUNS - 1:
-                print(f"Waiting 60 seconds before next run...")
-                time.sleep(60)
+    parser = argparse.ArgumentParser(description="Run the scheduler experiments of part 4.2 and 4.3")
+    parser.add_argument(
+        "--inventory",
+        nargs="+",
+        default=[INVENTORY_PATH],
+        help="one inventory per VM set, runs are spread over all of them",
+    )
+    args = parser.parse_args()
+
+    policy_names = {value: name for name, value in POLICIES.items()}
+
+    def make_task(config, run):
+        policy_value = config["policy"]
+        return Task(
+            f"{policy_names[policy_value]}_run{run}",
+            {"policy": policy_value, "run": run},
+            outputs=[f"part4_2_logs/scheduler_policy{policy_value}_run{run}.log"],
+        )
+
+    def makespan(task):
+        if not os.path.exists(task.outputs[0]):
+            return None
+        return read_scheduler_log(task.outputs[0]).total_time()
+
+    # Run each policy until its makespan is known precisely enough, runs that
+    # already have a scheduler log are skipped
+    stopper = SequentialStop(
+        make_task,
+        makespan,
+        min_runs=MIN_RUNS,
+        max_runs=MAX_RUNS,
+        rel_half_width=REL_HALF_WIDTH,
+        repetition_key="run",
+    )
+    # one connection per VM for all runs, wait 60 seconds between runs on a VM set
+    with vm_sets(args.inventory) as slots:
+        Orchestrator(
+            "part4-2-3",
+            lambda task, slot: run_experiment(*slot, **task.params),
+            slots=slots,
+            cooldown=60,
+            follow_up=stopper,
+        ).run(stopper.initial_tasks({"policy": value} for value in POLICIES.values()))
 
     print("\n=== All experiments completed ===")
 
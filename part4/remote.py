@@ -0,0 +1,189 @@
+"""Run commands and copy files on the experiment VMs over pooled SSH connections.
+
+Every ``ssh``/``scp`` invocation of the drivers used to open its own
+connection, paying a TCP and key exchange handshake of about a second. The
+``SSHPool`` starts one OpenSSH control master per host (ControlMaster /
+ControlPersist) the first time the host is used; all later commands and
+copies are multiplexed over that connection and start in milliseconds.
+
+Commands run either to completion (``run``) or in the background (``start``,
+returns the ``Popen`` like before), ``run_all`` runs several at once.
+``vm_sets`` opens one pool per inventory so that the orchestrator can run
+experiments on several VM sets in parallel.
+
+With ``REMOTE_LOOPBACK=1`` the drivers get a ``LoopbackShell`` instead, which
+runs the commands in a local shell and copies with ``cp``, to try a driver
+without VMs.
+"""
+
+import contextlib
+import os
+import shlex
+import shutil
+import subprocess
+import tempfile
+import time
+import yaml
+
+INVENTORY_PATH = "ansible/inventory.yaml"
+# how long an idle control master stays up after the last command
+CONTROL_PERSIST = "10m"
+
+
+def read_inventory(path=INVENTORY_PATH):
+    """Host name -> host variables, with the inventory-wide vars under ``"vars"``."""
+    with open(path, "r") as f:
+        inventory = yaml.safe_load(f)["all"]
+    hosts = {"vars": inventory.get("vars", {})}
+    for group in inventory["children"].values():
+        hosts.update(group["hosts"])
+    return hosts
+
+
+class SSHPool:
+    """Persistent multiplexed SSH sessions, one control master per host."""
+
+    def __init__(self, key_file="~/.ssh/cloud-computing", user="ubuntu", ssh="ssh", scp="scp"):
+        self.key_file = os.path.expanduser(key_file)
+        self.user = user
+        self.ssh = ssh
+        self.scp = scp
+        # control sockets need a short path (sun_path is ~100 bytes)
+        self.control_dir = tempfile.mkdtemp(prefix="ssh-")
+        self.connected = set()
+
+    def _options(self):
+        return ["-i", self.key_file, *self._control_options()]
+
+    def _control_options(self):
+        return [
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            f"ControlPath={self.control_dir}/%C",
+            "-o",
+            f"ControlPersist={CONTROL_PERSIST}",
+            "-o",
+            "ServerAliveInterval=30",
+        ]
+
+    def _target(self, host):
+        return f"{self.user}@{host}" if self.user and "@" not in host else host
+
+    def _ssh(self, host):
+        """ssh command line of ``host`` up to the remote command, the destination last."""
+        return [self.ssh, *self._options(), self._target(host)]
+
+    def connect(self, host):
+        """Open the control master of ``host`` (done implicitly by the first command)."""
+        if host in self.connected:
+            return
+        start = time.time()
+        subprocess.run([*self._ssh(host), "true"], check=True)
+        self.connected.add(host)
+        print(f"[{int(time.time())}] connected to {host} in {time.time() - start:.2f}s")
+
+    def _command(self, host, command):
+        self.connect(host)
+        return [*self._ssh(host), command]
+
+    def run(self, host, command, check=True, **kwargs):
+        """Run ``command`` on ``host`` and wait for it, like ``subprocess.run``."""
+        return subprocess.run(self._command(host, command), check=check, **kwargs)
+
+    def start(self, host, command, **kwargs):
+        """Start ``command`` on ``host`` in the background, returns the ``Popen``."""
+        return subprocess.Popen(self._command(host, command), **kwargs)
+
+    def run_all(self, commands, check=True):
+        """Run (host, command) pairs concurrently, returns their exit codes."""
+        processes = [self.start(host, command) for host, command in commands]
+        codes = [process.wait() for process in processes]
+        if check:
+            for (host, command), code in zip(commands, codes):
+                if code != 0:
+                    raise subprocess.CalledProcessError(code, f"{host}: {command}")
+        return codes
+
+    def fetch(self, host, remote_path, local_path, check=True):
+        """Copy ``remote_path`` (may contain wildcards) from ``host`` to ``local_path``."""
+        self.connect(host)
+        return subprocess.run(
+            [self.scp, *self._options(), f"{self._target(host)}:{remote_path}", local_path],
+            check=check,
+        )
+
+    def close(self):
+        for host in self.connected:
+            argv = self._ssh(host)
+            subprocess.run(
+                [*argv[:-1], "-O", "exit", argv[-1]],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.DEVNULL,
+            )
+        self.connected.clear()
+        shutil.rmtree(self.control_dir, ignore_errors=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class LoopbackShell(SSHPool):
+    """Stand-in for ``SSHPool`` that runs everything on this machine.
+
+    Remote paths are resolved below ``root`` (default: the current directory)
+    so that ``~/scheduler/x.log`` of a host becomes ``<root>/<host>/scheduler/x.log``.
+    """
+
+    def __init__(self, root=".", **kwargs):
+        super().__init__(**kwargs)
+        self.root = os.path.abspath(root)
+
+    def _home(self, host):
+        home = os.path.join(self.root, host)
+        os.makedirs(home, exist_ok=True)
+        return home
+
+    def connect(self, host):
+        self.connected.add(host)
+
+    def _command(self, host, command):
+        self.connect(host)
+        home = shlex.quote(self._home(host))
+        return ["sh", "-c", f"export HOME={home} && cd {home} && {command}"]
+
+    def fetch(self, host, remote_path, local_path, check=True):
+        remote_path = remote_path[2:] if remote_path.startswith("~/") else remote_path
+        pattern = os.path.join(shlex.quote(self._home(host)), remote_path)
+        return subprocess.run(["sh", "-c", f"cp {pattern} {shlex.quote(local_path)}"], check=check)
+
+    def close(self):
+        self.connected.clear()
+        shutil.rmtree(self.control_dir, ignore_errors=True)
+
+
+def open_pool(inventory=None):
+    """``SSHPool`` with the user and key of the inventory, or a ``LoopbackShell``."""
+    inventory = inventory or read_inventory()
+    settings = inventory.get("vars", {})
+    kwargs = {
+        "key_file": settings.get("ansible_ssh_private_key_file", "~/.ssh/cloud-computing"),
+        "user": settings.get("ansible_user", "ubuntu"),
+    }
+    if os.environ.get("REMOTE_LOOPBACK", "0") != "0":
+        return LoopbackShell(root=os.environ.get("REMOTE_LOOPBACK_ROOT", "."), **kwargs)
+    return SSHPool(**kwargs)
+
+
+@contextlib.contextmanager
+def vm_sets(inventory_paths=(INVENTORY_PATH,)):
+    """One (pool, hosts) slot per inventory file, the pools are closed on exit."""
+    with contextlib.ExitStack() as stack:
+        slots = []
+        for path in inventory_paths:
+            hosts = read_inventory(path)
+            slots.append((stack.enter_context(open_pool(hosts)), hosts))
+        yield slots
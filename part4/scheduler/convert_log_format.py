@@ -1,6 +1,18 @@
+"""Convert scheduler logs into the SchedulerLogger format.
+
+Every ``scheduler_*.log`` in the given directories (or every given log file)
+is converted into ``<name>_converted.txt`` next to it. Files are converted in
+a process pool and streamed line by line, each with its own job state.
+
+Usage:
+    python convert_log_format.py [DIR_OR_LOG ...] [--jobs N]
+"""
+
+import argparse
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-import os
 
 # Job names as in SchedulerLogger
 JOBS = [
@@ -15,8 +27,11 @@ JOBS = [
     "vips",
 ]
 
-# Track job statuses
-job_statuses = {}
+DEFAULT_DIRECTORY = "../part4_2_logs_run2"
+
+# Example: [1746539176] [policy: 1_2_cores] [INFO] [job] Job ferret started with cores 2,3 and 2 threads
+LINE_RE = re.compile(r"\[(\d+)\].*?\[(job|__main__)\] (.*)")
+TASKSET_RE = re.compile(r"taskset.*-cp.*?(\d+(?:[,-]\d+)*)")
 
 
 # Helper to get job enum name
@@ -28,134 +43,183 @@ def get_job_name(name):
     return "scheduler"
 
 
-# Parse a log line and convert to SchedulerLogger format
-def parse_line(line):
-    # Example: [1746539176] [policy: 1_2_cores] [INFO] [job] Job ferret started with cores 2,3 and 2 threads
-    m = re.match(r"\[(\d+)\].*?\[(job|__main__)\] (.*)", line)
-    if not m:
+class LogConverter:
+    """Converts the lines of one log, tracking the status of its jobs."""
+
+    def __init__(self):
+        self.job_statuses = {}
+        self._iso_times = {}
+
+    def _iso(self, timestamp):
+        # many lines share the same second
+        iso = self._iso_times.get(timestamp)
+        if iso is None:
+            iso = datetime.fromtimestamp(int(timestamp)).isoformat()
+            self._iso_times[timestamp] = iso
+        return iso
+
+    def job_started(self, dt, m):
+        job_name, cores, threads = m.groups()
+        job_name = job_name.lower()
+        self.job_statuses[job_name] = "RUNNING"
+        return f"{dt} start {job_name} [{cores}] {threads}"
+
+    def job_completed(self, dt, m):
+        job_name = m.group(1).lower()
+        if self.job_statuses.get(job_name) != "COMPLETED":
+            self.job_statuses[job_name] = "COMPLETED"
+            return f"{dt} end {job_name}"
         return None
-    timestamp, section, msg = m.groups()
-    # Convert timestamp to ISO format
-    dt = datetime.fromtimestamp(int(timestamp)).isoformat()
-
-    # Job events
-    if section == "job":
-        # Job start
-        m2 = re.match(r"Job (\w+) started with cores ([\d,]+) and (\d+) threads", msg)
-        if m2:
-            job_name, cores, threads = m2.groups()
-            job_name = job_name.lower()
-            job_statuses[job_name] = "RUNNING"
-            return f"{dt} start {job_name} [{cores}] {threads}"
-
-        # Job end/completed
-        m2 = re.match(r"Job (\w+) completed.*", msg)
-        if m2:
-            job_name = m2.group(1).lower()
-            if job_statuses.get(job_name) != "COMPLETED":
-                job_statuses[job_name] = "COMPLETED"
-                return f"{dt} end {job_name}"
-            return None
 
-        # Job status
-        m2 = re.match(r"Job (\w+) status: JobStatus\.(\w+)", msg)
-        if m2:
-            job_name, status = m2.groups()
-            job_name = job_name.lower()
-            old_status = job_statuses.get(job_name)
-
-            if status == "PAUSED" and old_status != "PAUSED":
-                job_statuses[job_name] = "PAUSED"
-                return f"{dt} pause {job_name}"
-            elif status == "COMPLETED" and old_status != "COMPLETED":
-                job_statuses[job_name] = "COMPLETED"
-                return f"{dt} end {job_name}"
-            elif status == "RUNNING" and old_status == "PAUSED":
-                job_statuses[job_name] = "RUNNING"
-                return f"{dt} unpause {job_name}"
-            return None
+    def job_status(self, dt, m):
+        job_name, status = m.groups()
+        job_name = job_name.lower()
+        old_status = self.job_statuses.get(job_name)
+
+        if status == "PAUSED" and old_status != "PAUSED":
+            self.job_statuses[job_name] = "PAUSED"
+            return f"{dt} pause {job_name}"
+        elif status == "COMPLETED" and old_status != "COMPLETED":
+            self.job_statuses[job_name] = "COMPLETED"
+            return f"{dt} end {job_name}"
+        elif status == "RUNNING" and old_status == "PAUSED":
+            self.job_statuses[job_name] = "RUNNING"
+            return f"{dt} unpause {job_name}"
+        return None
 
-        # Job paused/unpaused (explicit commands)
-        m2 = re.match(r"Job (\w+) paused", msg)
-        if m2:
-            job_name = m2.group(1).lower()
-            if job_statuses.get(job_name) != "PAUSED":
-                job_statuses[job_name] = "PAUSED"
-                return f"{dt} pause {job_name}"
-            return None
+    def job_paused(self, dt, m):
+        job_name = m.group(1).lower()
+        if self.job_statuses.get(job_name) != "PAUSED":
+            self.job_statuses[job_name] = "PAUSED"
+            return f"{dt} pause {job_name}"
+        return None
 
-        m2 = re.match(r"Job (\w+) unpaused", msg)
-        if m2:
-            job_name = m2.group(1).lower()
-            if job_statuses.get(job_name) == "PAUSED":
-                job_statuses[job_name] = "RUNNING"
-                return f"{dt} unpause {job_name}"
-            return None
+    def job_unpaused(self, dt, m):
+        job_name = m.group(1).lower()
+        if self.job_statuses.get(job_name) == "PAUSED":
+            self.job_statuses[job_name] = "RUNNING"
+            return f"{dt} unpause {job_name}"
+        return None
 
-        # Job updated to cores
-        m2 = re.match(r"Job (\w+) updated to cores ([\d,]+)", msg)
-        if m2:
-            job_name, cores = m2.groups()
-            job_name = job_name.lower()
-            if job_statuses.get(job_name) == "RUNNING":
-                return f"{dt} update_cores {job_name} [{cores}]"
-            return None
+    def job_updated(self, dt, m):
+        job_name, cores = m.groups()
+        job_name = job_name.lower()
+        if self.job_statuses.get(job_name) == "RUNNING":
+            return f"{dt} update_cores {job_name} [{cores}]"
+        return None
 
-    elif section == "__main__":
+    def taskset(self, dt, m):
         # Taskset command (memcached core update)
-        if "CompletedProcess" in msg:
-            m2 = re.search(r"taskset.*-cp.*?(\d+(?:[,-]\d+)*)", msg)
-            if not m2:
-                return None
-            cores_str = m2.group(1)
-            if "-" in cores_str:
-                start, end = map(int, cores_str.split("-"))
-                cores = list(map(str, range(start, end + 1)))
-            else:
-                cores = cores_str.split(",")
-            if job_statuses.get("memcached") == "RUNNING":
-                return f"{dt} update_cores memcached [{','.join(cores)}]"
+        m2 = TASKSET_RE.search(m.string)
+        if not m2:
             return None
+        cores_str = m2.group(1)
+        if "-" in cores_str:
+            start, end = map(int, cores_str.split("-"))
+            cores = list(map(str, range(start, end + 1)))
+        else:
+            cores = cores_str.split(",")
+        if self.job_statuses.get("memcached") == "RUNNING":
+            return f"{dt} update_cores memcached [{','.join(cores)}]"
+        return None
 
-        m2 = re.match(r"CPU_LOW: \d+", msg)
-        if m2:
-            job_statuses["scheduler"] = "RUNNING"
-            return f"{dt} start scheduler"
+    def scheduler_started(self, dt, m):
+        self.job_statuses["scheduler"] = "RUNNING"
+        return f"{dt} start scheduler"
 
+    def memcached_started(self, dt, m):
         # Scheduler start (detected by Memcached PID)
-        if "Memcached PID" in msg:
-            job_statuses["memcached"] = "RUNNING"
-            return f"{dt} start memcached [0,1] 2"
-
-        # Scheduler end
-        if "Scheduler completed" in msg:
-            if job_statuses.get("scheduler") != "COMPLETED":
-                job_statuses["scheduler"] = "COMPLETED"
-                return f"{dt} end scheduler"
+        self.job_statuses["memcached"] = "RUNNING"
+        return f"{dt} start memcached [0,1] 2"
+
+    def scheduler_completed(self, dt, m):
+        if self.job_statuses.get("scheduler") != "COMPLETED":
+            self.job_statuses["scheduler"] = "COMPLETED"
+            return f"{dt} end scheduler"
+        return None
+
+    def convert_line(self, line):
+        """Converted line, None if the line has no counterpart."""
+        m = LINE_RE.match(line)
+        if not m:
             return None
-    return None
+        timestamp, section, msg = m.groups()
+        # the first matching rule decides, even if it writes nothing
+        for pattern, handler in RULES[section]:
+            m2 = pattern.search(msg)
+            if m2:
+                return handler(self, self._iso(timestamp), m2)
+        return None
+
+
+# Rules per log section in the order they are tried
+RULES = {
+    "job": [
+        (re.compile(r"^Job (\w+) started with cores ([\d,]+) and (\d+) threads"), LogConverter.job_started),
+        (re.compile(r"^Job (\w+) completed"), LogConverter.job_completed),
+        (re.compile(r"^Job (\w+) status: JobStatus\.(\w+)"), LogConverter.job_status),
+        (re.compile(r"^Job (\w+) paused"), LogConverter.job_paused),
+        (re.compile(r"^Job (\w+) unpaused"), LogConverter.job_unpaused),
+        (re.compile(r"^Job (\w+) updated to cores ([\d,]+)"), LogConverter.job_updated),
+    ],
+    "__main__": [
+        (re.compile(r"CompletedProcess"), LogConverter.taskset),
+        (re.compile(r"^CPU_LOW: \d+"), LogConverter.scheduler_started),
+        (re.compile(r"Memcached PID"), LogConverter.memcached_started),
+        (re.compile(r"Scheduler completed"), LogConverter.scheduler_completed),
+    ],
+}
+
+
+def parse_line(line, converter=None):
+    """Convert a single line; pass the same converter for all lines of a log."""
+    return (converter or LogConverter()).convert_line(line)
 
 
 def main(input_log: str, output_log: str):
+    """Convert one log, returns the number of lines written."""
+    converter = LogConverter()
+    written = 0
     with open(input_log, "r") as fin, open(output_log, "w") as fout:
         for line in fin:
             line = line.strip()
             if not line:
                 continue
-            out = parse_line(line)
+            out = converter.convert_line(line)
             if out:
                 fout.write(out + "\n")
+                written += 1
+    return written
+
+
+def converted_path(log_path):
+    return log_path[: -len(".log")] + "_converted.txt"
+
+
+def find_logs(paths):
+    """Scheduler logs in the given directories, log files are taken as they are."""
+    logs = []
+    for path in paths:
+        if os.path.isfile(path):
+            logs.append(path)
+            continue
+        for file in sorted(os.listdir(path)):
+            if file.endswith(".log") and not file.startswith("mcperf"):
+                logs.append(os.path.join(path, file))
+    return logs
+
+
+def _convert(log_path):
+    return log_path, main(log_path, converted_path(log_path))
 
 
 if __name__ == "__main__":
-    files = os.listdir("../part4_2_logs_run2")
-    for file in files:
-        if (
-            file.endswith(".log")
-            and not file.endswith("_converted.txt")
-            and not file.startswith("mcperf")
-        ):
-            main(
-                f"../part4_2_logs_run2/{file}",
-                f"../part4_2_logs_run2/{file.replace('.log', '_converted.txt')}",
-            )
+    parser = argparse.ArgumentParser(description="Convert scheduler logs into the SchedulerLogger format")
+    parser.add_argument("paths", nargs="*", default=[DEFAULT_DIRECTORY], help="directories or log files")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: all cores)")
+    args = parser.parse_args()
+
+    logs = find_logs(args.paths)
+    with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+        for log_path, written in pool.map(_convert, logs, chunksize=8):
+            print(f"{log_path}: {written} lines")
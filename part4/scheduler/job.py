@@ -13,10 +13,20 @@ from scheduler_logger import SchedulerLogger, Job as JobEnum
 logger = logging.getLogger(__name__)
 
 
-Job = Union[str, list[str], JobEnum]
+Job = Union[str, list[str], JobEnum, Dict[int, float]]
 JobInfo = Dict[str, Job]
 
 
+_docker_client: DockerClient | None = None
+
+
+def default_docker_client() -> DockerClient:
+    global _docker_client
+    if _docker_client is None:
+        _docker_client = docker.from_env()
+    return _docker_client
+
+
 class JobStatus(enum.Enum):
     PENDING = "pending"
     RUNNING = "running"
@@ -66,7 +76,8 @@ class JobInstance:
         threads: int,
         schedulerLogger: SchedulerLogger,
         job: JobEnum,
-        docker_client: DockerClient = docker.from_env(),
+        docker_client: DockerClient | None = None,
+        expected_runtimes: Dict[int, float] | None = None,
     ):
         self._jobName = jobName
         self._job = job
@@ -74,11 +85,17 @@ class JobInstance:
         self._command = command
         self._container = None
         self._status = JobStatus.PENDING
-        self._docker_client = docker_client
+        # shared client, created on first use so importing needs no docker daemon
+        self._docker_client = docker_client or default_docker_client()
         self._error_count = 0
         self._threads = threads
+        self._cores = None
         self._start_time = None
         self._end_time = None
+        self._pause_time = None
+        self._paused_duration = 0.0
+        # expected runtime in seconds per thread count (measured in part 2b)
+        self._expected_runtimes = expected_runtimes or {}
         self._schedulerLogger = schedulerLogger
         JobManager().register_job(self)
 
@@ -104,6 +121,13 @@ class JobInstance:
         self.cleanup()
 
     def start_job(self, cores: str):
+        self._run_container(cores)
+        logger.info(
+            f"Job {self._jobName} started with cores {cores} and {self._threads} threads"
+        )
+        self._schedulerLogger.job_start(self._job, cores.split(","), self._threads)
+
+    def _run_container(self, cores: str):
         # return the container
         # docker run --cpuset-cpus="0" -d --rm --name parsec anakli/cca:parsec_blackscholes ./run -a run -S parsec -p blackscholes -i native -n 2
 
@@ -129,20 +153,40 @@ class JobInstance:
             name=f"{self._jobName}",
             detach=True,
         )
-
-        logger.info(
-            f"Job {self._jobName} started with cores {cores} and {self._threads} threads"
-        )
-        self._schedulerLogger.job_start(self._job, cores.split(","), self._threads)
         self._container = container
+        self._cores = cores
         self._status = JobStatus.RUNNING
         self._start_time = time.time()
+        self._pause_time = None
+        self._paused_duration = 0.0
+
+    def restart_job(self, cores: str, threads: int):
+        # throw away the progress of the job and start it again with more threads;
+        # the log keeps a single start per job, the restart shows up as a
+        # custom event and a core update
+        was_paused = self._status == JobStatus.PAUSED
+        if self._container is not None:
+            self._container.remove(force=True)
+            self._container = None
+        logger.info(
+            f"Job {self._jobName} restarting with {threads} threads (was {self._threads})"
+        )
+        previous_threads = self._threads
+        self._threads = threads
+        self._run_container(cores)
+        if was_paused:
+            self._schedulerLogger.job_unpause(self._job)
+        self._schedulerLogger.custom_event(
+            self._job, f"restart with {threads} threads (was {previous_threads})"
+        )
+        self._schedulerLogger.update_cores(self._job, cores.split(","))
 
     def pause_job(self):
         # pause the job
         if self._container is None or self._status != JobStatus.RUNNING:
             raise ValueError(f"Job {self._jobName} is not running")
         self._container.pause()
+        self._pause_time = time.time()
         logger.info(f"Job {self._jobName} paused")
         self._schedulerLogger.job_pause(self._job)
         self._status = JobStatus.PAUSED
@@ -152,6 +196,9 @@ class JobInstance:
         if self._container is None or self._status != JobStatus.PAUSED:
             raise ValueError(f"Job {self._jobName} is not paused")
         self._container.unpause()
+        if self._pause_time is not None:
+            self._paused_duration += time.time() - self._pause_time
+            self._pause_time = None
         logger.info(f"Job {self._jobName} unpaused")
         self._status = JobStatus.RUNNING
         self._schedulerLogger.job_unpause(self._job)
@@ -161,9 +208,40 @@ class JobInstance:
         if self._container is None:
             raise ValueError(f"Job {self._jobName} is not running")
         self._container.update(cpuset_cpus=cores)
+        self._cores = cores
         logger.info(f"Job {self._jobName} updated to cores {cores}")
         self._schedulerLogger.update_cores(self._job, cores.split(","))
 
+    def running_time(self) -> float:
+        # seconds the job has actually been running, excluding pauses
+        if self._start_time is None:
+            return 0.0
+        now = self._pause_time if self._pause_time is not None else time.time()
+        return now - self._start_time - self._paused_duration
+
+    def expected_runtime(self, threads: int) -> float | None:
+        # linear interpolation between the measured thread counts
+        if not self._expected_runtimes:
+            return None
+        measured = sorted(self._expected_runtimes)
+        if threads <= measured[0]:
+            return self._expected_runtimes[measured[0]]
+        if threads >= measured[-1]:
+            return self._expected_runtimes[measured[-1]]
+        for low, high in zip(measured, measured[1:]):
+            if low <= threads <= high:
+                weight = (threads - low) / (high - low)
+                return (1 - weight) * self._expected_runtimes[
+                    low
+                ] + weight * self._expected_runtimes[high]
+
+    def progress(self) -> float | None:
+        # fraction of the expected runtime at the current thread count
+        expected = self.expected_runtime(self._threads)
+        if expected is None or expected <= 0:
+            return None
+        return self.running_time() / expected
+
     def check_job_completed(self):
         # check if the job is completed
         if self._container is None:
@@ -1,5 +1,6 @@
 #! /usr/bin/env python3
 
+import json
 import subprocess
 import psutil
 import time
@@ -36,8 +37,15 @@ logger = logging.getLogger(__name__)
 CPU_LOW = 70
 # CPU usage in percent for when to assign less cores to memcached
 CPU_HIGH = 100
+# CPU_LOW/CPU_HIGH can be replaced with the thresholds derived from the
+# part 4.1 d measurements by analysis/capacity.py (-t thresholds.json)
 # Number of consecutive samples below CPU_HIGH for which to switch back to 1 core
 CPU_HIGH_THRESHOLD = 2
+# Restart a job with more threads when it gets more cores and has run less than
+# this fraction of its expected runtime (0 disables restarts)
+RESTART_PROGRESS_LIMIT = 0.2
+# Estimated seconds lost by stopping and starting a container again
+RESTART_OVERHEAD = 2
 
 jobs: Dict[str, JobInfo] = {
     "blackscholes": {
@@ -50,6 +58,7 @@ jobs: Dict[str, JobInfo] = {
             "./run -a run -S parsec -p blackscholes -i native -n {threads}",
         ],
         "paralellizability": 1,
+        "expected_runtimes": {1: 86.58, 2: 48.76, 4: 29.47, 8: 22.55},
     },
     "canneal": {
         "name": "canneal",
@@ -61,6 +70,7 @@ jobs: Dict[str, JobInfo] = {
             "./run -a run -S parsec -p canneal -i native -n {threads}",
         ],
         "paralellizability": 1,
+        "expected_runtimes": {1: 191.06, 2: 116.0, 4: 74.68, 8: 61.96},
     },
     "dedup": {
         "name": "dedup",
@@ -72,6 +82,7 @@ jobs: Dict[str, JobInfo] = {
             "./run -a run -S parsec -p dedup -i native -n {threads}",
         ],
         "paralellizability": 1,
+        "expected_runtimes": {1: 14.3, 2: 7.64, 4: 5.05, 8: 4.26},
     },
     "ferret": {
         "name": "ferret",
@@ -83,6 +94,7 @@ jobs: Dict[str, JobInfo] = {
             "./run -a run -S parsec -p ferret -i native -n {threads}",
         ],
         "paralellizability": 2,
+        "expected_runtimes": {1: 226.82, 2: 115.52, 4: 64.45, 8: 56.29},
     },
     "freqmine": {
         "name": "freqmine",
@@ -94,6 +106,7 @@ jobs: Dict[str, JobInfo] = {
             "./run -a run -S parsec -p freqmine -i native -n {threads}",
         ],
         "paralellizability": 2,
+        "expected_runtimes": {1: 346.73, 2: 174.6, 4: 88.21, 8: 71.92},
     },
     "radix": {
         "name": "radix",
@@ -105,6 +118,7 @@ jobs: Dict[str, JobInfo] = {
             "./run -a run -S splash2x -p radix -i native -n {threads}",
         ],
         "paralellizability": 2,
+        "expected_runtimes": {1: 41.03, 2: 20.62, 4: 10.5, 8: 6.9},
     },
     "vips": {
         "name": "vips",
@@ -116,6 +130,7 @@ jobs: Dict[str, JobInfo] = {
             "./run -a run -S parsec -p vips -i native -n {threads}",
         ],
         "paralellizability": 2,
+        "expected_runtimes": {1: 65.71, 2: 33.0, 4: 17.05, 8: 16.11},
     },
 }
 
@@ -151,6 +166,15 @@ def set_memcached_cpu_affinity(pid: int, cores: str):
 # If no more 1 core jobs are left, it will run the 2 core jobs on all available cores.
 
 
+def load_thresholds(path: str):
+    # read CPU_LOW and CPU_HIGH from a file written by analysis/capacity.py
+    global CPU_LOW, CPU_HIGH
+    with open(path, "r") as f:
+        thresholds = json.load(f)
+    CPU_LOW = int(thresholds["cpu_low"])
+    CPU_HIGH = int(thresholds["cpu_high"])
+
+
 def main(policy: Policy, logfile: str | None):
     # log to a file (scheduler_04052025_17h36.log) with epoch time
     formatter = ColoredFormatter(
@@ -174,6 +198,8 @@ def main(policy: Policy, logfile: str | None):
     logger.info(f"CPU_LOW: {CPU_LOW}")
     logger.info(f"CPU_HIGH: {CPU_HIGH}")
     logger.info(f"CPU_HIGH_THRESHOLD: {CPU_HIGH_THRESHOLD}")
+    logger.info(f"RESTART_PROGRESS_LIMIT: {policy.restart_progress_limit}")
+    logger.info(f"RESTART_OVERHEAD: {policy.restart_overhead}")
 
     memcached_pid = get_memcached_pid()
     logger.info(f"Memcached PID: {memcached_pid}")
@@ -265,4 +291,15 @@ if __name__ == "__main__":
     else:
         logfile = None
 
+    # read the restart progress limit from command line with -r flag
+    if "-r" in sys.argv:
+        policy.restart_progress_limit = float(sys.argv[sys.argv.index("-r") + 1])
+    else:
+        policy.restart_progress_limit = RESTART_PROGRESS_LIMIT
+    policy.restart_overhead = RESTART_OVERHEAD
+
+    # read the CPU thresholds from a file with -t flag
+    if "-t" in sys.argv:
+        load_thresholds(sys.argv[sys.argv.index("-t") + 1])
+
     main(policy, logfile)
@@ -1,8 +1,17 @@
-from job import JobInfo, JobInstance
+from job import JobInfo, JobInstance, JobStatus
 from typing import List, Optional
+import logging
+
+logger = logging.getLogger(__name__)
 
 
 class Policy:
+    # Restart a job with more threads only if it has made less than this
+    # fraction of its expected runtime. 0 disables restarts.
+    restart_progress_limit: float = 0.0
+    # Estimated cost in seconds of stopping and starting a container again
+    restart_overhead: float = 2.0
+
     def __init__(self):
         pass
 
@@ -11,3 +20,54 @@ class Policy:
 
     def add_job(self, job: JobInfo):
         raise NotImplementedError("Subclasses must implement this method")
+
+    def _grow_job(self, job: JobInstance, cores: List[int]):
+        """Give a running or paused job more cores and let it run. Restarts the
+        job with one thread per core instead if it has barely started and the
+        runtime model predicts that the restart finishes earlier than keeping
+        the old thread count."""
+        current_cores = job._cores.split(",") if job._cores else []
+        # only decide when the job actually gets more cores
+        if len(cores) > len(current_cores) and self._should_restart(job, len(cores)):
+            # the new container is running already
+            job.restart_job(",".join(str(core) for core in cores), len(cores))
+            return
+        self._resize_job(job, cores)
+
+    def _resize_job(self, job: JobInstance, cores: List[int]):
+        """Move a running or paused job to the given cores and let it run, never
+        restarts it (used to shrink a job)."""
+        job.update_job_cpus(",".join(str(core) for core in cores))
+        if job._status == JobStatus.PAUSED:
+            try:
+                job.unpause_job()
+            except Exception as e:
+                logger.warning(f"Error unpausing job {job._jobName}: {e}")
+
+    def _should_restart(self, job: JobInstance, new_threads: int) -> bool:
+        if (
+            self.restart_progress_limit <= 0
+            or job._status not in (JobStatus.RUNNING, JobStatus.PAUSED)
+            or new_threads <= job._threads
+        ):
+            return False
+
+        progress = job.progress()
+        expected_new = job.expected_runtime(new_threads)
+        if progress is None or expected_new is None:
+            return False
+
+        # time left when keeping the current threads vs. starting over
+        remaining = (1 - progress) * job.expected_runtime(job._threads)
+        restarted = expected_new + self.restart_overhead
+        restart = progress < self.restart_progress_limit and restarted < remaining
+
+        decision = (
+            f"{'restart' if restart else 'keep'} {job._jobName}: "
+            f"progress {progress:.2f} (limit {self.restart_progress_limit}), "
+            f"remaining {remaining:.1f}s with {job._threads} threads, "
+            f"restart {restarted:.1f}s with {new_threads} threads"
+        )
+        logger.info(f"Restart decision: {decision}")
+        job._schedulerLogger.custom_event(job._job, decision)
+        return restart
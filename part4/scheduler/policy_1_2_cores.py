@@ -34,6 +34,7 @@ class Policy1And2Cores(Policy):
             1 if job["paralellizability"] == 1 else 2,
             self.schedulerLogger,
             job["logger_job"],
+            expected_runtimes=job.get("expected_runtimes"),
         )
         if job["paralellizability"] == 1:
             self.one_core_queue.append(job_instance)
@@ -71,25 +72,13 @@ class Policy1And2Cores(Policy):
                     and self.running_two_core
                     and self.running_two_core._status != JobStatus.COMPLETED
                 ):
-                    self.running_two_core.update_job_cpus(
-                        f"{sorted_cores[0]},{sorted_cores[1]},{sorted_cores[2]}"
-                    )
-                    try:
-                        self.running_two_core.unpause_job()
-                    except Exception as e:
-                        logger.warning(f"Error unpausing 2-core job: {e}")
+                    self._grow_job(self.running_two_core, sorted_cores[:3])
                 elif (
                     self.running_one_core
                     and self.running_two_core is None
                     and self.running_one_core._status != JobStatus.COMPLETED
                 ):
-                    self.running_one_core.update_job_cpus(
-                        f"{sorted_cores[0]},{sorted_cores[1]},{sorted_cores[2]}"
-                    )
-                    try:
-                        self.running_one_core.unpause_job()
-                    except Exception as e:
-                        logger.warning(f"Error unpausing 1-core job: {e}")
+                    self._grow_job(self.running_one_core, sorted_cores[:3])
                 return
 
             # Start/continue 2-core job
@@ -135,25 +124,13 @@ class Policy1And2Cores(Policy):
                     and self.running_two_core
                     and self.running_two_core._status != JobStatus.COMPLETED
                 ):
-                    self.running_two_core.update_job_cpus(
-                        f"{sorted_cores[0]},{sorted_cores[1]}"
-                    )
-                    try:
-                        self.running_two_core.unpause_job()
-                    except Exception as e:
-                        logger.warning(f"Error unpausing 2-core job: {e}")
+                    self._grow_job(self.running_two_core, sorted_cores[:2])
                 elif (
                     self.running_two_core is None
                     and self.running_one_core
                     and self.running_one_core._status != JobStatus.COMPLETED
                 ):
-                    self.running_one_core.update_job_cpus(
-                        f"{sorted_cores[0]},{sorted_cores[1]}"
-                    )
-                    try:
-                        self.running_one_core.unpause_job()
-                    except Exception as e:
-                        logger.warning(f"Error unpausing 1-core job: {e}")
+                    self._grow_job(self.running_one_core, sorted_cores[:2])
                 return
 
             # Pause running 1-core job if exists
@@ -66,25 +66,13 @@ class Policy2And3Cores(Policy):
                     and self.running_three_core
                     and self.running_three_core._status != JobStatus.COMPLETED
                 ):
-                    self.running_three_core.update_job_cpus(
-                        f"{sorted_cores[0]},{sorted_cores[1]}"
-                    )
-                    try:
-                        self.running_three_core.unpause_job()
-                    except Exception as e:
-                        logger.warning(f"Error unpausing 3-core job: {e}")
+                    self._resize_job(self.running_three_core, sorted_cores[:2])
                 elif (
                     self.running_three_core is None
                     and self.running_two_core
                     and self.running_two_core._status != JobStatus.COMPLETED
                 ):
-                    self.running_two_core.update_job_cpus(
-                        f"{sorted_cores[0]},{sorted_cores[1]}"
-                    )
-                    try:
-                        self.running_two_core.unpause_job()
-                    except Exception as e:
-                        logger.warning(f"Error unpausing 2-core job: {e}")
+                    self._grow_job(self.running_two_core, sorted_cores[:2])
                 return
 
             # Pause running 3-core job if exists
@@ -121,25 +109,13 @@ class Policy2And3Cores(Policy):
                     and self.running_three_core
                     and self.running_three_core._status != JobStatus.COMPLETED
                 ):
-                    self.running_three_core.update_job_cpus(
-                        f"{sorted_cores[0]},{sorted_cores[1]},{sorted_cores[2]}"
-                    )
-                    try:
-                        self.running_three_core.unpause_job()
-                    except Exception as e:
-                        logger.warning(f"Error unpausing 3-core job: {e}")
+                    self._grow_job(self.running_three_core, sorted_cores[:3])
                 elif (
                     self.running_three_core is None
                     and self.running_two_core
                     and self.running_two_core._status != JobStatus.COMPLETED
                 ):
-                    self.running_two_core.update_job_cpus(
-                        f"{sorted_cores[0]},{sorted_cores[1]},{sorted_cores[2]}"
-                    )
-                    try:
-                        self.running_two_core.unpause_job()
-                    except Exception as e:
-                        logger.warning(f"Error unpausing 2-core job: {e}")
+                    self._grow_job(self.running_two_core, sorted_cores[:3])
                 return
 
             # Pause running 2-core job if exists
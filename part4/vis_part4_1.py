@@ -1,53 +1,16 @@
 import matplotlib.pyplot as plt
-import mcPerfLogs
 import os
 import numpy as np
 from collections import defaultdict
 import sys
 
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.binning import BIN_METHODS, aggregate_bins
+from analysis.mcperf import read_mcperf_log
 
-def aggregate_qps_data(qps_data, latency_data, latency_std, window_size):
-    """Aggregate data points where QPS values are within a specified window size."""
-    # Sort all data by QPS
-    combined_data = list(zip(qps_data, latency_data, latency_std))
-    combined_data.sort(key=lambda x: x[0])
-
-    aggregated_qps = []
-    aggregated_latency = []
-    aggregated_latency_std = []
-
-    current_window = []
-    current_qps = None
-
-    for qps, latency, latency_std in combined_data:
-        if current_qps is None or abs(qps - current_qps) <= window_size:
-            current_window.append((qps, latency, latency_std))
-            current_qps = qps
-        else:
-            # Calculate averages for the current window
-            avg_qps = np.mean([x[0] for x in current_window])
-            avg_latency = np.mean([x[1] for x in current_window])
-            avg_latency_std = np.mean([x[2] for x in current_window])
-
-            aggregated_qps.append(avg_qps)
-            aggregated_latency.append(avg_latency)
-            aggregated_latency_std.append(avg_latency_std)
-            # Start new window
-            current_window = [(qps, latency, latency_std)]
-            current_qps = qps
-
-    # Process the last window
-    if current_window:
-        avg_qps = np.mean([x[0] for x in current_window])
-        avg_latency = np.mean([x[1] for x in current_window])
-        avg_latency_std = np.mean([x[2] for x in current_window])
-        aggregated_qps.append(avg_qps)
-        aggregated_latency.append(avg_latency)
-        aggregated_latency_std.append(avg_latency_std)
-    return aggregated_qps, aggregated_latency, aggregated_latency_std
-
-
-def main(window_size=1000):
+
+def main(window_size=1000, bin_method="adaptive", n_bins=10):
     # Define the configurations
     configs = {
         "experiment1": {"T": 1, "C": 1, "label": "Threads = 1, Cores = 1"},
@@ -80,11 +43,13 @@ def main(window_size=1000):
                 f"4_1_a_c_logs_run1",
                 f"{exp_name}_run{run}.txt",
             )
-            mcperf_log = mcPerfLogs.McPerfLogs(log_file)
-            data = mcperf_log.parse_log_file()
+            if not os.path.exists(log_file):
+                print(f"Error: {log_file} not found")
+                continue
+            data = read_mcperf_log(log_file).data
 
             # Sort data by target QPS to maintain order
-            data.sort(key=lambda x: x["target"])
+            data = np.sort(data, order="target")
 
             # Extract QPS and p95 latency for each data point
             for point in data:
@@ -106,9 +71,16 @@ def main(window_size=1000):
             std_latency.append(np.std(latency_data[target]))
 
         # Aggregate data points within specified window size
-        avg_qps, avg_latency, avg_latency_std = aggregate_qps_data(
-            avg_qps, avg_latency, std_latency, window_size
+        binned = aggregate_bins(
+            avg_qps,
+            {"latency": avg_latency, "latency_std": std_latency},
+            method=bin_method,
+            width=window_size,
+            n_bins=n_bins,
         )
+        avg_qps = binned["x_mean"]
+        avg_latency = binned["latency_mean"]
+        avg_latency_std = binned["latency_std_mean"]
 
         # Plot the data with error bars and improved visibility
         plt.errorbar(
@@ -166,5 +138,16 @@ if __name__ == "__main__":
     if "-w" in args:
         window_size = int(args[args.index("-w") + 1])
 
-    print(f"Window size: {window_size}")
-    main(window_size)
+    # bin method (adaptive, fixed or quantile) and number of quantile bins
+    bin_method = "adaptive"
+    if "-b" in args:
+        bin_method = args[args.index("-b") + 1]
+        if bin_method not in BIN_METHODS:
+            print(f"Unknown bin method {bin_method}, use one of {BIN_METHODS}")
+            sys.exit(1)
+    n_bins = 10
+    if "-n" in args:
+        n_bins = int(args[args.index("-n") + 1])
+
+    print(f"Window size: {window_size}, bins: {bin_method}")
+    main(window_size, bin_method, n_bins)
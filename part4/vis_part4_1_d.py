@@ -1,110 +1,19 @@
 import matplotlib.pyplot as plt
-import mcPerfLogs
 import os
 import numpy as np
-import csv
 from collections import defaultdict
 import sys
 
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.binning import BIN_METHODS, aggregate_bins
+from analysis.cpu_samples import read_cpu_usage
+from analysis.mcperf import read_mcperf_log
 
-COLORS = ["tab:blue", "tab:orange"]
-
-
-def read_cpu_usage(file_path: str, cores: list[int]):
-    """Read CPU usage data from CSV file and return as a list of (timestamp, cpu_percentages) tuples."""
-    cpu_data = []
-    with open(file_path, "r") as f:
-        reader = csv.reader(f)
-        for row in reader:
-            if not row:  # Skip empty lines
-                continue
-            try:
-                timestamp = int(row[0])
-                # Parse the CPU percentages from individual columns
-                cpu_percentages = []
-                for val in row[1:-1]:  # Skip timestamp and last column
-                    # Remove any spaces and convert to float
-                    cleaned_val = val.strip(" []")
-                    if cleaned_val:  # Only add non-empty values
-                        cpu_percentages.append(float(cleaned_val))
-                percentages_to_sum = [cpu_percentages[core] for core in cores]
-                total_cpu = sum(percentages_to_sum)
-                cpu_data.append((timestamp, total_cpu))
-            except (ValueError, IndexError):
-                continue
-    return cpu_data
-
-
-def calculate_avg_cpu_usage(cpu_data, start_time, end_time):
-    """Calculate average CPU usage between start_time and end_time."""
-    # Get lengths of timestamps
-    start_len = len(str(start_time))
-    end_len = len(str(end_time))
-
-    # Find the shortest length to normalize to
-    relevant_data = []
-    for ts, cpu in cpu_data:
-        ts_len = len(str(ts))
-        min_len = min(start_len, end_len, ts_len)
-
-        # Normalize all timestamps by removing extra digits
-        normalized_ts = int(str(ts)[:min_len])
-        normalized_start = int(str(start_time)[:min_len])
-        normalized_end = int(str(end_time)[:min_len])
-
-        if normalized_start <= normalized_ts < normalized_end:
-            relevant_data.append(cpu)
-
-    if not relevant_data:
-        return 0
-    return sum(relevant_data) / len(relevant_data)
-
-
-def aggregate_qps_data(qps_data, latency_data, cpu_data, window_size):
-    """Aggregate data points where QPS values are within a specified window size."""
-    # Sort all data by QPS
-    combined_data = list(zip(qps_data, latency_data, cpu_data))
-    combined_data.sort(key=lambda x: x[0])
-
-    aggregated_qps = []
-    aggregated_latency = []
-    aggregated_cpu = []
-
-    current_window = []
-    current_qps = None
-
-    for qps, latency, cpu in combined_data:
-        if current_qps is None or abs(qps - current_qps) <= window_size:
-            current_window.append((qps, latency, cpu))
-            current_qps = qps
-        else:
-            # Calculate averages for the current window
-            avg_qps = np.mean([x[0] for x in current_window])
-            avg_latency = np.mean([x[1] for x in current_window])
-            avg_cpu = np.mean([x[2] for x in current_window])
-
-            aggregated_qps.append(avg_qps)
-            aggregated_latency.append(avg_latency)
-            aggregated_cpu.append(avg_cpu)
-
-            # Start new window
-            current_window = [(qps, latency, cpu)]
-            current_qps = qps
-
-    # Process the last window
-    if current_window:
-        avg_qps = np.mean([x[0] for x in current_window])
-        avg_latency = np.mean([x[1] for x in current_window])
-        avg_cpu = np.mean([x[2] for x in current_window])
-
-        aggregated_qps.append(avg_qps)
-        aggregated_latency.append(avg_latency)
-        aggregated_cpu.append(avg_cpu)
-
-    return aggregated_qps, aggregated_latency, aggregated_cpu
 
+COLORS = ["tab:blue", "tab:orange"]
 
-def main(window_size: int):
+def main(window_size: int, bin_method: str = "adaptive", n_bins: int = 10):
     # Define the configurations
     configs = {
         "experiment1Core2Threads": {"T": 2, "C": 1, "label": "2 Threads, 1 Core"},
@@ -130,35 +39,39 @@ def main(window_size: int):
             log_file = os.path.join(
                 os.path.dirname(__file__), f"4_1_d_logs", f"{exp_name}_run{run}.txt"
             )
-            mcperf_log = mcPerfLogs.McPerfLogs(log_file)
-            data = mcperf_log.parse_log_file()
+            if not os.path.exists(log_file):
+                print(f"Error: {log_file} not found")
+                continue
+            data = read_mcperf_log(log_file).data
 
             # Read CPU usage data
             cpu_file = os.path.join(
                 os.path.dirname(__file__),
                 f"4_1_d_logs",
-                f"cpuUsage{exp_name.replace('experiment', '')}_run{run}.csv",
+                f"cpuUsage{exp_name.replace('experiment', '')}_run{run}.bin",
             )
+            if not os.path.exists(cpu_file):
+                # runs recorded before the binary sampler
+                cpu_file = cpu_file[: -len(".bin")] + ".csv"
             cores = [0] if config["C"] == 1 else [0, 1]
             cpu_usage_data = read_cpu_usage(cpu_file, cores)
 
             # Sort data by target QPS to maintain order
-            data.sort(key=lambda x: x["target"])
-
-            # Extract QPS, p95 latency, and CPU usage for each data point
-            for point in data:
-                qps = point["qps"]
-                p95_latency = point["p95"]
-                target = point["target"]
-                ts_start = point.get("ts_start", 0)
-                ts_end = point.get("ts_end", 0)
+            data = np.sort(data, order="target")
 
-                # Calculate average CPU usage for this test period
-                avg_cpu = calculate_avg_cpu_usage(cpu_usage_data, ts_start, ts_end)
+            # Calculate average CPU usage for the test period of each data point
+            if cpu_usage_data is not None and "ts_start" in data.dtype.names:
+                avg_cpu = cpu_usage_data.interval_means(data["ts_start"], data["ts_end"])
+            else:
+                avg_cpu = np.zeros(len(data))
 
+            # Extract QPS, p95 latency, and CPU usage for each data point
+            for target, qps, p95_latency, cpu in zip(
+                data["target"], data["qps"], data["p95"], avg_cpu
+            ):
                 qps_data[target].append(qps)
                 latency_data[target].append(p95_latency)
-                cpu_data[target].append(avg_cpu)
+                cpu_data[target].append(cpu)
 
         # Calculate average QPS, latency, and CPU usage for each target QPS
         avg_qps = []
@@ -173,9 +86,16 @@ def main(window_size: int):
             avg_cpu_usage.append(np.mean(cpu_data[target]))
 
         # Aggregate data points within 5k QPS windows
-        avg_qps, avg_latency, avg_cpu_usage = aggregate_qps_data(
-            avg_qps, avg_latency, avg_cpu_usage, window_size
+        binned = aggregate_bins(
+            avg_qps,
+            {"latency": avg_latency, "cpu": avg_cpu_usage},
+            method=bin_method,
+            width=window_size,
+            n_bins=n_bins,
         )
+        avg_qps = binned["x_mean"]
+        avg_latency = binned["latency_mean"]
+        avg_cpu_usage = binned["cpu_mean"]
 
         # Create the primary y-axis for latency
         ax1 = axs[i]
@@ -261,5 +181,16 @@ if __name__ == "__main__":
     if "-w" in args:
         window_size = int(args[args.index("-w") + 1])
 
-    print(f"Window size: {window_size}")
-    main(window_size)
+    # bin method (adaptive, fixed or quantile) and number of quantile bins
+    bin_method = "adaptive"
+    if "-b" in args:
+        bin_method = args[args.index("-b") + 1]
+        if bin_method not in BIN_METHODS:
+            print(f"Unknown bin method {bin_method}, use one of {BIN_METHODS}")
+            sys.exit(1)
+    n_bins = 10
+    if "-n" in args:
+        n_bins = int(args[args.index("-n") + 1])
+
+    print(f"Window size: {window_size}, bins: {bin_method}")
+    main(window_size, bin_method, n_bins)
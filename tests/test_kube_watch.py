@@ -0,0 +1,127 @@
+"""analysis.kube_watch against a fake Kubernetes API server.
+
+The fake server answers pod list requests with a pending pod and replays a
+scripted sequence of watch responses, one per watch request, each a list of
+watch events. The requests it received are recorded for the assertions.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import importlib.util
+import json
+import os
+import sys
+import threading
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis import kube_watch
+
+POD = "ibench-cpu"
+
+
+def pod(resource_version, phase="Pending", ready=False):
+    return {
+        "apiVersion": "v1",
+        "kind": "Pod",
+        "metadata": {"name": POD, "namespace": "default", "resourceVersion": resource_version},
+        "status": {
+            "phase": phase,
+            "conditions": [{"type": "Ready", "status": "True" if ready else "False"}],
+        },
+    }
+
+
+def bookmark(resource_version):
+    # bookmarks only carry the kind and the resourceVersion
+    return {
+        "type": "BOOKMARK",
+        "object": {"kind": "Pod", "apiVersion": "v1", "metadata": {"resourceVersion": resource_version}},
+    }
+
+
+def gone():
+    status = {"kind": "Status", "apiVersion": "v1", "status": "Failure", "code": 410}
+    return {"type": "ERROR", "object": {**status, "reason": "Expired", "message": "too old resource version"}}
+
+
+class FakeApiServer:
+    def __init__(self, watches):
+        self.watches = list(watches)
+        self.requests = []
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.0"
+
+            def do_GET(self):
+                query = {name: values[0] for name, values in parse_qs(urlparse(self.path).query).items()}
+                server.requests.append(query)
+                if query.get("watch") == "true":
+                    events = server.watches.pop(0) if server.watches else []
+                    body = "".join(json.dumps(event) + "\n" for event in events)
+                else:
+                    body = json.dumps(
+                        {"apiVersion": "v1", "kind": "PodList", "metadata": {"resourceVersion": "1"}, "items": [pod("1")]}
+                    )
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body.encode())
+
+            def log_message(self, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def core_api(self):
+        from kubernetes import client
+
+        configuration = client.Configuration(host=f"http://127.0.0.1:{self.httpd.server_address[1]}")
+        return client.CoreV1Api(client.ApiClient(configuration))
+
+    def watch_versions(self):
+        return [request.get("resourceVersion") for request in self.requests if request.get("watch") == "true"]
+
+
+@unittest.skipUnless(importlib.util.find_spec("kubernetes"), "kubernetes client not installed")
+class WaitForPodReadyTest(unittest.TestCase):
+    def test_bookmark_before_ready_pod(self):
+        watches = [[bookmark("5"), {"type": "MODIFIED", "object": pod("6", "Running", ready=True)}]]
+        with FakeApiServer(watches) as server:
+            self.assertTrue(kube_watch.wait_for_pod_ready(POD, timeout=10, core_api=server.core_api()))
+        self.assertEqual(server.watch_versions(), ["1"])
+
+    def test_watch_resumes_from_bookmark(self):
+        watches = [[bookmark("7")], [{"type": "MODIFIED", "object": pod("8", "Running", ready=True)}]]
+        with FakeApiServer(watches) as server:
+            self.assertTrue(kube_watch.wait_for_pod_ready(POD, timeout=10, core_api=server.core_api()))
+        self.assertEqual(server.watch_versions(), ["1", "7"])
+
+    def test_expired_watch_lists_again(self):
+        watches = [[gone()], [{"type": "MODIFIED", "object": pod("3", "Running", ready=True)}]]
+        with FakeApiServer(watches) as server:
+            self.assertTrue(kube_watch.wait_for_pod_ready(POD, timeout=10, core_api=server.core_api()))
+        lists = [request for request in server.requests if request.get("watch") != "true"]
+        self.assertEqual(len(lists), 2)
+
+    def test_timeout(self):
+        with FakeApiServer([]) as server:
+            self.assertFalse(kube_watch.wait_for_pod_ready(POD, timeout=2, core_api=server.core_api()))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,65 @@
+"""analysis.orchestrator planning with a state database in a temporary directory.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# make the shared analysis package in the repository root importable
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from analysis.orchestrator import Orchestrator, Task
+
+
+class AddTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.tmp.name, "experiments.sqlite")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def orchestrator(self):
+        orchestrator = Orchestrator("sweep", lambda task, slot: None, db_path=self.db_path)
+        self.addCleanup(orchestrator.connection.close)
+        return orchestrator
+
+    def test_same_task_twice_in_one_call(self):
+        orchestrator = self.orchestrator()
+        added = orchestrator.add([Task("run1"), Task("run1")])
+        self.assertEqual([task.key for task in added], ["run1"])
+        self.assertEqual(orchestrator.statuses(), {"run1": "planned"})
+
+    def test_task_planned_by_another_driver(self):
+        # the key is in the database but not in the tasks of this driver
+        self.orchestrator().add([Task("run1")])
+        orchestrator = self.orchestrator()
+        self.assertEqual(len(orchestrator.add([Task("run1"), Task("run2")])), 2)
+        self.assertEqual(len(orchestrator.add([Task("run3")])), 1)
+        self.assertEqual(sorted(orchestrator.statuses()), ["run1", "run2", "run3"])
+
+    def test_concurrent_follow_ups_plan_a_task_once(self):
+        orchestrator = self.orchestrator()
+        barrier = threading.Barrier(8)
+        added = []
+
+        def follow_up():
+            barrier.wait()
+            added.extend(orchestrator.add([Task("run2")]))
+
+        threads = [threading.Thread(target=follow_up) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(added), 1)
+        # the connection is still usable afterwards
+        self.assertEqual(len(orchestrator.add([Task("run3")])), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
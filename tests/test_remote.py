@@ -0,0 +1,116 @@
+"""part4/remote.py: ssh command lines of SSHPool and the commands of LoopbackShell.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import importlib.util
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+# the part 4 drivers import remote by its plain name
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "part4"))
+
+HAS_YAML = importlib.util.find_spec("yaml") is not None
+if HAS_YAML:
+    from remote import LoopbackShell, SSHPool, open_pool
+
+
+@unittest.skipUnless(HAS_YAML, "remote needs PyYAML")
+class SSHPoolCommandTest(unittest.TestCase):
+    def setUp(self):
+        self.pool = SSHPool(key_file="/keys/id", user="ubuntu")
+        self.addCleanup(self.pool.close)
+        # no control master is opened, the host counts as connected
+        self.pool.connected.add("node-a")
+        self.pool.connected.add("admin@node-b")
+        self.control = [
+            "-o",
+            "ControlMaster=auto",
+            "-o",
+            f"ControlPath={self.pool.control_dir}/%C",
+            "-o",
+            "ControlPersist=10m",
+            "-o",
+            "ServerAliveInterval=30",
+        ]
+
+    def test_command_is_multiplexed_over_the_control_master(self):
+        self.assertEqual(
+            self.pool._command("node-a", "uptime"),
+            ["ssh", "-i", "/keys/id", *self.control, "ubuntu@node-a", "uptime"],
+        )
+
+    def test_explicit_user_is_kept(self):
+        self.assertEqual(self.pool._ssh("admin@node-b")[-1], "admin@node-b")
+
+    def test_fetch_copies_over_the_same_connection(self):
+        with mock.patch("subprocess.run") as run:
+            self.pool.fetch("node-a", "~/logs/*.log", "out/")
+        self.assertEqual(
+            run.call_args.args[0],
+            ["scp", "-i", "/keys/id", *self.control, "ubuntu@node-a:~/logs/*.log", "out/"],
+        )
+
+    def test_close_stops_the_control_masters(self):
+        control_dir = self.pool.control_dir
+        with mock.patch("subprocess.run") as run:
+            self.pool.close()
+        stopped = sorted(call.args[0][-1] for call in run.call_args_list)
+        self.assertEqual(stopped, ["admin@node-b", "ubuntu@node-a"])
+        for call in run.call_args_list:
+            self.assertEqual(call.args[0][-3:-1], ["-O", "exit"])
+        self.assertFalse(os.path.exists(control_dir))
+
+
+@unittest.skipUnless(HAS_YAML, "remote needs PyYAML")
+class LoopbackShellTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.shell = LoopbackShell(root=self.tmp.name)
+        self.addCleanup(self.shell.close)
+        self.home = os.path.join(self.tmp.name, "node-a")
+
+    def test_run_in_the_home_of_the_host(self):
+        result = self.shell.run("node-a", 'echo "$HOME" && pwd', capture_output=True, text=True)
+        self.assertEqual(result.stdout.split(), [self.home, self.home])
+
+    def test_failed_command_raises(self):
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.shell.run("node-a", "exit 3")
+        self.assertEqual(self.shell.run("node-a", "exit 3", check=False).returncode, 3)
+
+    def test_start_runs_in_the_background(self):
+        process = self.shell.start("node-a", "mkdir -p scheduler && echo done > scheduler/x.log")
+        self.assertEqual(process.wait(), 0)
+        with open(os.path.join(self.home, "scheduler", "x.log")) as f:
+            self.assertEqual(f.read(), "done\n")
+
+    def test_run_all_reports_every_exit_code(self):
+        commands = [("node-a", "true"), ("node-b", "exit 1")]
+        self.assertEqual(self.shell.run_all(commands, check=False), [0, 1])
+        with self.assertRaises(subprocess.CalledProcessError):
+            self.shell.run_all(commands)
+
+    def test_fetch_copies_from_the_home_of_the_host(self):
+        self.shell.run("node-a", "mkdir -p logs && echo 1 > logs/a.log && echo 2 > logs/b.log")
+        local = os.path.join(self.tmp.name, "local")
+        os.makedirs(local)
+        self.shell.fetch("node-a", "~/logs/*.log", local)
+        self.assertEqual(sorted(os.listdir(local)), ["a.log", "b.log"])
+
+    def test_open_pool_with_loopback(self):
+        with mock.patch.dict(os.environ, {"REMOTE_LOOPBACK": "1", "REMOTE_LOOPBACK_ROOT": self.tmp.name}):
+            pool = open_pool({"vars": {"ansible_user": "ubuntu"}})
+        self.addCleanup(pool.close)
+        self.assertIsInstance(pool, LoopbackShell)
+        self.assertEqual(pool.root, self.tmp.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
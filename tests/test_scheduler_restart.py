@@ -0,0 +1,161 @@
+"""Restart decisions and the runtime model of the part 4 scheduler.
+
+The jobs run against an in-memory docker client whose containers only record
+the calls they get, the scheduler log is written to a temporary directory.
+
+Run from the repository root:
+    python -m pytest tests
+"""
+
+import importlib.util
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+# the scheduler modules import each other by their plain names
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "part4", "scheduler"))
+
+HAS_DOCKER = importlib.util.find_spec("docker") is not None
+if HAS_DOCKER:
+    from job import JobInstance, JobStatus
+    from policy import Policy
+    from scheduler_logger import Job, SchedulerLogger
+
+# part 2b runtimes of blackscholes
+RUNTIMES = {1: 86.58, 2: 48.76, 4: 29.47, 8: 22.55}
+
+
+class FakeContainer:
+    def __init__(self, fail_unpause=False):
+        self.fail_unpause = fail_unpause
+        self.calls = []
+
+    def update(self, cpuset_cpus):
+        self.calls.append(("update", cpuset_cpus))
+
+    def pause(self):
+        self.calls.append(("pause",))
+
+    def unpause(self):
+        if self.fail_unpause:
+            raise RuntimeError("container is not paused")
+        self.calls.append(("unpause",))
+
+    def stop(self, timeout=None):
+        self.calls.append(("stop",))
+
+    def remove(self, force=False):
+        self.calls.append(("remove",))
+
+
+class FakeDockerClient:
+    def __init__(self):
+        self.started = []
+        self.containers = self
+
+    def run(self, image, command, cpuset_cpus, name, detach):
+        container = FakeContainer()
+        self.started.append((cpuset_cpus, container))
+        return container
+
+
+@unittest.skipUnless(HAS_DOCKER, "docker client not installed")
+class RestartTest(unittest.TestCase):
+    def setUp(self):
+        self.cwd = os.getcwd()
+        self.tmp = tempfile.TemporaryDirectory()
+        os.chdir(self.tmp.name)
+        self.logger = SchedulerLogger()
+        self.docker = FakeDockerClient()
+        self.policy = Policy()
+        self.policy.restart_progress_limit = 0.2
+        self.policy.restart_overhead = 2.0
+
+    def tearDown(self):
+        self.logger.end()
+        os.chdir(self.cwd)
+        self.tmp.cleanup()
+
+    def job(self, threads=1, cores="0", running_for=0.0):
+        job = JobInstance(
+            "blackscholes",
+            "anakli/cca:parsec_blackscholes",
+            ["/bin/sh", "-c", "./run -n {threads}"],
+            threads,
+            self.logger,
+            Job.BLACKSCHOLES,
+            docker_client=self.docker,
+            expected_runtimes=RUNTIMES,
+        )
+        job.start_job(cores)
+        job._start_time = time.time() - running_for
+        return job
+
+    def events(self):
+        self.logger.file.flush()
+        with open(self.logger.file.name) as f:
+            # (event, job) of every line after the scheduler start
+            return [tuple(line.split()[1:3]) for line in f][1:]
+
+    def test_expected_runtime_interpolates_between_measurements(self):
+        job = self.job()
+        self.assertAlmostEqual(job.expected_runtime(3), (48.76 + 29.47) / 2)
+        self.assertEqual(job.expected_runtime(1), 86.58)
+        self.assertEqual(job.expected_runtime(16), 22.55)
+
+    def test_progress_excludes_paused_time(self):
+        job = self.job(running_for=30)
+        job._paused_duration = 10
+        self.assertAlmostEqual(job.progress(), 20 / 86.58, places=2)
+
+    def test_restart_barely_started_job(self):
+        self.assertTrue(self.policy._should_restart(self.job(running_for=5), 2))
+
+    def test_keep_job_past_progress_limit(self):
+        self.assertFalse(self.policy._should_restart(self.job(running_for=30), 2))
+
+    def test_keep_job_without_more_threads(self):
+        self.assertFalse(self.policy._should_restart(self.job(threads=2, cores="0,1", running_for=1), 2))
+
+    def test_limit_zero_disables_restarts(self):
+        self.policy.restart_progress_limit = 0
+        self.assertFalse(self.policy._should_restart(self.job(running_for=1), 2))
+
+    def test_grow_restarts_paused_job_once(self):
+        job = self.job(running_for=5)
+        job.pause_job()
+        self.policy._grow_job(job, [0, 1])
+        self.assertEqual(job._status, JobStatus.RUNNING)
+        self.assertEqual(job._threads, 2)
+        self.assertEqual([cores for cores, _ in self.docker.started], ["0", "0,1"])
+        # one start per job, the restart shows up as custom event and core update
+        events = [event for event, job in self.events() if job == "blackscholes"]
+        self.assertEqual(events, ["start", "pause", "custom", "unpause", "custom", "update_cores"])
+
+    def test_grow_without_restart_updates_cores_and_unpauses(self):
+        job = self.job(running_for=60)
+        job.pause_job()
+        self.policy._grow_job(job, [0, 1])
+        self.assertEqual(len(self.docker.started), 1)
+        self.assertEqual(job._container.calls, [("pause",), ("update", "0,1"), ("unpause",)])
+        self.assertEqual(job._status, JobStatus.RUNNING)
+
+    def test_shrink_never_restarts(self):
+        self.policy._should_restart = lambda job, threads: self.fail("shrinking must not consider a restart")
+        job = self.job(threads=3, cores="0,1,2", running_for=1)
+        self.policy._resize_job(job, [0, 1])
+        self.assertEqual(len(self.docker.started), 1)
+        self.assertEqual(job._cores, "0,1")
+
+    def test_failed_unpause_is_logged(self):
+        job = self.job(running_for=60)
+        job.pause_job()
+        job._container.fail_unpause = True
+        with self.assertLogs("policy", level="WARNING"):
+            self.policy._resize_job(job, [0])
+
+
+if __name__ == "__main__":
+    unittest.main()